@@ -1,9 +1,14 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
 import subprocess
+import csv
+import datetime
+import io
 import json
+import pickle
 import os
 import sys
+from contextlib import nullcontext
 
 app = Flask(__name__)
 
@@ -11,7 +16,7 @@ app = Flask(__name__)
 CORS(app, resources={
     r"/*": {
         "origins": "*",  # In production, replace with your frontend URL
-        "methods": ["GET", "POST", "OPTIONS"],
+        "methods": ["GET", "POST", "DELETE", "OPTIONS"],
         "allow_headers": ["Content-Type"]
     }
 })
@@ -26,19 +31,442 @@ if not os.path.exists(PYTHON_ENV):
     PYTHON_ENV = sys.executable
     print(f"[WARNING] Virtual environment Python not found, using system Python: {PYTHON_ENV}")
 
+# Prediction mode: 'inprocess' keeps the model warm in this process,
+# 'subprocess' runs predict_for_api.py in a fresh interpreter per request
+PREDICTION_MODE = os.environ.get('PREDICTION_MODE', 'inprocess').lower()
+
+# Optional model to serve instead of the .sav files: a .prfa artifact (see
+# model/property/model_artifact.py) or the property_price_pipeline.joblib from train_model.py
+MODEL_ARTIFACT = os.environ.get('MODEL_ARTIFACT', '')
+# Feature list of a one-hot MODEL_ARTIFACT .sav; defaults to the <name>_features.sav next to it
+# (or model_features.sav). Loading fails if it does not match the model.
+MODEL_FEATURES = os.environ.get('MODEL_FEATURES', '')
+
+# Prediction engine: 'flat' walks a flattened copy of the forest with NumPy (much faster
+# for single rows, see model/property/forest_engine.py), 'sklearn' calls the model directly
+PREDICTION_ENGINE = os.environ.get('PREDICTION_ENGINE', 'flat').lower()
+
+# Prediction cache: PREDICTION_CACHE_SIZE=0 disables it, PREDICTION_CACHE_TTL is in seconds
+# (0 = no expiry), PREDICTION_CACHE_DB points to a SQLite file shared by all workers
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', '1024'))
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', '0'))
+PREDICTION_CACHE_DB = os.environ.get('PREDICTION_CACHE_DB', '')
+
+prediction_cache = None
+if PREDICTION_CACHE_SIZE > 0:
+    from prediction_cache import PredictionCache, SQLiteCacheBackend
+    prediction_cache = PredictionCache(
+        max_entries=PREDICTION_CACHE_SIZE,
+        ttl_seconds=PREDICTION_CACHE_TTL,
+        backend=SQLiteCacheBackend(PREDICTION_CACHE_DB) if PREDICTION_CACHE_DB else None
+    )
+
+prediction_service = None
+if PREDICTION_MODE == 'inprocess':
+    try:
+        from prediction_service import PredictionService
+        if MODEL_ARTIFACT:
+            prediction_service = PredictionService(model_path=MODEL_ARTIFACT, features_path=MODEL_FEATURES or None,
+                                                   cache=prediction_cache,
+                                                   engine=PREDICTION_ENGINE).load(warm_up=True)
+        else:
+            prediction_service = PredictionService(cache=prediction_cache,
+                                                   engine=PREDICTION_ENGINE).load(warm_up=True)
+    except Exception as e:
+        print(f"[WARNING] Could not load model in-process, falling back to subprocess mode: {str(e)}")
+        prediction_service = None
+
+# --- Metrics ---
+# Every request gets a RequestTimer (g.timer); its stage spans and total latency feed
+# the histograms below, served at GET /metrics in the Prometheus text format.
+# SLOW_REQUEST_MS > 0 logs the stage breakdown of every request slower than that.
+from metrics import MetricsRegistry, Counter, Histogram, Gauge, RequestTimer
+
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '0'))
+
+metrics_registry = MetricsRegistry()
+request_counter = metrics_registry.register(Counter(
+    'prediction_api_requests_total', 'HTTP requests by endpoint, method and status',
+    ('endpoint', 'method', 'status')
+))
+request_latency = metrics_registry.register(Histogram(
+    'prediction_api_request_duration_seconds', 'End-to-end request latency', ('endpoint',)
+))
+stage_latency = metrics_registry.register(Histogram(
+    'prediction_api_stage_duration_seconds', 'Time spent per request stage', ('endpoint', 'stage')
+))
+
+def _cache_stat(name):
+    if prediction_cache is None or prediction_service is None:
+        return None
+    return prediction_cache.stats()[name]
+
+metrics_registry.register(Gauge(
+    'prediction_cache_hit_ratio', 'Prediction cache hits / lookups since start', lambda: _cache_stat('hit_ratio')
+))
+metrics_registry.register(Gauge(
+    'prediction_cache_entries', 'Entries in the in-memory prediction cache', lambda: _cache_stat('entries')
+))
+metrics_registry.register(Gauge(
+    'prediction_model_info', 'Model currently served (always 1)',
+    lambda: [((('version', prediction_service.model_version), ('kind', prediction_service.model_kind)), 1)]
+    if prediction_service is not None else None
+))
+
+def stage(name):
+    """Timing span for the current request, e.g. `with stage('validate'):`"""
+    return g.timer.span(name)
+
+@app.before_request
+def start_request_timer():
+    g.timer = RequestTimer()
+
+@app.after_request
+def record_request_metrics(response):
+    timer = g.get('timer')
+    if timer is None:
+        return response
+    # Streamed responses are recorded when the headers go out, not when the body finishes
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    elapsed = timer.elapsed
+    request_counter.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    request_latency.observe(elapsed, endpoint=endpoint)
+    for name, seconds in timer.spans.items():
+        stage_latency.observe(seconds, endpoint=endpoint, stage=name)
+    if SLOW_REQUEST_MS > 0 and elapsed * 1000 >= SLOW_REQUEST_MS:
+        print(f"[API SLOW] {request.method} {request.path} -> {response.status_code} "
+              f"in {elapsed * 1000:.1f}ms: {timer.breakdown()}")
+    return response
+
+# --- Input validation ---
+REQUIRED_FIELDS = ['location', 'bedrooms', 'toilet', 'garage', 'LT', 'LB']
+
+# Batch limits: rows per request, and rows scored per model call when streaming
+BATCH_MAX_ROWS = int(os.environ.get('BATCH_MAX_ROWS', '50000'))
+BATCH_CHUNK_SIZE = int(os.environ.get('BATCH_CHUNK_SIZE', '1000'))
+
+# Explanation modes (same as predict_for_api.EXPLAIN_MODES): 'exact' TreeSHAP,
+# 'fast' approximate attributions, 'none' skips feature_importance entirely
+EXPLAIN_MODES = ('none', 'fast', 'exact')
+DEFAULT_EXPLAIN_MODE = os.environ.get('DEFAULT_EXPLAIN_MODE', 'exact').lower()
+
+def parse_explain_mode(data):
+    """Reads the explanation mode from the JSON body or the ?explain= query parameter"""
+    explain = request.args.get('explain')
+    if isinstance(data, dict) and 'explain' in data:
+        explain = data['explain']
+    explain = str(explain or DEFAULT_EXPLAIN_MODE).lower()
+    if explain not in EXPLAIN_MODES:
+        raise ValueError(f"explain must be one of: {', '.join(EXPLAIN_MODES)}")
+    return explain
+
+def parse_prediction_input(data):
+    """Validates one prediction record and converts it to typed values (raises ValueError)"""
+    if not isinstance(data, dict):
+        raise ValueError("Each record must be a JSON object")
+
+    missing_fields = [field for field in REQUIRED_FIELDS if field not in data]
+    if missing_fields:
+        raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
+
+    return {
+        'location': str(data['location']),
+        'bedrooms': int(data['bedrooms']),
+        'toilet': int(data['toilet']),
+        'garage': int(data['garage']),
+        'LT': float(data['LT']),
+        'LB': float(data['LB'])
+    }
+
+# --- Location catalog ---
+# GET /locations?q= searches the model's locations through an in-memory prefix/trigram
+# index (see location_index.py). With RESOLVE_LOCATIONS=1, a prediction location that is
+# not spelled like a model location is mapped to the closest one
+# ("Cipayung Jakarta Timur" -> "Cipayung, Jakarta Timur") instead of matching nothing.
+RESOLVE_LOCATIONS = os.environ.get('RESOLVE_LOCATIONS', '1') == '1'
+FEATURES_PATH = os.path.join(BASE_DIR, 'model', 'property', 'model_features.sav')
+LOCATIONS_DEFAULT_LIMIT = 10
+
+subprocess_location_index = None
+
+def get_location_index():
+    """The loaded model's location index, or one built from model_features.sav in subprocess mode"""
+    global subprocess_location_index
+    if prediction_service is not None:
+        return prediction_service.location_index
+    if subprocess_location_index is None:
+        from location_index import LocationIndex
+        with open(FEATURES_PATH, 'rb') as f:
+            features = pickle.load(f)
+        subprocess_location_index = LocationIndex(col[len('loc_'):] for col in features if col.startswith('loc_'))
+    return subprocess_location_index
+
+def resolve_location(location):
+    """The model's spelling of `location`; unknown locations are returned unchanged"""
+    if not RESOLVE_LOCATIONS:
+        return location
+    return get_location_index().resolve(location) or location
+
+# --- Comparable listings ---
+# POST /comparables returns the scraped listings most similar to a prediction input, from the
+# per-location KD-tree index that comparables.py builds offline from the listings dataset.
+# A newer build in COMPARABLES_DIR is picked up without a restart (only changed shards are read).
+COMPARABLES_DIR = os.environ.get('COMPARABLES_DIR', os.path.join(BASE_DIR, 'comparables'))
+COMPARABLES_FIELDS = ['location', 'bedrooms', 'LT', 'LB']
+
+comparables_index = None
+try:
+    from comparables import ComparablesIndex, MAX_K as COMPARABLES_MAX_K
+    comparables_index = ComparablesIndex(COMPARABLES_DIR)
+    comparables_index.load()
+except FileNotFoundError:
+    print(f"[WARNING] No comparables index in '{COMPARABLES_DIR}' yet (build it with comparables.py)")
+except Exception as e:
+    print(f"[WARNING] Could not load the comparables index: {str(e)}")
+
+# --- Subprocess prediction (fallback path) ---
+def predict_with_subprocess(location, bedrooms, toilet, garage, LT, LB, explain=DEFAULT_EXPLAIN_MODE,
+                            requested_location=None):
+    """Runs predict_for_api.py in a new interpreter (used when the model is not loaded in-process)"""
+    # Call Python prediction script
+    cmd = [
+        PYTHON_ENV,
+        PREDICT_SCRIPT,
+        location,
+        str(bedrooms),
+        str(toilet),
+        str(garage),
+        str(LT),
+        str(LB),
+        explain
+    ]
+    
+    print(f"[API] Running command: {' '.join(cmd)}")
+    
+    with stage('subprocess'):
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=30  # 30 second timeout
+        )
+    
+    # Check if prediction script failed
+    if result.returncode != 0:
+        error_msg = result.stderr or "Unknown error occurred"
+        print(f"[API ERROR] Prediction script failed: {error_msg}")
+        return jsonify({
+            "error": "Prediction failed",
+            "details": error_msg
+        }), 500
+    
+    # Parse JSON output from prediction script
+    try:
+        prediction_result = json.loads(result.stdout)
+        if requested_location is not None and requested_location != location:
+            prediction_result['resolved_location'] = location
+        print(f"[API] Prediction successful: {prediction_result.get('predicted_price_formatted')}")
+        return jsonify(prediction_result), 200
+        
+    except json.JSONDecodeError as e:
+        print(f"[API ERROR] Failed to parse prediction output: {result.stdout}")
+        return jsonify({
+            "error": "Failed to parse prediction result",
+            "details": str(e),
+            "raw_output": result.stdout
+        }), 500
+
+
+# --- Prediction jobs ---
+# Bulk valuations run in the background (see job_queue.py). JOB_WORKERS threads per
+# process score jobs in JOB_CHUNK_SIZE chunks and step aside while interactive
+# /prediction requests are in flight in any worker process (the count lives in shared
+# memory, see InFlightCounter); at most JOB_MAX_PENDING jobs may be queued or running.
+JOBS_DIR = os.environ.get('JOBS_DIR', os.path.join(BASE_DIR, 'jobs'))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '1'))
+JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', '20'))
+JOB_CHUNK_SIZE = int(os.environ.get('JOB_CHUNK_SIZE', '500'))
+JOB_MAX_ROWS = int(os.environ.get('JOB_MAX_ROWS', '1000000'))
+JOB_RETENTION_DAYS = float(os.environ.get('JOB_RETENTION_DAYS', '7'))
+
+INTERACTIVE_ENDPOINTS = ('/prediction', '/prediction/batch')
+from job_queue import InFlightCounter
+# Created before gunicorn forks the workers (preload_app), so all of them share it
+interactive_requests = InFlightCounter()
+
+@app.before_request
+def track_interactive_start():
+    if request.url_rule is not None and request.url_rule.rule in INTERACTIVE_ENDPOINTS:
+        g.interactive = True
+        interactive_requests.enter()
+
+@app.teardown_request
+def track_interactive_end(exc):
+    if g.get('interactive'):
+        interactive_requests.exit()
+
+job_queue = None
+if prediction_service is not None:
+    from job_queue import JobStore, JobQueue, QueueFull
+    job_queue = JobQueue(
+        JobStore(JOBS_DIR),
+        score=lambda records, explain, offset: score_records(records, explain, offset=offset),
+        workers=JOB_WORKERS,
+        max_pending=JOB_MAX_PENDING,
+        chunk_size=JOB_CHUNK_SIZE,
+        busy=interactive_requests.busy,
+        retention_seconds=JOB_RETENTION_DAYS * 24 * 3600
+    )
+    metrics_registry.register(Gauge(
+        'prediction_jobs', 'Prediction jobs by status',
+        lambda: [((('status', status),), count) for status, count in job_queue.store.counts().items()]
+    ))
+
+def read_job_records():
+    """Returns (records, explain) from a JSON body, a text/csv body or a multipart 'file' upload"""
+    upload = request.files.get('file')
+    if upload is not None or request.mimetype == 'text/csv':
+        raw = upload.read() if upload is not None else request.get_data()
+        return csv.DictReader(io.StringIO(raw.decode('utf-8-sig'))), parse_explain_mode(request.form)
+
+    data = request.get_json(silent=True)
+    records = data.get('records') if isinstance(data, dict) else data
+    if not isinstance(records, list):
+        raise ValueError("Expected a JSON array of records (or {\"records\": [...]}) or a CSV file")
+    return records, parse_explain_mode(data)
+
+def job_to_json(job):
+    def timestamp(value):
+        return datetime.datetime.fromtimestamp(value, datetime.timezone.utc).isoformat() if value else None
+    return {
+        "job_id": job['id'],
+        "status": job['status'],
+        "explain": job['explain'],
+        "total": job['total'],
+        "processed": job['processed'],
+        "succeeded": job['succeeded'],
+        "failed": job['failed'],
+        "progress": round(job['processed'] / job['total'], 4) if job['total'] else 0.0,
+        "error": job['error'],
+        "created_at": timestamp(job['created_at']),
+        "started_at": timestamp(job['started_at']),
+        "finished_at": timestamp(job['finished_at']),
+        "status_url": f"/jobs/{job['id']}",
+        "result_url": f"/jobs/{job['id']}/result"
+    }
+
+def jobs_unavailable():
+    return jsonify({
+        "error": "Prediction jobs unavailable",
+        "message": "Jobs require the model to be loaded in-process"
+    }), 503
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         "status": "healthy",
-        "message": "Property prediction API is running"
+        "message": "Property prediction API is running",
+        "prediction_mode": "inprocess" if prediction_service is not None else "subprocess",
+        "model_version": prediction_service.model_version if prediction_service is not None else None,
+        "model_kind": prediction_service.model_kind if prediction_service is not None else None,
+        "model_engine": prediction_service.model_engine if prediction_service is not None else None,
+        "cache": prediction_cache.stats() if prediction_cache is not None and prediction_service is not None else None,
+        "comparables": {
+            "listings": comparables_index.listings,
+            "locations": len(comparables_index.shards),
+            "built_at": comparables_index.built_at
+        } if comparables_index is not None and comparables_index.is_loaded else None
+    }), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics (per worker process)"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/locations', methods=['GET'])
+def locations():
+    """
+    Location autocomplete
+    Query: ?q=<text>&limit=<1-100, default 10>
+    Returns JSON: { "query", "resolved", "total", "matches": [ { "location", "match", "score" } ] }
+    """
+    query = request.args.get('q', '')
+    try:
+        limit = int(request.args.get('limit', LOCATIONS_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({"error": "Invalid input", "message": "limit must be an integer"}), 400
+    
+    try:
+        index = get_location_index()
+    except (OSError, pickle.UnpicklingError) as e:
+        print(f"[API ERROR] Location index unavailable: {str(e)}")
+        return jsonify({"error": "Locations unavailable", "message": str(e)}), 503
+    
+    with stage('search'):
+        matches = index.search(query, limit)
+        resolved = index.resolve(query) if query.strip() else None
+    return jsonify({
+        "query": query,
+        "resolved": resolved,
+        "total": len(index),
+        "matches": matches
+    }), 200
+
+@app.route('/comparables', methods=['POST', 'OPTIONS'])
+def find_comparables():
+    """
+    Comparable listings
+    Accepts JSON: { "location", "bedrooms", "LT", "LB", optional "k" (1-50, default 5), optional "nearby" (default true) }
+    Returns JSON: { "location", "k", "count", "comparables": [ { "location", "price", "LT", "LB", "bedrooms",
+                    "listing_url", "image_url", "scraped_at", "distance", "same_location", ... } ] }
+    """
+    if request.method == 'OPTIONS':
+        return '', 204
+    
+    if comparables_index is not None:
+        comparables_index.reload_if_changed()
+    if comparables_index is None or not comparables_index.is_loaded:
+        return jsonify({
+            "error": "Comparables unavailable",
+            "message": "The comparables index has not been built (run comparables.py)"
+        }), 503
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "No JSON data provided"}), 400
+    missing_fields = [field for field in COMPARABLES_FIELDS if field not in data]
+    if missing_fields:
+        return jsonify({"error": f"Missing required fields: {', '.join(missing_fields)}"}), 400
+    
+    try:
+        with stage('validate'):
+            location = resolve_location(str(data['location']))
+            bedrooms, LT, LB = int(data['bedrooms']), float(data['LT']), float(data['LB'])
+            k = int(data.get('k', 5))
+            if k < 1:
+                raise ValueError("k must be at least 1")
+            # Larger k are served as MAX_K, report what was used
+            k = min(k, COMPARABLES_MAX_K)
+            nearby = str(data.get('nearby', True)).lower() not in ('0', 'false', 'no')
+        with stage('search'):
+            found = comparables_index.find(location, LT, LB, bedrooms, k=k, nearby=nearby)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": "Invalid input", "message": str(e)}), 400
+    
+    print(f"[API] Comparables request: {location}, beds={bedrooms}, LT={LT}, LB={LB} -> {len(found)} listings")
+    return jsonify({
+        "location": location,
+        "k": k,
+        "count": len(found),
+        "comparables": found
     }), 200
 
 @app.route('/prediction', methods=['POST', 'OPTIONS'])
 def predict():
     """
     Prediction endpoint
-    Accepts JSON: { "location", "bedrooms", "toilet", "garage", "LT", "LB" }
+    Accepts JSON: { "location", "bedrooms", "toilet", "garage", "LT", "LB", optional "explain": "none|fast|exact" }
     Returns JSON: { "predicted_price_raw", "predicted_price_formatted", "most_influential_feature", "feature_importance" }
     """
     
@@ -48,14 +476,14 @@ def predict():
     
     try:
         # Parse request body
-        data = request.get_json()
+        with stage('parse'):
+            data = request.get_json()
         
         if not data:
             return jsonify({"error": "No JSON data provided"}), 400
         
         # Validate required fields
-        required_fields = ['location', 'bedrooms', 'toilet', 'garage', 'LT', 'LB']
-        missing_fields = [field for field in required_fields if field not in data]
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in data]
         
         if missing_fields:
             return jsonify({
@@ -63,58 +491,29 @@ def predict():
             }), 400
         
         # Extract parameters
-        location = str(data['location'])
-        bedrooms = int(data['bedrooms'])
-        toilet = int(data['toilet'])
-        garage = int(data['garage'])
-        LT = float(data['LT'])
-        LB = float(data['LB'])
+        with stage('validate'):
+            params = parse_prediction_input(data)
+            location, bedrooms, toilet, garage, LT, LB = (params[field] for field in REQUIRED_FIELDS)
+            explain = parse_explain_mode(data)
+        with stage('resolve'):
+            resolved_location = resolve_location(location)
         
         print(f"[API] Prediction request: {location}, beds={bedrooms}, toilet={toilet}, garage={garage}, LT={LT}, LB={LB}")
+        if resolved_location != location:
+            print(f"[API] Location resolved: {location} -> {resolved_location}")
         
-        # Call Python prediction script
-        cmd = [
-            PYTHON_ENV,
-            PREDICT_SCRIPT,
-            location,
-            str(bedrooms),
-            str(toilet),
-            str(garage),
-            str(LT),
-            str(LB)
-        ]
-        
-        print(f"[API] Running command: {' '.join(cmd)}")
-        
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=30  # 30 second timeout
-        )
-        
-        # Check if prediction script failed
-        if result.returncode != 0:
-            error_msg = result.stderr or "Unknown error occurred"
-            print(f"[API ERROR] Prediction script failed: {error_msg}")
-            return jsonify({
-                "error": "Prediction failed",
-                "details": error_msg
-            }), 500
-        
-        # Parse JSON output from prediction script
-        try:
-            prediction_result = json.loads(result.stdout)
+        if prediction_service is not None:
+            prediction_result = prediction_service.predict(resolved_location, bedrooms, toilet, garage, LT, LB,
+                                                           explain=explain, timer=g.timer)
+            if resolved_location != location:
+                prediction_result = {**prediction_result, "resolved_location": resolved_location}
             print(f"[API] Prediction successful: {prediction_result.get('predicted_price_formatted')}")
-            return jsonify(prediction_result), 200
-            
-        except json.JSONDecodeError as e:
-            print(f"[API ERROR] Failed to parse prediction output: {result.stdout}")
-            return jsonify({
-                "error": "Failed to parse prediction result",
-                "details": str(e),
-                "raw_output": result.stdout
-            }), 500
+            with stage('serialize'):
+                response = jsonify(prediction_result)
+            return response, 200
+
+        return predict_with_subprocess(resolved_location, bedrooms, toilet, garage, LT, LB, explain,
+                                       requested_location=location)
     
     except subprocess.TimeoutExpired:
         print("[API ERROR] Prediction script timeout")
@@ -139,6 +538,186 @@ def predict():
             "message": str(e)
         }), 500
 
+@app.route('/prediction/batch', methods=['POST', 'OPTIONS'])
+def predict_batch():
+    """
+    Batch prediction endpoint
+    Accepts JSON: [ { "location", "bedrooms", "toilet", "garage", "LT", "LB" }, ... ]
+                  (or { "records": [...], "explain": "none|fast|exact" })
+    Returns JSON: { "count", "succeeded", "failed", "results": [ { "index", ...prediction } | { "index", "error" } ] }
+    With ?stream=true (or Accept: application/x-ndjson) results are streamed as one JSON object per line.
+    """
+    
+    # Handle preflight OPTIONS request for CORS
+    if request.method == 'OPTIONS':
+        return '', 204
+    
+    if prediction_service is None:
+        return jsonify({
+            "error": "Batch prediction unavailable",
+            "message": "Batch predictions require the model to be loaded in-process"
+        }), 503
+    
+    with stage('parse'):
+        data = request.get_json(silent=True)
+    records = data.get('records') if isinstance(data, dict) else data
+    
+    if not isinstance(records, list) or not records:
+        return jsonify({"error": "Expected a non-empty JSON array of records"}), 400
+    
+    try:
+        explain = parse_explain_mode(data)
+    except ValueError as e:
+        return jsonify({"error": "Invalid input", "message": str(e)}), 400
+    
+    if len(records) > BATCH_MAX_ROWS:
+        return jsonify({
+            "error": "Batch too large",
+            "message": f"At most {BATCH_MAX_ROWS} records are allowed per request"
+        }), 413
+    
+    stream = request.args.get('stream', '').lower() in ('1', 'true', 'yes') \
+        or request.accept_mimetypes.best == 'application/x-ndjson'
+    
+    print(f"[API] Batch prediction request: {len(records)} records (explain={explain}, stream={stream})")
+    
+    if stream:
+        def generate():
+            for start in range(0, len(records), BATCH_CHUNK_SIZE):
+                for item in score_records(records[start:start + BATCH_CHUNK_SIZE], explain, offset=start):
+                    yield json.dumps(item) + "\n"
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    try:
+        results = score_records(records, explain, timer=g.timer)
+    except Exception as e:
+        print(f"[API ERROR] Batch prediction failed: {str(e)}")
+        return jsonify({
+            "error": "Batch prediction failed",
+            "message": str(e)
+        }), 500
+    
+    failed = sum(1 for item in results if 'error' in item)
+    print(f"[API] Batch prediction finished: {len(results) - failed} succeeded, {failed} failed")
+    with stage('serialize'):
+        response = jsonify({
+            "count": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "results": results
+        })
+    return response, 200
+
+def score_records(records, explain, offset=0, timer=None):
+    """Validates each record, scores the valid ones together and keeps input order"""
+    results = [None] * len(records)
+    valid_positions, valid_rows, requested_locations = [], [], []
+    with timer.span('validate') if timer is not None else nullcontext():
+        for position, record in enumerate(records):
+            try:
+                row = parse_prediction_input(record)
+            except (ValueError, TypeError) as e:
+                results[position] = {"index": offset + position, "error": str(e)}
+                continue
+            requested_locations.append(row['location'])
+            row['location'] = resolve_location(row['location'])
+            valid_rows.append(row)
+            valid_positions.append(position)
+    
+    predictions = prediction_service.predict_batch(valid_rows, explain=explain, timer=timer)
+    for position, row, requested, prediction in zip(valid_positions, valid_rows, requested_locations, predictions):
+        results[position] = {"index": offset + position, **prediction}
+        if row['location'] != requested:
+            results[position]["resolved_location"] = row['location']
+    return results
+
+@app.route('/jobs', methods=['POST', 'OPTIONS'])
+def submit_job():
+    """
+    Submits a bulk prediction job
+    Accepts a JSON array of records (or { "records": [...], "explain" }), a text/csv body,
+    or a multipart upload with a 'file' field; CSV columns are location,bedrooms,toilet,garage,LT,LB
+    Returns 202 with the job status and its status/result URLs
+    """
+    
+    # Handle preflight OPTIONS request for CORS
+    if request.method == 'OPTIONS':
+        return '', 204
+    
+    if job_queue is None:
+        return jobs_unavailable()
+    
+    try:
+        records, explain = read_job_records()
+        job = job_queue.submit(records, explain, max_rows=JOB_MAX_ROWS)
+    except QueueFull as e:
+        print(f"[API] Job rejected: {str(e)}")
+        response = jsonify({"error": "Too many pending jobs", "message": str(e)})
+        response.headers['Retry-After'] = '30'
+        return response, 429
+    except (ValueError, csv.Error, UnicodeDecodeError) as e:
+        return jsonify({"error": "Invalid input", "message": str(e)}), 400
+    
+    print(f"[API] Job {job['id']} queued: {job['total']} records (explain={explain})")
+    response = jsonify(job_to_json(job))
+    response.headers['Location'] = f"/jobs/{job['id']}"
+    return response, 202
+
+@app.route('/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_status(job_id):
+    """Job status and progress; DELETE cancels a queued or running job"""
+    if job_queue is None:
+        return jobs_unavailable()
+    
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    if request.method == 'DELETE':
+        if not job_queue.store.cancel(job_id):
+            return jsonify({"error": "Job already finished", "status": job['status']}), 409
+        print(f"[API] Job {job_id} cancelled")
+        job = job_queue.store.get(job_id)
+    
+    return jsonify(job_to_json(job)), 200
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """
+    Streams a finished job's results as newline-delimited JSON, in input order
+    (same objects as /prediction/batch). ?partial=true returns the rows scored so far.
+    """
+    if job_queue is None:
+        return jobs_unavailable()
+    
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    partial = request.args.get('partial', '').lower() in ('1', 'true', 'yes')
+    if job['status'] != 'succeeded' and not partial:
+        return jsonify({
+            "error": "Job not finished",
+            "message": "Use ?partial=true for the results available so far",
+            "status": job['status']
+        }), 409
+    
+    result_path, limit = job_queue.store.result_path(job_id), job['result_bytes']
+    
+    def generate():
+        if not os.path.exists(result_path):
+            return
+        with open(result_path, 'rb') as f:
+            remaining = limit
+            while remaining > 0:
+                block = f.read(min(65536, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                yield block
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
 @app.errorhandler(404)
 def not_found(e):
     return jsonify({
@@ -153,10 +732,16 @@ def internal_error(e):
         "message": str(e)
     }), 500
 
+# Start the job workers; serve.py sets JOB_QUEUE_AUTOSTART=0 and starts them in each
+# gunicorn worker instead, since threads do not survive the fork
+if job_queue is not None and os.environ.get('JOB_QUEUE_AUTOSTART', '1') == '1':
+    job_queue.start()
+
 if __name__ == '__main__':
     print("=" * 60)
     print("Property Prediction API Server")
     print("=" * 60)
+    print(f"Prediction mode: {'inprocess' if prediction_service is not None else 'subprocess'}")
     print(f"Python executable: {PYTHON_ENV}")
     print(f"Prediction script: {PREDICT_SCRIPT}")
     print(f"Script exists: {os.path.exists(PREDICT_SCRIPT)}")
@@ -164,13 +749,20 @@ if __name__ == '__main__':
     print("Starting server on http://localhost:8000")
     print("Endpoints:")
     print("  GET  /health      - Health check")
+    print("  GET  /locations?q= - Location autocomplete")
     print("  POST /prediction  - Property prediction")
+    print("  POST /comparables - Similar scraped listings")
+    print("  POST /prediction/batch - Batch property prediction")
+    print("  POST /jobs        - Submit a bulk prediction job")
+    print("  GET  /jobs/<id>   - Job status (DELETE cancels)")
+    print("  GET  /jobs/<id>/result - Job results (NDJSON)")
+    print("  GET  /metrics     - Prometheus metrics")
     print("=" * 60)
     
-    # Run Flask app on port 8000
+    # Run Flask development server on port 8000 (use serve.py in production)
     app.run(
         host='0.0.0.0',
         port=8000,
-        debug=True,
+        debug=os.environ.get('API_DEBUG', '0') == '1',
         use_reloader=False  # Disable reloader to avoid double startup
     )
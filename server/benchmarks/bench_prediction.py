@@ -0,0 +1,275 @@
+"""
+Prediction latency and throughput benchmark.
+
+Measures, with synthetic inputs built from the loc_ columns in model_features.sav:
+
+- cold start: a full predict_for_api.py subprocess run, and importing +
+  loading the in-process PredictionService in a fresh interpreter;
+- single-request latency (p50/p95/p99) for the subprocess path and the
+  in-process path (through the Flask app, so parsing and JSON encoding count);
+- per-stage timings of the in-process path: featurize, model.predict,
+  SHAP (fast and exact) and JSON encoding;
+- batch throughput at several batch sizes;
+- peak RSS of the benchmark process.
+
+Results are written as JSON to benchmarks/results/ (or --out). Pass
+--baseline with an earlier result file to print the relative change of
+every latency/throughput figure.
+
+Usage:
+    python benchmarks/bench_prediction.py [--iterations 200] [--subprocess-iterations 10]
+                                          [--batch-sizes 1,10,100,1000] [--model PATH]
+                                          [--skip-subprocess] [--baseline OLD.json] [--out NEW.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from bench_utils import (BASE_DIR, MODEL_DIR, DEFAULT_MODEL_PATH, DEFAULT_FEATURES_PATH, RESULTS_DIR,
+                         peak_rss_mb, percentile, random_inputs, load_locations)
+
+PREDICT_SCRIPT = os.path.join(MODEL_DIR, 'predict_for_api.py')
+STAGES = ('featurize', 'predict', 'explain_fast', 'explain_exact', 'serialize')
+
+
+def summarize(timings_ms):
+    return {
+        'count': len(timings_ms),
+        'mean_ms': sum(timings_ms) / len(timings_ms),
+        'p50_ms': percentile(timings_ms, 50),
+        'p95_ms': percentile(timings_ms, 95),
+        'p99_ms': percentile(timings_ms, 99),
+    }
+
+
+# --- Subprocess path ---
+def bench_subprocess(inputs):
+    """Every call is a cold start: new interpreter, imports and model unpickling."""
+    timings = []
+    for row in inputs:
+        cmd = [sys.executable, PREDICT_SCRIPT, row['location'], str(row['bedrooms']), str(row['toilet']),
+               str(row['garage']), str(row['LT']), str(row['LB'])]
+        start = time.perf_counter()
+        completed = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        timings.append((time.perf_counter() - start) * 1000)
+        if completed.returncode != 0:
+            raise RuntimeError(f"predict_for_api.py failed: {completed.stderr}")
+        json.loads(completed.stdout)
+    return summarize(timings)
+
+
+# --- In-process path ---
+def cold_start_child(model_path, features_path, engine):
+    """Runs in a fresh interpreter: time imports, model load and the first prediction."""
+    start = time.perf_counter()
+    sys.path.insert(0, BASE_DIR)
+    from prediction_service import PredictionService
+    imported = time.perf_counter()
+    service = PredictionService(model_path=model_path, features_path=features_path, engine=engine).load()
+    loaded = time.perf_counter()
+    service.warm_up()
+    warmed = time.perf_counter()
+    return {
+        'import_ms': (imported - start) * 1000,
+        'load_ms': (loaded - imported) * 1000,
+        'first_prediction_ms': (warmed - loaded) * 1000,
+        'total_ms': (warmed - start) * 1000,
+    }
+
+
+def bench_cold_start(model_path, features_path, engine):
+    cmd = [sys.executable, os.path.abspath(__file__), '--cold-start-child', '--model', model_path,
+           '--features', features_path, '--engine', engine]
+    completed = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Cold start measurement failed: {completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def bench_stages(adapter, inputs):
+    """Times each stage of one in-process prediction separately."""
+    from predict_for_api import format_result
+
+    timings = {stage: [] for stage in STAGES}
+    for row in inputs:
+        start = time.perf_counter()
+        X = adapter.featurize_one(row['location'], row['bedrooms'], row['toilet'], row['garage'], row['LT'], row['LB'])
+        timings['featurize'].append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        [price] = adapter.predict(X)
+        timings['predict'].append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        adapter.explain(X, 'fast')
+        timings['explain_fast'].append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        [(top_feature, feature_importance)] = adapter.explain(X, 'exact')
+        timings['explain_exact'].append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        json.dumps(format_result(price, top_feature, feature_importance))
+        timings['serialize'].append((time.perf_counter() - start) * 1000)
+    return {stage: summarize(values) for stage, values in timings.items()}
+
+
+def bench_requests(client, inputs, explain):
+    """End-to-end latency through the Flask app (request parsing, prediction, JSON response)."""
+    timings = []
+    for row in inputs:
+        start = time.perf_counter()
+        response = client.post('/prediction', json={**row, 'explain': explain})
+        timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"/prediction returned {response.status_code}: {response.get_data(as_text=True)}")
+    return summarize(timings)
+
+
+def bench_batches(adapter, inputs, batch_sizes, explain):
+    results = {}
+    for batch_size in batch_sizes:
+        rows = inputs[:batch_size]
+        start = time.perf_counter()
+        adapter.predict_rows(rows, explain=explain)
+        elapsed = time.perf_counter() - start
+        results[str(batch_size)] = {'seconds': elapsed, 'rows_per_second': len(rows) / elapsed}
+    return results
+
+
+# --- Baseline comparison ---
+def flatten(results, prefix=''):
+    """Flattens nested results into {'a.b.p50_ms': value} for comparison."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and (key.endswith('_ms') or key == 'rows_per_second'):
+            flat[name] = value
+    return flat
+
+
+def compare_with_baseline(results, baseline):
+    current, previous = flatten(results['measurements']), flatten(baseline['measurements'])
+    print("\nChange against baseline (negative ms / positive rows/s is better):")
+    for name in sorted(current):
+        if name in previous and previous[name]:
+            change = (current[name] - previous[name]) / previous[name] * 100
+            print(f"  {name:<55} {previous[name]:>12.2f} -> {current[name]:>12.2f}  ({change:+.1f}%)")
+
+
+def print_report(measurements):
+    print("=" * 78)
+    print("Prediction benchmark")
+    print("=" * 78)
+    if 'subprocess' in measurements:
+        s = measurements['subprocess']
+        print(f"subprocess /prediction       p50 {s['p50_ms']:9.1f} ms  p95 {s['p95_ms']:9.1f} ms  p99 {s['p99_ms']:9.1f} ms")
+    c = measurements['cold_start']
+    print(f"in-process cold start        import {c['import_ms']:.0f} ms, load {c['load_ms']:.0f} ms, "
+          f"first prediction {c['first_prediction_ms']:.0f} ms")
+    for explain, s in measurements['inprocess_requests'].items():
+        print(f"in-process explain={explain:<5}     p50 {s['p50_ms']:9.2f} ms  p95 {s['p95_ms']:9.2f} ms  p99 {s['p99_ms']:9.2f} ms")
+    print("-" * 78)
+    for stage, s in measurements['stages'].items():
+        print(f"stage {stage:<14}         p50 {s['p50_ms']:9.3f} ms  p95 {s['p95_ms']:9.3f} ms  p99 {s['p99_ms']:9.3f} ms")
+    print("-" * 78)
+    for explain, sizes in measurements['batch'].items():
+        for batch_size, b in sizes.items():
+            print(f"batch explain={explain:<5} size {batch_size:>6}   {b['rows_per_second']:12,.0f} rows/s")
+    print("-" * 78)
+    print(f"peak RSS {measurements['peak_rss_mb'] or 0:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the prediction paths")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help="Model to load in-process (.sav, .joblib or .prfa)")
+    parser.add_argument('--features', default=DEFAULT_FEATURES_PATH)
+    parser.add_argument('--engine', default='flat', choices=['flat', 'sklearn'], help="In-process prediction engine")
+    parser.add_argument('--iterations', type=int, default=200, help="Single requests per in-process measurement")
+    parser.add_argument('--subprocess-iterations', type=int, default=10)
+    parser.add_argument('--skip-subprocess', action='store_true', help="Do not benchmark the subprocess path")
+    parser.add_argument('--batch-sizes', default='1,10,100,1000')
+    parser.add_argument('--out', help="Result file (default: benchmarks/results/bench-<timestamp>.json)")
+    parser.add_argument('--baseline', help="Earlier result file to compare against")
+    parser.add_argument('--cold-start-child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    model_path, features_path = os.path.abspath(args.model), os.path.abspath(args.features)
+
+    if args.cold_start_child:
+        print(json.dumps(cold_start_child(model_path, features_path, args.engine)))
+        return
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+    locations = load_locations(features_path)
+    inputs = random_inputs(locations, max([args.iterations, args.subprocess_iterations] + batch_sizes))
+
+    measurements = {}
+    if not args.skip_subprocess:
+        print(f"Running {args.subprocess_iterations} subprocess predictions...")
+        measurements['subprocess'] = bench_subprocess(inputs[:args.subprocess_iterations])
+
+    print("Measuring in-process cold start...")
+    measurements['cold_start'] = bench_cold_start(model_path, features_path, args.engine)
+
+    # The in-process measurements use the real Flask app with the cache disabled
+    os.environ['PREDICTION_MODE'] = 'inprocess'
+    os.environ['PREDICTION_CACHE_SIZE'] = '0'
+    os.environ['PREDICTION_ENGINE'] = args.engine
+    if model_path != os.path.abspath(DEFAULT_MODEL_PATH):
+        os.environ['MODEL_ARTIFACT'] = model_path
+    sys.path.insert(0, BASE_DIR)
+    import api_server
+    if api_server.prediction_service is None:
+        raise RuntimeError("The model could not be loaded in-process")
+    adapter = api_server.prediction_service.adapter
+    client = api_server.app.test_client()
+
+    print(f"Running {args.iterations} in-process requests per explain mode...")
+    measurements['inprocess_requests'] = {
+        explain: bench_requests(client, inputs[:args.iterations], explain) for explain in ('none', 'fast', 'exact')
+    }
+    measurements['stages'] = bench_stages(adapter, inputs[:args.iterations])
+    print(f"Running batches of {', '.join(map(str, batch_sizes))} rows...")
+    measurements['batch'] = {
+        explain: bench_batches(adapter, inputs, batch_sizes, explain) for explain in ('none', 'fast')
+    }
+    measurements['peak_rss_mb'] = peak_rss_mb()
+
+    results = {
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'model_path': model_path,
+        'model_version': api_server.prediction_service.model_version,
+        'model_kind': adapter.kind,
+        'engine': adapter.engine,
+        'settings': {'iterations': args.iterations, 'subprocess_iterations': args.subprocess_iterations,
+                     'batch_sizes': batch_sizes},
+        'measurements': measurements,
+    }
+
+    print_report(measurements)
+
+    out_path = args.out
+    if out_path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out_path = os.path.join(RESULTS_DIR, f"bench-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(out_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to '{out_path}'")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare_with_baseline(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Dense vs sparse (CSR) input matrices for the one-hot random forest.
+
+For every batch size, builds the model input from synthetic rows both ways
+(LocationFeaturizer.transform with sparse=False / sparse=True) and measures:
+
+- featurization time and rows/s;
+- size of the finished matrix;
+- peak memory traced while featurizing and while predicting (sklearn copies
+  a dense float64 frame to float32 before walking the trees; a float32 CSR
+  matrix is used as is);
+- sklearn predict time, and that both inputs give the same predictions.
+
+Each layout is measured in a fresh process per batch size so the peaks do
+not include the other run's allocations.
+
+Usage:
+    python benchmarks/bench_sparse_features.py [--batch-sizes 1000,10000,100000]
+                                               [--model PATH] [--features PATH] [--json results.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from bench_utils import MODEL_DIR, DEFAULT_MODEL_PATH, DEFAULT_FEATURES_PATH, random_inputs, load_locations
+
+LAYOUTS = ('dense', 'sparse')
+
+
+def matrix_bytes(X):
+    if hasattr(X, 'indptr'):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return int(X.memory_usage(index=False).sum())
+
+
+def measure(model_path, features_path, batch_size, layout):
+    """Runs inside the child process: featurize and predict one batch in one layout."""
+    sys.path.insert(0, MODEL_DIR)
+    import warnings
+    warnings.filterwarnings('ignore')
+    import numpy as np
+    from model_adapter import load_model_adapter
+
+    adapter, _ = load_model_adapter(model_path, features_path)
+    if adapter.kind != 'onehot':
+        raise ValueError("Only the one-hot model has a location block to store sparsely")
+    rows = random_inputs(load_locations(features_path), batch_size)
+    sparse = layout == 'sparse'
+    adapter.featurizer.transform(rows[:10], sparse=sparse)  # warm-up
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    X = adapter.featurizer.transform(rows, sparse=sparse)
+    featurize_seconds = time.perf_counter() - start
+    _, featurize_peak = tracemalloc.get_traced_memory()
+
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    predictions = adapter.model.predict(X)
+    predict_seconds = time.perf_counter() - start
+    _, predict_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'layout': layout,
+        'batch_size': batch_size,
+        'featurize_seconds': featurize_seconds,
+        'rows_per_second': batch_size / featurize_seconds,
+        'matrix_mb': matrix_bytes(X) / 1024 / 1024,
+        'featurize_peak_mb': featurize_peak / 1024 / 1024,
+        'predict_peak_mb': predict_peak / 1024 / 1024,
+        'predict_seconds': predict_seconds,
+        'prediction_checksum': float(np.sum(predictions)),
+    }
+
+
+def print_report(results):
+    print("=" * 96)
+    print("Dense vs sparse one-hot input")
+    print("=" * 96)
+    print(f"{'rows':>8} {'layout':>7} {'featurize':>10} {'rows/s':>10} {'matrix MB':>10} "
+          f"{'peak MB (feat)':>15} {'peak MB (pred)':>15} {'predict':>9}")
+    for r in results:
+        print(f"{r['batch_size']:>8} {r['layout']:>7} {r['featurize_seconds'] * 1000:>8.0f}ms "
+              f"{r['rows_per_second']:>10,.0f} {r['matrix_mb']:>10.1f} {r['featurize_peak_mb']:>15.1f} "
+              f"{r['predict_peak_mb']:>15.1f} {r['predict_seconds'] * 1000:>7.0f}ms")
+    print("-" * 96)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare dense and sparse one-hot input matrices")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help="One-hot model (.sav or .prfa)")
+    parser.add_argument('--features', default=DEFAULT_FEATURES_PATH)
+    parser.add_argument('--batch-sizes', default='1000,10000,100000')
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+    model_path, features_path = os.path.abspath(args.model), os.path.abspath(args.features)
+
+    if args.measure:
+        # Child process: measure exactly one (batch size, layout) and print JSON
+        print(json.dumps(measure(model_path, features_path, batch_sizes[0], args.measure)))
+        sys.exit(0)
+
+    results = []
+    for batch_size in batch_sizes:
+        for layout in LAYOUTS:
+            cmd = [sys.executable, os.path.abspath(__file__), '--measure', layout, '--model', model_path,
+                   '--features', features_path, '--batch-sizes', str(batch_size)]
+            completed = subprocess.run(cmd, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(f"❌ Error measuring {layout} x {batch_size}:\n{completed.stderr}")
+                sys.exit(1)
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        dense, sparse = results[-2:]
+        if abs(dense['prediction_checksum'] - sparse['prediction_checksum']) > 1e-6 * abs(dense['prediction_checksum']):
+            print(f"❌ Dense and sparse predictions differ for {batch_size} rows")
+            sys.exit(1)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to '{args.json}'")
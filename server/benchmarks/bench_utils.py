@@ -0,0 +1,51 @@
+"""Helpers shared by the benchmark scripts."""
+import os
+import pickle
+import random
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(BASE_DIR, 'model', 'property')
+DEFAULT_MODEL_PATH = os.path.join(MODEL_DIR, 'random_forest_model.sav')
+DEFAULT_FEATURES_PATH = os.path.join(MODEL_DIR, 'model_features.sav')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 1024 / 1024
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def random_inputs(locations, count, seed=42):
+    rng = random.Random(seed)
+    return [{
+        'location': rng.choice(locations),
+        'bedrooms': rng.randint(1, 6),
+        'toilet': rng.randint(1, 4),
+        'garage': rng.randint(0, 3),
+        'LT': float(rng.randint(40, 500)),
+        'LB': float(rng.randint(30, 500)),
+    } for _ in range(count)]
+
+
+def load_locations(features_path=DEFAULT_FEATURES_PATH):
+    """Location names taken from the loc_ columns of model_features.sav."""
+    with open(features_path, 'rb') as f:
+        features = pickle.load(f)
+    return [col[len('loc_'):] for col in features if col.startswith('loc_')]
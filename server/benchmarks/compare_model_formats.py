@@ -0,0 +1,131 @@
+"""
+Compares latency and memory of the two model formats served by the API:
+the one-hot random forest (.sav or .prfa) and the label-encoded pipeline
+(.joblib or .prfa) written by train_model.py.
+
+Each model is measured in a fresh Python process so load time and memory
+are not skewed by the other one.
+
+Usage:
+    python benchmarks/compare_model_formats.py \
+        --model model/property/random_forest_model.sav \
+        --model model/property/property_price_pipeline.joblib \
+        [--iterations 200] [--batch-size 1000] [--json results.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from bench_utils import MODEL_DIR, DEFAULT_FEATURES_PATH, peak_rss_mb, percentile, random_inputs
+
+
+def measure(model_path, features_path, iterations, batch_size):
+    """Runs inside the child process and returns the measurements for one model."""
+    sys.path.insert(0, MODEL_DIR)
+    import warnings
+    warnings.filterwarnings('ignore')
+
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    from model_adapter import load_model_adapter
+    import_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    adapter, artifact = load_model_adapter(model_path, features_path)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    adapter.explainer
+    explainer_seconds = time.perf_counter() - start
+    rss_loaded = peak_rss_mb()
+
+    locations = adapter.locations or ['']
+    inputs = random_inputs(locations, max(iterations, batch_size))
+    adapter.predict_rows(inputs[:1])  # warm-up
+
+    single = {}
+    for explain in ('none', 'fast', 'exact'):
+        timings = []
+        for row in inputs[:iterations]:
+            start = time.perf_counter()
+            adapter.predict_rows([row], explain=explain)
+            timings.append((time.perf_counter() - start) * 1000)
+        single[explain] = {
+            'p50_ms': percentile(timings, 50),
+            'p95_ms': percentile(timings, 95),
+            'p99_ms': percentile(timings, 99),
+        }
+
+    batch = {}
+    for explain in ('none', 'fast'):
+        start = time.perf_counter()
+        adapter.predict_rows(inputs[:batch_size], explain=explain)
+        elapsed = time.perf_counter() - start
+        batch[explain] = {'rows_per_second': batch_size / elapsed, 'seconds': elapsed}
+
+    return {
+        'model_path': model_path,
+        'kind': adapter.kind,
+        'n_features': len(adapter.features),
+        'file_mb': os.path.getsize(model_path) / 1024 / 1024,
+        'import_seconds': import_seconds,
+        'load_seconds': load_seconds,
+        'explainer_seconds': explainer_seconds,
+        'rss_before_mb': rss_before,
+        'rss_loaded_mb': rss_loaded,
+        'rss_peak_mb': peak_rss_mb(),
+        'single_row': single,
+        'batch': batch,
+        'batch_size': batch_size,
+    }
+
+
+def print_report(results):
+    print("=" * 78)
+    print("Model format comparison")
+    print("=" * 78)
+    for r in results:
+        print(f"{r['kind']:>9}  {os.path.basename(r['model_path'])}  ({r['n_features']} features, {r['file_mb']:.2f} MB)")
+        print(f"           load {r['load_seconds'] * 1000:.1f} ms, explainer {r['explainer_seconds'] * 1000:.1f} ms, "
+              f"RSS after load {r['rss_loaded_mb'] or 0:.0f} MB, peak {r['rss_peak_mb'] or 0:.0f} MB")
+        for explain, stats in r['single_row'].items():
+            print(f"           single row explain={explain:<5}  p50 {stats['p50_ms']:.2f} ms  "
+                  f"p95 {stats['p95_ms']:.2f} ms  p99 {stats['p99_ms']:.2f} ms")
+        for explain, stats in r['batch'].items():
+            print(f"           batch of {r['batch_size']} explain={explain:<5}  {stats['rows_per_second']:,.0f} rows/s")
+        print("-" * 78)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare latency and memory of model formats")
+    parser.add_argument('--model', action='append', required=True, help="Model file (.sav, .joblib or .prfa), repeatable")
+    parser.add_argument('--features', default=DEFAULT_FEATURES_PATH, help="Feature list for the one-hot .sav model")
+    parser.add_argument('--iterations', type=int, default=200, help="Single-row predictions per explain mode")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        # Child process: measure exactly one model and print JSON
+        print(json.dumps(measure(args.model[0], args.features, args.iterations, args.batch_size)))
+        sys.exit(0)
+
+    results = []
+    for model_path in args.model:
+        cmd = [sys.executable, os.path.abspath(__file__), '--measure', '--model', os.path.abspath(model_path),
+               '--features', args.features, '--iterations', str(args.iterations), '--batch-size', str(args.batch_size)]
+        completed = subprocess.run(cmd, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"❌ Error measuring '{model_path}':\n{completed.stderr}")
+            sys.exit(1)
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to '{args.json}'")
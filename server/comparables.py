@@ -0,0 +1,406 @@
+"""
+Comparable listings: the k scraped listings most similar to a prediction input.
+
+The index is built offline from the listings dataset (scraper/rumah123/dataset,
+written by build_dataset.py, or a CSV export of it) and stored as one shard
+per location:
+
+    comparables/manifest.json
+    comparables/<location-slug>.pkl   listing rows + a KD-tree over them
+
+Listings are points in (log LT, log LB, BEDROOM_WEIGHT * bedrooms): on the log
+scale a 10% size difference counts the same for small and large houses, and
+one bedroom weighs like ~25% more floor area. Rows without a positive LT/LB,
+bedrooms or price are left out.
+
+Rebuilds are incremental. The manifest records every dataset part file
+(size, mtime, the locations it held); a run reads only new or changed part
+files and rebuilds only the shards of the locations those parts touch. The
+server reloads only the shards whose manifest entry changed.
+
+A query searches the tree of its own location and, when that location has
+fewer than k listings, fills up with the nearest listings of the other
+locations in the same city (the part after the last comma: "Beji, Depok").
+
+Usage:
+    python comparables.py                                  # scraper/rumah123/dataset -> comparables/
+    python comparables.py --source properties_combined.csv --out comparables
+    python comparables.py --rebuild                        # start over
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+from location_index import normalize
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRAPER_DIR = os.path.join(BASE_DIR, 'scraper', 'rumah123')
+DEFAULT_SOURCE = os.path.join(SCRAPER_DIR, 'dataset')
+DEFAULT_INDEX_DIR = os.path.join(BASE_DIR, 'comparables')
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+SHARD_COLUMNS = ['listing_key', 'price', 'location', 'LT', 'LB', 'bedrooms', 'toilet', 'garage',
+                 'listing_url', 'image_url', 'scraped_at', 'part']
+BEDROOM_WEIGHT = 0.25
+DEFAULT_K = 5
+MAX_K = 50
+# How often the server looks at the manifest for a newer build
+RELOAD_CHECK_SECONDS = 10
+
+
+def feature_matrix(LT, LB, bedrooms):
+    return np.column_stack([
+        np.log(np.asarray(LT, dtype=np.float64)),
+        np.log(np.asarray(LB, dtype=np.float64)),
+        BEDROOM_WEIGHT * np.asarray(bedrooms, dtype=np.float64),
+    ])
+
+
+def city_of(location):
+    """'Cipayung, Jakarta Timur' -> 'jakarta timur' (None without a comma)"""
+    location = str(location)
+    return normalize(location.rsplit(',', 1)[1]) if ',' in location else None
+
+
+def shard_name(location):
+    slug = normalize(location).replace(' ', '-')[:60] or 'location'
+    return f"{slug}-{hashlib.sha1(str(location).encode('utf-8')).hexdigest()[:8]}.pkl"
+
+
+def write_atomic(path, data):
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def read_manifest(index_dir):
+    with open(os.path.join(index_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class LocationShard:
+    """The listings of one location and a KD-tree over their feature points."""
+
+    def __init__(self, location, rows):
+        self.location = location
+        self.rows = rows.reset_index(drop=True)
+        self.tree = KDTree(feature_matrix(self.rows['LT'], self.rows['LB'], self.rows['bedrooms']))
+        self._columns = None
+
+    def __getstate__(self):
+        return {**self.__dict__, '_columns': None}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def record(self, position):
+        """One row as a dict of plain values (None where missing), without pandas row indexing."""
+        if self._columns is None:
+            self._columns = {col: self.rows[col].to_numpy(dtype=object, na_value=None) for col in self.rows.columns}
+        return {col: values[position] for col, values in self._columns.items()}
+
+    def query(self, point, k):
+        """[(distance, row position)] of the k nearest listings."""
+        k = min(k, len(self.rows))
+        if k == 0:
+            return []
+        distances, positions = self.tree.query(point, k=k)
+        return list(zip(distances[0].tolist(), positions[0].tolist()))
+
+
+# --- Building (offline) ---
+def usable_rows(df):
+    """Rows that can be compared: a location, positive LT/LB, bedrooms and a price.
+
+    Rows without a listing_key (e.g. a CSV export without that column) get the
+    key build_dataset.py would give them, so deduplication does not merge them.
+    """
+    df = df.reindex(columns=SHARD_COLUMNS)
+    missing_key = df['listing_key'].isna()
+    if missing_key.any():
+        if SCRAPER_DIR not in sys.path:
+            sys.path.insert(0, SCRAPER_DIR)
+        from build_dataset import listing_keys
+        df['listing_key'] = df['listing_key'].astype(object)
+        df.loc[missing_key, 'listing_key'] = listing_keys(df[missing_key])
+    LT = pd.to_numeric(df['LT'], errors='coerce')
+    LB = pd.to_numeric(df['LB'], errors='coerce')
+    keep = (df['location'].notna() & (LT > 0) & (LB > 0)
+            & pd.to_numeric(df['bedrooms'], errors='coerce').notna() & pd.to_numeric(df['price'], errors='coerce').notna())
+    df = df[keep.fillna(False).astype(bool)].copy()
+    df['location'] = df['location'].astype(str)
+    return df
+
+
+class ComparablesBuilder:
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR):
+        self.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+        self.stats = {'parts_read': 0, 'parts_removed': 0, 'rows_read': 0, 'shards_written': 0, 'shards_removed': 0}
+
+    def _empty_manifest(self, source):
+        return {'version': MANIFEST_VERSION, 'source': source, 'parts': {}, 'shards': {}}
+
+    def load_manifest(self, source):
+        try:
+            manifest = read_manifest(self.index_dir)
+        except FileNotFoundError:
+            return self._empty_manifest(source)
+        if manifest.get('version') != MANIFEST_VERSION or manifest.get('source') != source:
+            print(f"Index in '{self.index_dir}' was built from another source, rebuilding it")
+            for entry in manifest.get('shards', {}).values():
+                self._remove_file(entry['file'])
+            return self._empty_manifest(source)
+        return manifest
+
+    def _remove_file(self, name):
+        try:
+            os.remove(os.path.join(self.index_dir, name))
+        except FileNotFoundError:
+            pass
+
+    def scan(self, source):
+        """{part name: (path, size, mtime)} of the source: every part file of a dataset folder, or the one CSV."""
+        if not os.path.isdir(source):
+            return {os.path.basename(source): (source, os.path.getsize(source), os.path.getmtime(source))}
+        if SCRAPER_DIR not in sys.path:
+            sys.path.insert(0, SCRAPER_DIR)
+        from build_dataset import iter_parts
+        parts = {}
+        for path in iter_parts(source):
+            parts[os.path.relpath(path, source)] = (path, os.path.getsize(path), os.path.getmtime(path))
+        return parts
+
+    def reader(self, source):
+        """Typed rows of one part file (dataset folder) or of the CSV export."""
+        if SCRAPER_DIR not in sys.path:
+            sys.path.insert(0, SCRAPER_DIR)
+        import listing_schema
+        from build_dataset import read_part
+        return read_part if os.path.isdir(source) else listing_schema.read_csv
+
+    def load_rows(self, location, manifest):
+        entry = manifest['shards'].get(location)
+        if entry is None:
+            return None
+        with open(os.path.join(self.index_dir, entry['file']), 'rb') as f:
+            return pickle.load(f).rows
+
+    def update(self, source):
+        """Brings the index up to date with the source; only changed parts and their locations are processed."""
+        source = os.path.abspath(source)
+        manifest = self.load_manifest(source)
+        current = self.scan(source)
+        known = manifest['parts']
+        changed = [part for part, (_, size, mtime) in current.items()
+                   if part not in known or known[part]['size'] != size or known[part]['mtime'] != mtime]
+        removed = [part for part in known if part not in current]
+        touched = set(changed) | set(removed)
+        if not touched:
+            return self.stats
+
+        affected = set()
+        for part in touched:
+            affected.update(known.get(part, {}).get('locations', []))
+
+        read = self.reader(source)
+        new_rows = []
+        for part in changed:
+            path, size, mtime = current[part]
+            df = usable_rows(read(path))
+            df['part'] = part
+            new_rows.append(df)
+            known[part] = {'size': size, 'mtime': mtime, 'locations': sorted(df['location'].unique().tolist())}
+            affected.update(known[part]['locations'])
+            self.stats['parts_read'] += 1
+            self.stats['rows_read'] += len(df)
+        for part in removed:
+            del known[part]
+            self.stats['parts_removed'] += 1
+
+        added = pd.concat(new_rows, ignore_index=True) if new_rows else pd.DataFrame(columns=SHARD_COLUMNS)
+        added_by_location = {location: rows for location, rows in added.groupby('location', sort=False)}
+
+        for location in sorted(affected):
+            old = self.load_rows(location, manifest)
+            frames = [] if old is None else [old[~old['part'].isin(touched)]]
+            if location in added_by_location:
+                frames.append(added_by_location[location])
+            frames = [frame for frame in frames if not frame.empty]
+            rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=SHARD_COLUMNS)
+            # A listing that moved to a newer part is only kept once, newest observation first
+            rows = rows.sort_values('scraped_at', kind='stable').drop_duplicates('listing_key', keep='last')
+
+            entry = manifest['shards'].get(location)
+            if rows.empty:
+                if entry is not None:
+                    self._remove_file(entry['file'])
+                    del manifest['shards'][location]
+                    self.stats['shards_removed'] += 1
+                continue
+            name = shard_name(location)
+            shard = LocationShard(location, rows[SHARD_COLUMNS])
+            write_atomic(os.path.join(self.index_dir, name), pickle.dumps(shard, protocol=pickle.HIGHEST_PROTOCOL))
+            manifest['shards'][location] = {'file': name, 'rows': len(shard), 'updated_at': time.time()}
+            self.stats['shards_written'] += 1
+
+        # Shards are written before the manifest that points to them
+        manifest['built_at'] = time.time()
+        write_atomic(os.path.join(self.index_dir, MANIFEST_NAME), json.dumps(manifest, indent=1).encode('utf-8'))
+        return self.stats
+
+
+# --- Serving ---
+def _value(value, cast):
+    return None if value is None else cast(value)
+
+
+class ComparablesIndex:
+    """The persisted shards in memory; reload() picks up a newer build, reading only the changed shards."""
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR):
+        self.index_dir = index_dir
+        self.shards = {}
+        self.entries = {}
+        self.by_key = {}
+        self.by_city = {}
+        self.manifest_mtime = None
+        self.built_at = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self):
+        return self.manifest_mtime is not None
+
+    @property
+    def listings(self):
+        return sum(len(shard) for shard in self.shards.values())
+
+    def load(self):
+        manifest_path = os.path.join(self.index_dir, MANIFEST_NAME)
+        manifest_mtime = os.path.getmtime(manifest_path)
+        manifest = read_manifest(self.index_dir)
+
+        shards, loaded = {}, 0
+        for location, entry in manifest['shards'].items():
+            if self.entries.get(location) == entry and location in self.shards:
+                shards[location] = self.shards[location]
+                continue
+            with open(os.path.join(self.index_dir, entry['file']), 'rb') as f:
+                shards[location] = pickle.load(f)
+            loaded += 1
+
+        by_city = {}
+        for location in shards:
+            by_city.setdefault(city_of(location), []).append(location)
+
+        # Swap everything at once; queries in flight keep using the old dicts
+        self.shards, self.entries = shards, dict(manifest['shards'])
+        self.by_key = {normalize(location): location for location in shards}
+        self.by_city = by_city
+        self.manifest_mtime, self.built_at = manifest_mtime, manifest.get('built_at')
+        print(f"[COMPARABLES] {self.listings} listings in {len(shards)} locations "
+              f"({loaded} shards read from '{self.index_dir}')")
+        return self
+
+    def reload_if_changed(self):
+        """Reloads when the manifest changed, at most every RELOAD_CHECK_SECONDS. Keeps the old index on errors."""
+        now = time.monotonic()
+        if now - self._checked_at < RELOAD_CHECK_SECONDS or not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._checked_at = now
+            try:
+                manifest_path = os.path.join(self.index_dir, MANIFEST_NAME)
+                if not os.path.exists(manifest_path) or os.path.getmtime(manifest_path) == self.manifest_mtime:
+                    return False
+                self.load()
+                return True
+            except Exception as e:
+                print(f"[COMPARABLES ERROR] Reload failed, keeping the loaded index: {str(e)}")
+                return False
+        finally:
+            self._lock.release()
+
+    def find(self, location, LT, LB, bedrooms, k=DEFAULT_K, nearby=True):
+        """
+        The k listings nearest to the input: from its own location first, then,
+        with `nearby`, from the other locations of the same city.
+        """
+        if LT <= 0 or LB <= 0:
+            raise ValueError("LT and LB must be positive")
+        if int(k) < 1:
+            raise ValueError("k must be at least 1")
+        k = min(int(k), MAX_K)
+        point = feature_matrix([LT], [LB], [bedrooms])
+
+        shards = self.shards
+        name = self.by_key.get(normalize(location))
+        found = [(distance, name, position) for distance, position in shards[name].query(point, k)] if name else []
+
+        if nearby and len(found) < k:
+            missing = k - len(found)
+            candidates = []
+            for other in self.by_city.get(city_of(name or location), []):
+                if other != name and other in shards:
+                    candidates.extend((distance, other, position) for distance, position in shards[other].query(point, missing))
+            found += sorted(candidates)[:missing]
+
+        return [self._format(shards[shard_location].record(position), distance, shard_location == name)
+                for distance, shard_location, position in found]
+
+    @staticmethod
+    def _format(row, distance, same_location):
+        return {
+            'location': row['location'],
+            'price': _value(row['price'], int),
+            'price_formatted': f"Rp {row['price']:,.0f}",
+            'LT': _value(row['LT'], float),
+            'LB': _value(row['LB'], float),
+            'bedrooms': _value(row['bedrooms'], int),
+            'toilet': _value(row['toilet'], int),
+            'garage': _value(row['garage'], int),
+            'listing_url': _value(row['listing_url'], str),
+            'image_url': _value(row['image_url'], str),
+            'scraped_at': _value(row['scraped_at'], lambda value: pd.Timestamp(value).isoformat()),
+            'distance': round(float(distance), 4),
+            'same_location': same_location,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or update the comparable-listings index")
+    parser.add_argument('--source', default=DEFAULT_SOURCE,
+                        help="Listings dataset folder (build_dataset.py) or a CSV export of it")
+    parser.add_argument('--out', default=DEFAULT_INDEX_DIR, help="Index folder")
+    parser.add_argument('--rebuild', action='store_true', help="Delete the index and build it from scratch")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        print(f"❌ Error: Source '{args.source}' not found.")
+        sys.exit(1)
+    if args.rebuild and os.path.isdir(args.out):
+        for name in os.listdir(args.out):
+            if name == MANIFEST_NAME or name.endswith('.pkl'):
+                os.remove(os.path.join(args.out, name))
+
+    # Use the importable class so the pickled shards reference comparables.LocationShard
+    # (not __main__.LocationShard) and can be loaded by the API server
+    import comparables
+
+    started = time.monotonic()
+    stats = comparables.ComparablesBuilder(args.out).update(args.source)
+    print(f"✅ Read {stats['parts_read']} new or changed part files ({stats['rows_read']} usable rows), "
+          f"{stats['parts_removed']} removed; {stats['shards_written']} location shards written, "
+          f"{stats['shards_removed']} removed in {time.monotonic() - started:.1f}s.")
@@ -0,0 +1,395 @@
+"""
+Asynchronous prediction jobs for bulk valuations.
+
+A job is a list of prediction records submitted once and scored in the
+background, in chunks, by a small pool of worker threads that use the
+model already loaded by the API process. Jobs live in a SQLite file plus
+one input and one result file per job (newline-delimited JSON) under
+JOBS_DIR, so they survive a restart: a job whose worker died is queued
+again and resumes after the last chunk it finished.
+
+Several processes (gunicorn workers) can share one JOBS_DIR, a job is
+claimed by exactly one of them.
+"""
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when too many jobs are already pending."""
+
+
+class JobStore:
+    """Job metadata in SQLite, job input/results as NDJSON files next to it."""
+
+    def __init__(self, directory, stale_seconds=300):
+        self.directory = directory
+        self.path = os.path.join(directory, 'jobs.sqlite3')
+        self.stale_seconds = stale_seconds
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, status TEXT NOT NULL, explain TEXT NOT NULL,"
+                " total INTEGER NOT NULL, processed INTEGER NOT NULL DEFAULT 0,"
+                " succeeded INTEGER NOT NULL DEFAULT 0, failed INTEGER NOT NULL DEFAULT 0,"
+                " result_bytes INTEGER NOT NULL DEFAULT 0, error TEXT, owner_pid INTEGER,"
+                " created_at REAL NOT NULL, started_at REAL, finished_at REAL, heartbeat_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads or forked processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def input_path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.input.ndjson")
+
+    def result_path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.result.ndjson")
+
+    def create(self, records, explain, max_rows=None, max_pending=None):
+        """Writes the records to the job's input file and queues the job (raises ValueError if too many).
+
+        Returns None, without queueing, when max_pending jobs are already queued or running.
+        """
+        job_id = uuid.uuid4().hex
+        input_path = self.input_path(job_id)
+        tmp_path = f"{input_path}.tmp"
+        total = 0
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in records:
+                    total += 1
+                    if max_rows is not None and total > max_rows:
+                        raise ValueError(f"At most {max_rows} records are allowed per job")
+                    f.write(json.dumps(record) + "\n")
+            if total == 0:
+                raise ValueError("The job contains no records")
+            os.replace(tmp_path, input_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # One statement, so the pending count cannot change between the check and the insert
+        with self._connect() as conn:
+            inserted = conn.execute(
+                "INSERT INTO jobs (id, status, explain, total, created_at)"
+                " SELECT ?, 'queued', ?, ?, ?"
+                " WHERE ? IS NULL OR (SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')) < ?",
+                (job_id, explain, total, time.time(), max_pending, max_pending)
+            ).rowcount
+        if not inserted:
+            os.remove(input_path)
+            return None
+        return self.get(job_id)
+
+    def get(self, job_id):
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def claim(self):
+        """Marks the oldest queued job as running in this process and returns it (or None)."""
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', owner_pid = ?, started_at = COALESCE(started_at, ?),"
+                " heartbeat_at = ? WHERE id = ?",
+                (os.getpid(), now, now, row['id'])
+            )
+        return self.get(row['id'])
+
+    def update_progress(self, job_id, processed, succeeded, failed, result_bytes):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET processed = ?, succeeded = ?, failed = ?, result_bytes = ?, heartbeat_at = ?"
+                " WHERE id = ?",
+                (processed, succeeded, failed, result_bytes, time.time(), job_id)
+            )
+
+    def finish(self, job_id, status, error=None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = 'running'",
+                (status, error, time.time(), job_id)
+            )
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job; running jobs stop after their current chunk."""
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id)
+            ).rowcount
+        return updated > 0
+
+    def counts(self):
+        """Number of jobs per status."""
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def requeue_orphans(self, is_active):
+        """Puts running jobs whose worker is gone back in the queue; returns how many."""
+        rows = self._connect().execute(
+            "SELECT id, owner_pid, heartbeat_at FROM jobs WHERE status = 'running'"
+        ).fetchall()
+        orphans = [row['id'] for row in rows if not is_active(row['id'], row['owner_pid'], row['heartbeat_at'])]
+        if orphans:
+            with self._connect() as conn:
+                conn.executemany(
+                    "UPDATE jobs SET status = 'queued', owner_pid = NULL WHERE id = ? AND status = 'running'",
+                    [(job_id,) for job_id in orphans]
+                )
+        return len(orphans)
+
+    def purge(self, older_than_seconds):
+        """Deletes finished jobs (and their files) older than the retention period."""
+        cutoff = time.time() - older_than_seconds
+        rows = self._connect().execute(
+            "SELECT id FROM jobs WHERE status IN ('succeeded', 'failed', 'cancelled') AND finished_at < ?", (cutoff,)
+        ).fetchall()
+        for row in rows:
+            for path in (self.input_path(row['id']), self.result_path(row['id'])):
+                if os.path.exists(path):
+                    os.remove(path)
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(row['id'],) for row in rows])
+        return len(rows)
+
+
+def _process_alive(pid):
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class InFlightCounter:
+    """
+    Requests in flight in this process and every process forked from it (the gunicorn
+    workers of the preloaded app), kept in shared memory so job workers in one process
+    can step aside for interactive requests served by another.
+
+    Every process counts in its own slot, so the requests of a worker that died
+    mid-request (e.g. killed on timeout) are dropped instead of keeping busy() true.
+    """
+
+    REAP_INTERVAL_SECONDS = 5.0
+
+    def __init__(self, max_processes=64):
+        self._lock = multiprocessing.Lock()
+        self._pids = multiprocessing.Array('q', max_processes, lock=False)
+        self._counts = multiprocessing.Array('i', max_processes, lock=False)
+        self._slot = None
+        self._slot_pid = None
+        self._last_reap = 0.0
+
+    def _own_slot(self):
+        pid = os.getpid()
+        if self._slot_pid != pid:
+            with self._lock:
+                slot = next((i for i, owner in enumerate(self._pids) if owner in (0, pid)), None)
+                if slot is None:
+                    slot = next((i for i, owner in enumerate(self._pids) if not self._owner_alive(owner)), None)
+                if slot is None:
+                    # More processes than slots: share one, counts still add up
+                    slot = pid % len(self._pids)
+                else:
+                    self._pids[slot], self._counts[slot] = pid, 0
+            self._slot, self._slot_pid = slot, pid
+        return self._slot
+
+    @staticmethod
+    def _owner_alive(pid):
+        # os.kill(pid, 0) terminates the process on Windows, where there is only one process anyway
+        return os.name == 'nt' or _process_alive(pid)
+
+    def enter(self):
+        slot = self._own_slot()
+        with self._lock:
+            self._counts[slot] += 1
+
+    def exit(self):
+        slot = self._own_slot()
+        with self._lock:
+            self._counts[slot] = max(0, self._counts[slot] - 1)
+
+    def busy(self):
+        if not any(self._counts):
+            return False
+        now = time.monotonic()
+        if now - self._last_reap > self.REAP_INTERVAL_SECONDS:
+            self._last_reap = now
+            with self._lock:
+                for i, owner in enumerate(self._pids):
+                    if self._counts[i] and owner != os.getpid() and not self._owner_alive(owner):
+                        self._counts[i] = 0
+        return any(self._counts)
+
+
+class JobQueue:
+    """
+    Worker threads that claim jobs from a JobStore and score them chunk by chunk.
+
+    `score(records, explain, offset)` returns one result dict per record (with
+    an "error" key for invalid ones), like the batch endpoint. `busy()` reports
+    whether interactive requests are in flight; workers wait (up to
+    `max_yield_seconds`) before each chunk while it is true, so bulk jobs only
+    use the time interactive requests leave free.
+    """
+
+    def __init__(self, store, score, workers=1, max_pending=20, chunk_size=500, poll_interval=1.0,
+                 busy=None, max_yield_seconds=0.5, retention_seconds=7 * 24 * 3600):
+        self.store = store
+        self.score = score
+        self.workers = workers
+        self.max_pending = max_pending
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.busy = busy
+        self.max_yield_seconds = max_yield_seconds
+        self.retention_seconds = retention_seconds
+        self._wakeup = threading.Event()
+        self._active = set()
+        self._active_lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        """Starts the worker threads (once per process, call again after a fork)."""
+        if self._pid == os.getpid() or self.workers <= 0:
+            return self
+        self._pid = os.getpid()
+        self._active = set()
+        self.store.purge(self.retention_seconds)
+        requeued = self.store.requeue_orphans(self._is_active)
+        if requeued:
+            print(f"[JOBS] Re-queued {requeued} interrupted job(s)")
+        for i in range(self.workers):
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True).start()
+        print(f"[JOBS] {self.workers} job worker(s) started (pid {self._pid})")
+        return self
+
+    def submit(self, records, explain, max_rows=None):
+        """Queues a job, or raises QueueFull when max_pending jobs are already waiting or running."""
+        counts = self.store.counts()
+        if counts['queued'] + counts['running'] >= self.max_pending:
+            raise QueueFull(f"{self.max_pending} jobs are already pending")
+        job = self.store.create(records, explain, max_rows=max_rows, max_pending=self.max_pending)
+        if job is None:
+            raise QueueFull(f"{self.max_pending} jobs are already pending")
+        self._wakeup.set()
+        return job
+
+    def _is_active(self, job_id, owner_pid, heartbeat_at):
+        if owner_pid == os.getpid():
+            with self._active_lock:
+                return job_id in self._active
+        if os.name == 'nt':
+            # os.kill(pid, 0) terminates the process on Windows, rely on the heartbeat there
+            return heartbeat_at is not None and time.time() - heartbeat_at < self.store.stale_seconds
+        return _process_alive(owner_pid)
+
+    def _work(self):
+        last_orphan_check = time.monotonic()
+        while True:
+            try:
+                job = self.store.claim()
+            except sqlite3.Error as e:
+                print(f"[JOBS WARNING] Could not claim a job: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                # Pick up jobs left behind by workers that exited (e.g. after a graceful reload)
+                if time.monotonic() - last_orphan_check > 30:
+                    last_orphan_check = time.monotonic()
+                    self.store.requeue_orphans(self._is_active)
+                continue
+            with self._active_lock:
+                self._active.add(job['id'])
+            try:
+                self._run(job)
+            except Exception as e:
+                print(f"[JOBS ERROR] Job {job['id']} failed: {str(e)}")
+                self.store.finish(job['id'], 'failed', error=str(e))
+            finally:
+                with self._active_lock:
+                    self._active.discard(job['id'])
+
+    def _yield_to_interactive(self):
+        if self.busy is None:
+            return
+        deadline = time.monotonic() + self.max_yield_seconds
+        while self.busy() and time.monotonic() < deadline:
+            time.sleep(0.002)
+
+    def _run(self, job):
+        job_id, processed = job['id'], job['processed']
+        succeeded, failed = job['succeeded'], job['failed']
+        if processed:
+            print(f"[JOBS] Resuming job {job_id} at record {processed}/{job['total']}")
+        else:
+            print(f"[JOBS] Starting job {job_id}: {job['total']} records (explain={job['explain']})")
+
+        result_path = self.store.result_path(job_id)
+        with open(self.store.input_path(job_id), 'r', encoding='utf-8') as source, \
+                open(result_path, 'a+b') as results:
+            # Drop output written after the last recorded chunk, then skip the records it covered
+            results.truncate(job['result_bytes'])
+            results.seek(0, os.SEEK_END)
+            for _ in range(processed):
+                source.readline()
+
+            while True:
+                lines = [line for line in (source.readline() for _ in range(self.chunk_size)) if line]
+                if not lines:
+                    break
+                if self.store.get(job_id)['status'] != 'running':
+                    print(f"[JOBS] Job {job_id} cancelled at record {processed}/{job['total']}")
+                    return
+
+                self._yield_to_interactive()
+                items = self.score([json.loads(line) for line in lines], job['explain'], processed)
+                chunk_failed = sum(1 for item in items if 'error' in item)
+                results.write(''.join(json.dumps(item) + "\n" for item in items).encode('utf-8'))
+                results.flush()
+
+                processed += len(items)
+                failed += chunk_failed
+                succeeded += len(items) - chunk_failed
+                self.store.update_progress(job_id, processed, succeeded, failed, results.tell())
+
+        self.store.finish(job_id, 'succeeded')
+        print(f"[JOBS] Job {job_id} finished: {succeeded} succeeded, {failed} failed")
@@ -0,0 +1,163 @@
+"""
+In-memory search index over the model's locations (the loc_ columns of
+model_features.sav, or the label encoder's classes for the pipeline).
+
+Names are normalized first (lowercase, punctuation and repeated spaces
+folded), so "Cipayung, Jakarta Timur" and "cipayung  jakarta timur" are the
+same key. Two structures are built once:
+
+- a sorted list of every word-start suffix of every name ("cipayung jakarta
+  timur", "jakarta timur", "timur"), searched with bisect: a query is a prefix
+  of a name or of one of its words in O(log n);
+- a trigram -> locations map, so misspelled queries are scored only against
+  locations that share a trigram with them (Jaccard similarity of the
+  trigram sets), never against the whole list.
+
+search() ranks exact matches, then name prefixes, then word prefixes, then
+trigram matches. resolve() maps a near-miss spelling to one known location,
+and only when that location is clearly meant: a query that starts several
+names ("Cipayung": Depok or Jakarta Timur), that is about as close to a
+second name, or that has a word the name lacks ("Sawangan Baru" is not
+"Sawangan") is not resolved.
+"""
+import bisect
+import difflib
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+# Minimum trigram similarity for a search result / for resolving a prediction input
+SEARCH_MIN_SIMILARITY = 0.3
+RESOLVE_MIN_SIMILARITY = 0.6
+# The best name must be this much more similar than the next one
+RESOLVE_MIN_MARGIN = 0.1
+# Every query word must be at least this close (difflib ratio) to a word of the name
+RESOLVE_MIN_WORD_RATIO = 0.75
+MAX_LIMIT = 100
+# Distinct inputs remembered by resolve(); batches repeat the same few spellings
+RESOLVE_CACHE_SIZE = 4096
+
+MATCH_RANKS = {'exact': 0, 'prefix': 1, 'word_prefix': 2, 'fuzzy': 3}
+_SEPARATORS = re.compile(r'[\W_]+')
+
+
+def normalize(name):
+    """'Cipayung, Jakarta  Timur' -> 'cipayung jakarta timur'"""
+    return _SEPARATORS.sub(' ', str(name).lower()).strip()
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LocationIndex:
+    def __init__(self, locations):
+        self.locations = sorted(set(str(location) for location in locations))
+        self.keys = [normalize(location) for location in self.locations]
+
+        # Normalized name -> location ids (distinct names can normalize alike)
+        self.by_key = defaultdict(list)
+        for i, key in enumerate(self.keys):
+            self.by_key[key].append(i)
+
+        # (suffix starting at a word, location id, word position), sorted for prefix search
+        suffixes = []
+        for i, key in enumerate(self.keys):
+            words = key.split(' ')
+            for position in range(len(words)):
+                suffixes.append((' '.join(words[position:]), i, position))
+        suffixes.sort()
+        self.suffixes = suffixes
+        self.suffix_keys = [suffix for suffix, _, _ in suffixes]
+
+        self.trigram_sets = [trigrams(key) for key in self.keys]
+        self.by_trigram = defaultdict(list)
+        for i, grams in enumerate(self.trigram_sets):
+            for gram in grams:
+                self.by_trigram[gram].append(i)
+
+        self.resolve = lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve)
+
+    def __len__(self):
+        return len(self.locations)
+
+    def __contains__(self, location):
+        return normalize(location) in self.by_key
+
+    def _prefix_matches(self, key):
+        """{location id: 'prefix' | 'word_prefix'} for names or words starting with key."""
+        matches = {}
+        start = bisect.bisect_left(self.suffix_keys, key)
+        for suffix, i, position in self.suffixes[start:]:
+            if not suffix.startswith(key):
+                break
+            if position == 0:
+                matches[i] = 'prefix'
+            else:
+                matches.setdefault(i, 'word_prefix')
+        return matches
+
+    def _similarities(self, key):
+        """{location id: trigram Jaccard similarity} for locations sharing at least one trigram."""
+        query = trigrams(key)
+        shared = defaultdict(int)
+        for gram in query:
+            for i in self.by_trigram.get(gram, ()):
+                shared[i] += 1
+        return {i: count / (len(query) + len(self.trigram_sets[i]) - count) for i, count in shared.items()}
+
+    def search(self, query, limit=10):
+        """Ranked matches: [{'location', 'match', 'score'}], best first."""
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        key = normalize(query)
+        if not key:
+            return [{'location': location, 'match': 'all', 'score': 0.0} for location in self.locations[:limit]]
+
+        similarities = self._similarities(key)
+        matches = {i: 'exact' for i in self.by_key.get(key, ())}
+        for i, match in self._prefix_matches(key).items():
+            matches.setdefault(i, match)
+        for i, similarity in similarities.items():
+            if similarity >= SEARCH_MIN_SIMILARITY:
+                matches.setdefault(i, 'fuzzy')
+
+        ranked = sorted(matches.items(), key=lambda item: (
+            MATCH_RANKS[item[1]], -similarities.get(item[0], 0.0), len(self.keys[item[0]]), self.locations[item[0]]
+        ))
+        return [{'location': self.locations[i], 'match': match, 'score': round(similarities.get(i, 0.0), 3)}
+                for i, match in ranked[:limit]]
+
+    def _resolve(self, location):
+        """
+        resolve(location): the known location `location` refers to, or None: an exact or normalized
+        match, else the single most similar name if it is similar enough.
+        """
+        key = normalize(location)
+        exact = self.by_key.get(key)
+        if exact:
+            return location if location in (self.locations[i] for i in exact) else self.locations[exact[0]]
+        if not key:
+            return None
+
+        # The start of several names (or of words in them): do not guess which one
+        if len(self._prefix_matches(key)) > 1:
+            return None
+        similarities = sorted(self._similarities(key).items(), key=lambda item: -item[1])
+        if not similarities or similarities[0][1] < RESOLVE_MIN_SIMILARITY:
+            return None
+        if len(similarities) > 1 and similarities[0][1] - similarities[1][1] < RESOLVE_MIN_MARGIN:
+            return None
+        best = similarities[0][0]
+        if not self._words_match(key, self.keys[best]):
+            return None
+        return self.locations[best]
+
+    @staticmethod
+    def _words_match(key, name_key):
+        """True when every word of the query is (a misspelling of) a word of the name."""
+        name_words = name_key.split(' ')
+        return all(
+            any(difflib.SequenceMatcher(None, word, name_word).ratio() >= RESOLVE_MIN_WORD_RATIO for name_word in name_words)
+            for word in key.split(' ')
+        )
@@ -0,0 +1,115 @@
+"""
+Cleaning of listing data for training, in one vectorized pass.
+
+Every check (missing value, infinite value) is evaluated
+for all rows and columns at once into one boolean matrix; the rows that pass
+all of them are selected once and cast to their final dtypes. Nothing is
+dropped or cast column by column, so the frame is copied only once.
+
+Malformed values are turned into nulls when the data is read
+(listing_schema.read_listings, which counts them per column), so they are
+dropped as "missing <column>". Pass those counts as `coerced` and the report
+lists them; any text left in an untyped frame is treated the same way.
+
+clean_listings() also returns a data-quality report: rows dropped per
+reason, and outliers on price/LT/LB (Tukey fences on the log scale; reported,
+and only dropped with drop_outliers=True).
+"""
+import numpy as np
+import pandas as pd
+
+NUMERIC_COLUMNS = ['price', 'LT', 'LB', 'bedrooms', 'toilet', 'garage']
+INTEGER_COLUMNS = ['bedrooms', 'toilet', 'garage']
+OUTLIER_COLUMNS = ['price', 'LT', 'LB']
+# Fence distance in interquartile ranges (3 = "far out" in Tukey's terms)
+OUTLIER_IQR_FACTOR = 3.0
+
+
+def outlier_fences(values, factor=OUTLIER_IQR_FACTOR):
+    """(low, high) bounds of the non-outlier range of positive, skewed values, computed on log10."""
+    logs = np.log10(values[values > 0])
+    if len(logs) == 0:
+        return None, None
+    q1, q3 = np.percentile(logs, [25, 75])
+    spread = factor * (q3 - q1)
+    return 10 ** (q1 - spread), 10 ** (q3 + spread)
+
+
+def clean_listings(df, drop_outliers=False, coerced=None):
+    """
+    Returns (clean frame, report). The clean frame has the location as str,
+    price/LT/LB as float64 and bedrooms/toilet/garage as int64, and only
+    rows where all of them are present, numeric and finite. `coerced` is the
+    {column: count} of values read as null because they did not parse.
+    """
+    rows_in = len(df)
+    location = df['location']
+    location_missing = location.isna().to_numpy() | (location.astype(str).str.strip() == '').to_numpy()
+
+    block = df[NUMERIC_COLUMNS]
+    if all(pd.api.types.is_numeric_dtype(dtype) for dtype in block.dtypes):
+        # Typed input (listing_schema): one cast of the whole block
+        values = block.to_numpy(dtype='float64', na_value=np.nan)
+    else:
+        # Raw text: parsed as one block, then cast once
+        values = block.apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    missing = np.isnan(values)
+    infinite = np.isinf(values)
+
+    # One column per (reason, column); a dropped row is reported under its first failing check
+    checks = np.column_stack([location_missing, missing, infinite])
+    reasons = (['missing location'] + [f"missing {col}" for col in NUMERIC_COLUMNS]
+               + [f"infinite {col}" for col in NUMERIC_COLUMNS])
+    invalid = checks.any(axis=1)
+    first_failure = np.bincount(checks[invalid].argmax(axis=1), minlength=len(reasons))
+    dropped = {reason: int(count) for reason, count in zip(reasons, first_failure) if count}
+
+    valid = ~invalid
+    outliers = {}
+    outlier_rows = np.zeros(rows_in, dtype=bool)
+    for i, col in enumerate(NUMERIC_COLUMNS):
+        if col not in OUTLIER_COLUMNS:
+            continue
+        column = values[valid, i]
+        low, high = outlier_fences(column)
+        if low is None:
+            continue
+        flagged = valid.copy()
+        flagged[valid] = (column < low) | (column > high)
+        outlier_rows |= flagged
+        outliers[col] = {'count': int(flagged.sum()), 'low': float(low), 'high': float(high),
+                         'min': float(column.min()), 'max': float(column.max())}
+    if drop_outliers and outlier_rows.any():
+        dropped['outlier'] = int(outlier_rows.sum())
+        valid &= ~outlier_rows
+
+    kept = values[valid]
+    clean = pd.DataFrame({'location': location[valid].astype(str).to_numpy()})
+    for i, col in enumerate(NUMERIC_COLUMNS):
+        clean[col] = kept[:, i].astype(np.int64 if col in INTEGER_COLUMNS else np.float64)
+    clean.index = df.index[valid]
+
+    report = {
+        'rows_in': rows_in,
+        'rows_out': len(clean),
+        'dropped': dropped,
+        'outliers': outliers,
+        'outliers_dropped': bool(drop_outliers),
+        'coerced_at_read': dict(coerced or {}),
+    }
+    return clean, report
+
+
+def format_report(report):
+    """Human readable lines for the training log."""
+    lines = [f"Data quality: {report['rows_in']} rows in, {report['rows_out']} kept, "
+             f"{report['rows_in'] - report['rows_out']} dropped"]
+    for reason, count in sorted(report['dropped'].items(), key=lambda item: -item[1]):
+        lines.append(f"  - dropped {count:>7} ({reason})")
+    for col, count in sorted(report.get('coerced_at_read', {}).items()):
+        lines.append(f"  - {count:>7} {col} values did not parse and were read as null (counted as missing {col})")
+    for col, info in report['outliers'].items():
+        action = "dropped" if report['outliers_dropped'] else "kept"
+        lines.append(f"  - {info['count']:>7} {col} outliers ({action}) outside "
+                     f"[{info['low']:,.0f}, {info['high']:,.0f}], observed [{info['min']:,.0f}, {info['max']:,.0f}]")
+    return '\n'.join(lines)
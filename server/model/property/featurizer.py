@@ -0,0 +1,102 @@
+import pickle
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+NUMERIC_FEATURES = ['bedrooms', 'toilet', 'garage', 'LT', 'LB']
+LOCATION_PREFIX = 'loc_'
+
+
+class LocationFeaturizer:
+    """
+    Turns raw inputs into model-ready rows for the one-hot random forest.
+    Built once from the feature list in model_features.sav: column positions
+    and a zero row template are precomputed, so each row only needs a copy
+    plus a handful of index writes.
+
+    Batches can also be built as a SciPy CSR matrix (sparse=True): each row
+    stores its numeric values and one location entry instead of hundreds of
+    zeros, which sklearn's forests accept as is.
+    """
+
+    def __init__(self, features):
+        self.features = list(features)
+        self.column_index = {col: i for i, col in enumerate(self.features)}
+
+        missing = [col for col in NUMERIC_FEATURES if col not in self.column_index]
+        if missing:
+            raise ValueError(f"Feature list is missing numeric columns: {', '.join(missing)}")
+        self.numeric_index = np.array([self.column_index[col] for col in NUMERIC_FEATURES])
+
+        # Location name (without the 'loc_' prefix) -> column position
+        self.location_index = {
+            col[len(LOCATION_PREFIX):]: i for i, col in enumerate(self.features) if col.startswith(LOCATION_PREFIX)
+        }
+        self.location_mask = np.array([col.startswith(LOCATION_PREFIX) for col in self.features])
+
+        self._row_template = np.zeros((1, len(self.features)))
+
+    @classmethod
+    def from_file(cls, features_path):
+        with open(features_path, 'rb') as f:
+            return cls(pickle.load(f))
+
+    @property
+    def locations(self):
+        return list(self.location_index)
+
+    def has_location(self, location):
+        return location in self.location_index
+
+    def transform_one(self, location, bedrooms, toilet, garage, LT, LB, as_frame=True):
+        """Builds a single input row. Unknown locations leave every location column at 0."""
+        row = self._row_template.copy()
+        row[0, self.numeric_index] = (bedrooms, toilet, garage, LT, LB)
+        loc_index = self.location_index.get(location)
+        if loc_index is not None:
+            row[0, loc_index] = 1
+        return self.to_frame(row) if as_frame else row
+
+    def transform(self, rows, as_frame=True, sparse=False):
+        """Builds an N-row input matrix from a list of dicts with location and numeric fields."""
+        if sparse:
+            numeric = np.array([[row[col] for col in NUMERIC_FEATURES] for row in rows], dtype=np.float32)
+            positions = np.array([self.location_index.get(row['location'], -1) for row in rows], dtype=np.int64)
+            return self.to_sparse(numeric.reshape(len(rows), len(NUMERIC_FEATURES)), positions)
+        matrix = np.zeros((len(rows), len(self.features)))
+        matrix[:, self.numeric_index] = [[row[col] for col in NUMERIC_FEATURES] for row in rows]
+
+        positions = [self.location_index.get(row['location'], -1) for row in rows]
+        known = np.array([pos >= 0 for pos in positions], dtype=bool)
+        if known.any():
+            matrix[np.flatnonzero(known), np.array(positions)[known]] = 1
+        return self.to_frame(matrix) if as_frame else matrix
+
+    def transform_frame(self, df):
+        """CSR input matrix for a DataFrame with a location column and the numeric columns (training data)."""
+        numeric = df[NUMERIC_FEATURES].to_numpy(dtype=np.float32)
+        positions = df['location'].map(self.location_index).fillna(-1).to_numpy(dtype=np.int64)
+        return self.to_sparse(numeric, positions)
+
+    def to_sparse(self, numeric, positions):
+        """
+        float32 CSR matrix from an (N, 5) numeric array and each row's location
+        column (-1 = unknown location). float32 is what sklearn's trees compare
+        on, so the forest does not copy the matrix again.
+        """
+        n_rows, n_numeric = numeric.shape
+        known = np.flatnonzero(positions >= 0)
+        row_ids = np.concatenate([np.repeat(np.arange(n_rows), n_numeric), known])
+        col_ids = np.concatenate([np.tile(self.numeric_index, n_rows), positions[known]])
+        values = np.concatenate([numeric.ravel(), np.ones(len(known), dtype=np.float32)])
+        matrix = sp.csr_matrix((values, (row_ids, col_ids)), shape=(n_rows, len(self.features)), dtype=np.float32)
+        matrix.eliminate_zeros()
+        return matrix
+
+    def to_frame(self, matrix):
+        """Wraps a matrix with the training column names (the model was fitted on a DataFrame)."""
+        return pd.DataFrame(matrix, columns=self.features, copy=False)
+
+    def to_sparse_frame(self, matrix):
+        """Wraps a CSR matrix with the training column names; it stays sparse (sklearn reads it back as CSR)."""
+        return pd.DataFrame.sparse.from_spmatrix(matrix, columns=self.features)
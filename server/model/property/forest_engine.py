@@ -0,0 +1,167 @@
+"""
+Flattened random forest evaluator for low-latency inference.
+
+RandomForestRegressor.predict validates its input, converts DataFrames and
+dispatches one job per tree to a joblib thread pool (the models are trained
+with n_jobs=-1). For one row that fixed overhead costs far more than walking
+the trees. FlatForest copies the trees into a few contiguous arrays
+
+    feature, threshold, left, right, value   (one entry per node, all trees back to back)
+
+and evaluates all trees of a block of rows at once with NumPy: every step
+moves each (row, tree) cursor one level down, max_depth steps in total. Leaves
+point to themselves, so cursors that arrive early just stay put.
+
+Inputs are cast to float32 and compared with the float64 thresholds, exactly
+like sklearn's trees do, so predictions match sklearn to floating-point
+rounding (the per-tree values are averaged in a different order).
+
+model_artifact.py stores these arrays in the .prfa file, so a FlatForest
+can run directly on the memory-mapped pages without copying them.
+
+The walk costs max_depth gathers per (row, tree), so it wins for the small
+inputs the API sees (single rows, small batches) and loses to sklearn's
+compiled trees on large batches; model_adapter.py sends inputs larger than
+FLAT_MAX_ROWS to sklearn.
+"""
+import warnings
+import numpy as np
+
+ENGINES = ('sklearn', 'flat')
+# Above this many rows sklearn's tree-parallel predict is faster than the NumPy walk
+FLAT_MAX_ROWS = 500
+# Rows evaluated together; keeps the (rows x trees) cursor arrays in cache
+BLOCK_ROWS = 256
+# Per-node arrays stored in a model artifact (plus 'missing_left' when the forest uses it)
+ARRAY_NAMES = ('feature', 'threshold', 'children', 'value', 'roots')
+
+
+class FlatForest:
+    def __init__(self, feature, threshold, children, value, missing_left, roots, max_depth, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = children
+        self.value = value
+        self.missing_left = missing_left
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.block_rows = BLOCK_ROWS
+
+    @classmethod
+    def from_arrays(cls, nodes, values, tree_offsets, tree_max_depth, n_features):
+        """
+        Builds the evaluator from sklearn's node records: the concatenated
+        Tree.__getstate__() 'nodes'/'values' of all trees, as stored in a .prfa artifact.
+        """
+        if values.ndim == 3 and values.shape[1] * values.shape[2] != 1:
+            raise ValueError("Only single-output regression forests are supported")
+        tree_offsets = np.asarray(tree_offsets, dtype=np.int64)
+        base = np.repeat(tree_offsets[:-1], np.diff(tree_offsets))
+        own_index = np.arange(len(nodes), dtype=np.int64)
+
+        is_leaf = nodes['left_child'] < 0
+        left = np.where(is_leaf, own_index, nodes['left_child'] + base)
+        right = np.where(is_leaf, own_index, nodes['right_child'] + base)
+        if 'missing_go_to_left' in nodes.dtype.names:
+            missing_left = nodes['missing_go_to_left'].astype(bool) & ~is_leaf
+        else:
+            missing_left = np.zeros(len(nodes), dtype=bool)
+
+        return cls(
+            feature=np.where(is_leaf, 0, nodes['feature']).astype(np.intp),
+            threshold=np.ascontiguousarray(nodes['threshold'], dtype=np.float64),
+            children=np.stack([left, right], axis=1).ravel().astype(np.intp),
+            value=np.ascontiguousarray(values.reshape(len(nodes)), dtype=np.float64),
+            missing_left=missing_left if missing_left.any() else None,
+            roots=tree_offsets[:-1].astype(np.intp),
+            max_depth=int(np.max(tree_max_depth)),
+            n_features=n_features,
+        )
+
+    @classmethod
+    def from_forest(cls, forest):
+        """Builds the evaluator from a fitted RandomForestRegressor (or another bagged tree regressor)."""
+        states = [tree.tree_.__getstate__() for tree in forest.estimators_]
+        return cls.from_arrays(
+            np.concatenate([state['nodes'] for state in states]),
+            np.concatenate([state['values'] for state in states]),
+            np.cumsum([0] + [state['node_count'] for state in states]),
+            [state['max_depth'] for state in states],
+            forest.n_features_in_,
+        )
+
+    def to_arrays(self):
+        """The arrays to persist (see from_stored)."""
+        arrays = {name: getattr(self, name) for name in ARRAY_NAMES}
+        if self.missing_left is not None:
+            arrays['missing_left'] = self.missing_left
+        return arrays
+
+    @classmethod
+    def from_stored(cls, arrays, max_depth, n_features):
+        """Wraps arrays written by to_arrays() (e.g. np.memmap views of an artifact) without copying them."""
+        return cls(
+            missing_left=np.asarray(arrays['missing_left']) if 'missing_left' in arrays else None,
+            max_depth=int(max_depth),
+            n_features=int(n_features),
+            **{name: np.asarray(arrays[name]) for name in ARRAY_NAMES}
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def left(self):
+        return self.children[0::2]
+
+    def predict(self, X):
+        # Trees compare float32 inputs against float64 thresholds, as sklearn does
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected an (n, {self.n_features}) input, got shape {X.shape}")
+        predictions = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), self.block_rows):
+            block = X[start:start + self.block_rows]
+            # Cursor -> input value via one flat take: row offset + split feature
+            values = block.ravel()
+            row_offsets = (np.arange(len(block)) * self.n_features)[:, None]
+            cursor = np.repeat(self.roots[None, :], len(block), axis=0)
+            for _ in range(self.max_depth):
+                x = values.take(row_offsets + self.feature.take(cursor))
+                go_right = ~(x <= self.threshold.take(cursor))
+                if self.missing_left is not None:
+                    go_right &= ~(np.isnan(x) & self.missing_left.take(cursor))
+                cursor = self.children.take(2 * cursor + go_right)
+            predictions[start:start + len(block)] = self.value.take(cursor).mean(axis=1)
+        return predictions
+
+    def probe_rows(self, count=256, seed=0):
+        """Inputs that land exactly on, and just beside, the split thresholds (for verify)."""
+        rng = np.random.default_rng(seed)
+        X = np.zeros((count, self.n_features), dtype=np.float32)
+        internal = self.left != np.arange(len(self.left))
+        for j in range(self.n_features):
+            thresholds = self.threshold[internal & (self.feature == j)].astype(np.float32)
+            if len(thresholds):
+                picked = rng.choice(thresholds, count)
+                nudge = rng.choice([-1, 0, 1], count)
+                X[:, j] = np.where(nudge == 0, picked,
+                                   np.nextafter(picked, np.where(nudge > 0, np.inf, -np.inf).astype(np.float32)))
+        return X
+
+    def verify(self, forest, X=None, rtol=1e-9):
+        """Raises ValueError unless predictions match forest.predict on X (default: probe_rows)."""
+        X = self.probe_rows() if X is None else np.asarray(X, dtype=np.float32)
+        with warnings.catch_warnings():
+            # Forests fitted on DataFrames warn about the unnamed probe array
+            warnings.simplefilter('ignore', UserWarning)
+            expected = forest.predict(X)
+        actual = self.predict(X)
+        scale = max(1.0, float(np.max(np.abs(expected))))
+        difference = float(np.max(np.abs(actual - expected)))
+        if difference > rtol * scale:
+            raise ValueError(f"Flat forest differs from sklearn by up to {difference:g}")
+        return difference
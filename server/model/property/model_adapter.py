@@ -0,0 +1,280 @@
+"""
+One interface over the two model formats this project produces:
+
+- the one-hot random forest (random_forest_model.sav + model_features.sav),
+  with one loc_ column per location;
+- the label-encoded Pipeline written by train_model.py
+  (property_price_pipeline.joblib), with 6 input columns.
+
+Either can also come from a .prfa artifact (see model_artifact.py); its
+sklearn trees are only rebuilt when sklearn or SHAP needs them.
+Use load_model_adapter() to open any of them; the returned adapter builds
+the model input, predicts and explains in the same way for both.
+
+Predictions run through sklearn, or with engine='flat' through the flattened
+forest from forest_engine.py (checked against sklearn when it is built).
+"""
+import os
+import pickle
+from contextlib import nullcontext
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import shap
+
+import predict_for_api
+from featurizer import LocationFeaturizer, NUMERIC_FEATURES
+from forest_engine import ENGINES, FLAT_MAX_ROWS, FlatForest
+from predict_for_api import EXPLAIN_MODES, format_result, summarize_shap_values
+
+INPUT_COLUMNS = ['location'] + NUMERIC_FEATURES
+
+
+def _span(timer, name):
+    """Timing span on an optional request timer (anything with a span(name) context manager)."""
+    return timer.span(name) if timer is not None else nullcontext()
+
+
+class ModelAdapter:
+    """Common prediction flow; subclasses provide featurize/predict/explain."""
+
+    kind = None
+
+    def __init__(self, model):
+        self.model = model
+        self._explainer = None
+        self.engine = 'sklearn'
+        self.flat_forest = None
+        # The ModelArtifact the model came from, if any (set by load_model_adapter)
+        self.artifact = None
+
+    def use_engine(self, engine):
+        """Selects the prediction engine; 'flat' raises ValueError if it does not match sklearn."""
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of: {', '.join(ENGINES)}")
+        flat_forest = None
+        if engine == 'flat':
+            if self.artifact is not None and self.artifact.has_flat_forest:
+                # Runs on the artifact's mapped arrays; they were checked against sklearn on export
+                flat_forest = self.artifact.flat_forest()
+            else:
+                self.require_trees()
+                flat_forest = FlatForest.from_forest(self.explained_model)
+                flat_forest.verify(self.explained_model)
+        self.engine, self.flat_forest = engine, flat_forest
+        return self
+
+    def require_trees(self):
+        """Artifact models open without their sklearn trees; rebuild them before sklearn is used."""
+        if self.artifact is not None:
+            self.artifact.build_trees()
+
+    def _use_flat(self, n_rows):
+        return self.flat_forest is not None and n_rows <= FLAT_MAX_ROWS
+
+    @property
+    def explainer(self):
+        # Built on first use and then reused for every request
+        if self._explainer is None:
+            self.require_trees()
+            self._explainer = shap.TreeExplainer(self.explained_model)
+        return self._explainer
+
+    @property
+    def explained_model(self):
+        return self.model
+
+    def predict_one(self, location, bedrooms, toilet, garage, LT, LB, explain='exact', timer=None):
+        with _span(timer, 'featurize'):
+            X = self.featurize_one(location, bedrooms, toilet, garage, LT, LB)
+        [result] = self._score(X, explain, timer)
+        return result
+
+    def predict_rows(self, rows, explain='exact', timer=None):
+        if not rows:
+            return []
+        with _span(timer, 'featurize'):
+            X = self.featurize(rows)
+        return self._score(X, explain, timer)
+
+    def _score(self, X, explain, timer=None):
+        if explain not in EXPLAIN_MODES:
+            raise ValueError(f"explain must be one of: {', '.join(EXPLAIN_MODES)}")
+        with _span(timer, 'predict'):
+            predicted_prices = self.predict(X)
+        with _span(timer, 'explain'):
+            explanations = self.explain(X, explain)
+        return [format_result(price, top_feature, feature_importance)
+                for price, (top_feature, feature_importance) in zip(predicted_prices, explanations)]
+
+    def featurize_one(self, location, bedrooms, toilet, garage, LT, LB):
+        return self.featurize([{'location': location, 'bedrooms': bedrooms, 'toilet': toilet,
+                                'garage': garage, 'LT': LT, 'LB': LB}])
+
+    def describe(self):
+        return {"kind": self.kind, "engine": self.engine, "locations": len(self.locations)}
+
+
+class OneHotForestAdapter(ModelAdapter):
+    """The random forest trained on 5 numeric columns plus one loc_ column per location."""
+
+    kind = 'onehot'
+
+    def __init__(self, model, features):
+        super().__init__(model)
+        self.features = list(features)
+        check_features(model, self.features)
+        self.featurizer = LocationFeaturizer(self.features)
+        # random_forest_model.sav was fitted on a DataFrame, train_model.py --encoding onehot on an
+        # unnamed CSR matrix; give each the layout it was fitted on (sklearn warns otherwise)
+        self.named_input = getattr(model, 'feature_names_in_', None) is not None
+
+    @property
+    def locations(self):
+        return self.featurizer.locations
+
+    def featurize_one(self, location, bedrooms, toilet, garage, LT, LB):
+        return self.featurizer.transform_one(location, bedrooms, toilet, garage, LT, LB, as_frame=self.named_input)
+
+    def featurize(self, rows):
+        # Inputs the flat engine does not take go to sklearn as CSR: a fraction of the memory
+        # of the dense frame, and sklearn would copy the frame to float32 anyway
+        return self.featurizer.transform(rows, as_frame=self.named_input, sparse=not self._use_flat(len(rows)))
+
+    def predict(self, X):
+        if self._use_flat(X.shape[0]):
+            return self.flat_forest.predict(X)
+        self.require_trees()
+        if sp.issparse(X) and self.named_input:
+            X = self.featurizer.to_sparse_frame(X)
+        return self.model.predict(X)
+
+    def explain(self, X, explain='exact'):
+        if sp.issparse(X) and explain != 'none':
+            X = self.featurizer.to_frame(X.toarray()) if self.named_input else X.toarray()
+        return predict_for_api.explain_rows(
+            self.model, self.features, X, explain, self.explainer if explain != 'none' else None,
+            self.featurizer.location_mask
+        )
+
+
+class PipelineAdapter(ModelAdapter):
+    """The train_model.py Pipeline: a ColumnTransformer (label-encoded location) and a forest."""
+
+    kind = 'pipeline'
+
+    def __init__(self, pipeline):
+        super().__init__(pipeline)
+        self.preprocessor = pipeline[:-1]
+        self.regressor = pipeline.steps[-1][1]
+
+        # ColumnTransformer maps every input column to one output column, in transformer order
+        column_transformer = pipeline.steps[0][1]
+        self.output_columns = [
+            col for name, transformer, cols in column_transformer.transformers_
+            if transformer != 'drop' and name != 'remainder' for col in cols
+        ]
+        self.location_mask = np.array([col == 'location' for col in self.output_columns])
+
+    @property
+    def explained_model(self):
+        return self.regressor
+
+    @property
+    def features(self):
+        return INPUT_COLUMNS
+
+    @property
+    def locations(self):
+        for name, transformer, cols in self.model.steps[0][1].transformers_:
+            if cols == ['location']:
+                return [str(label) for label in transformer.encoder.classes_]
+        return []
+
+    def featurize(self, rows):
+        return pd.DataFrame({col: [row[col] for row in rows] for col in INPUT_COLUMNS})
+
+    def predict(self, X):
+        if self._use_flat(X.shape[0]):
+            return self.flat_forest.predict(self.preprocessor.transform(X))
+        self.require_trees()
+        return self.model.predict(X)
+
+    def explain(self, X, explain='exact'):
+        if explain == 'none':
+            return [("N/A", [])] * len(X)
+        # SHAP runs on the 6 preprocessed columns the forest actually sees
+        X_transformed = np.asarray(self.preprocessor.transform(X), dtype=float)
+        shap_values = self.explainer.shap_values(X_transformed, approximate=(explain == 'fast'))
+        return summarize_shap_values(self.output_columns, shap_values, self.location_mask)
+
+
+def register_pipeline_classes():
+    """
+    Pipelines pickled by older train_model.py runs reference __main__.SafeLabelEncoder.
+    Make that name resolvable in whatever process loads them.
+    """
+    import __main__
+    from train_model import SafeLabelEncoder
+    if not hasattr(__main__, 'SafeLabelEncoder'):
+        __main__.SafeLabelEncoder = SafeLabelEncoder
+
+
+def check_features(model, features):
+    """Raises ValueError when a feature list does not belong to the one-hot model."""
+    n_features = getattr(model, 'n_features_in_', None)
+    if n_features is not None and n_features != len(features):
+        raise ValueError(f"The model expects {n_features} features but the features file lists {len(features)}")
+    names = getattr(model, 'feature_names_in_', None)
+    if names is not None and list(names) != list(features):
+        raise ValueError("The features file does not list the model's features in training order")
+
+
+def features_path_for(model_path):
+    """
+    Feature list paired with a one-hot model: '<name>_features.sav' next to '<name>.sav' /
+    '<name>.prfa' (as train_model.py writes them), else the default model_features.sav.
+    """
+    candidate = f"{os.path.splitext(model_path)[0]}_features.sav"
+    return candidate if os.path.exists(candidate) else predict_for_api.FEATURES_PATH
+
+
+def adapter_for(model, features=None):
+    """Wraps an already loaded estimator in the matching adapter."""
+    if hasattr(model, 'steps'):
+        return PipelineAdapter(model)
+    if features is None:
+        raise ValueError("The one-hot model needs its feature list (model_features.sav)")
+    return OneHotForestAdapter(model, features)
+
+
+def load_model_adapter(model_path, features_path=None):
+    """
+    Opens a model in any supported format and returns (adapter, artifact).
+    `artifact` is the ModelArtifact for .prfa files and None otherwise.
+    """
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model file not found: '{model_path}'")
+
+    register_pipeline_classes()
+
+    if model_path.endswith('.prfa'):
+        import model_artifact
+        artifact = model_artifact.load_artifact(model_path)
+        adapter = adapter_for(artifact.model, artifact.features)
+        adapter.artifact = artifact
+        return adapter, artifact
+
+    if model_path.endswith('.joblib'):
+        import joblib
+        return adapter_for(joblib.load(model_path)), None
+
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    features = None
+    if not hasattr(model, 'steps'):
+        if features_path is None or not os.path.exists(features_path):
+            raise FileNotFoundError(f"Features file not found: '{features_path}'")
+        with open(features_path, 'rb') as f:
+            features = pickle.load(f)
+    return adapter_for(model, features), None
@@ -0,0 +1,313 @@
+"""
+Compact, versioned model artifact for the tree models.
+
+Layout of a .prfa file (all integers little-endian):
+
+    b'PRFA' | format version (uint32) | header length (uint64) | JSON header | padding | arrays
+
+The JSON header holds the feature list, training metadata, a SHA-256
+checksum of everything after the header, and the offset/dtype/shape of each
+array. The arrays are the forest's node table and leaf values, laid out flat
+(all trees back to back) and aligned to 64 bytes, plus the same trees in the
+layout of the flat engine (forest_engine.py, 'flat_*' arrays, checked against
+sklearn on export).
+
+The estimator itself (forest parameters, or a whole Pipeline around the
+forest) is stored as a small "skeleton" pickle with the trees removed.
+
+Loading only reads the header and the skeleton and np.memmaps the arrays.
+artifact.flat_forest() runs on the mapped pages as they are, so processes
+that serve the same file with the flat engine share one copy of the trees.
+The sklearn trees (needed by the sklearn engine, large batches and SHAP) are
+rebuilt on first use by artifact.build_trees(); sklearn copies the nodes into
+its own buffers, so those are private to each process.
+
+Usage:
+    python model_artifact.py export [--model random_forest_model.sav] [--features model_features.sav]
+                                    [--out random_forest_model.prfa] [--training-rows N] [--mae X]
+    python model_artifact.py info random_forest_model.prfa
+"""
+import argparse
+import copy
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import struct
+import threading
+import numpy as np
+
+from forest_engine import FlatForest
+
+MAGIC = b'PRFA'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREAMBLE = struct.Struct('<4sIQ')
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ARTIFACT_PATH = os.path.join(SCRIPT_DIR, 'random_forest_model.prfa')
+
+
+class ModelArtifact:
+    """
+    A loaded artifact: the estimator (its trees are rebuilt by build_trees()) plus the raw
+    (memory-mapped) tree arrays.
+    """
+
+    def __init__(self, path, header, arrays, model):
+        self.path = path
+        self.header = header
+        self.arrays = arrays
+        self.model = model
+        self.trees_built = False
+        self._lock = threading.Lock()
+
+    @property
+    def features(self):
+        return self.header['features']
+
+    @property
+    def metadata(self):
+        return self.header['metadata']
+
+    @property
+    def checksum(self):
+        return self.header['checksum']
+
+    @property
+    def version(self):
+        """Short model version used for cache invalidation."""
+        return self.checksum[:16]
+
+    @property
+    def has_flat_forest(self):
+        return 'flat' in self.header
+
+    def flat_forest(self):
+        """The flat engine over the mapped 'flat_*' arrays (no copy)."""
+        if not self.has_flat_forest:
+            raise ValueError(f"'{self.path}' has no flat engine arrays, export it again")
+        arrays = {name[len('flat_'):]: array for name, array in self.arrays.items() if name.startswith('flat_')}
+        return FlatForest.from_stored(arrays, self.header['flat']['max_depth'], self.header['flat']['n_features'])
+
+    def build_trees(self):
+        """Rebuilds the sklearn trees of self.model from the node arrays (once)."""
+        if self.trees_built:
+            return self.model
+        with self._lock:
+            if not self.trees_built:
+                rebuild_trees(find_forest(self.model), self.arrays, self.header)
+                self.trees_built = True
+        return self.model
+
+
+def find_forest(estimator):
+    """Returns the tree ensemble of a bare forest or of a Pipeline ending in one."""
+    if hasattr(estimator, 'estimators_'):
+        return estimator
+    if hasattr(estimator, 'steps'):
+        return find_forest(estimator.steps[-1][1])
+    raise TypeError(f"Unsupported estimator type: {type(estimator).__name__}")
+
+
+# --- Export ---
+def export_artifact(estimator, features, path, metadata=None):
+    """Writes `estimator` (a fitted forest or a Pipeline around one) to a .prfa artifact."""
+    import sklearn
+
+    forest = find_forest(estimator)
+    states = [tree.tree_.__getstate__() for tree in forest.estimators_]
+
+    nodes = np.concatenate([state['nodes'] for state in states])
+    values = np.concatenate([state['values'] for state in states])
+    tree_offsets = np.cumsum([0] + [state['node_count'] for state in states]).astype(np.int64)
+    tree_max_depth = np.array([state['max_depth'] for state in states], dtype=np.int64)
+
+    # Pickle the estimator with its trees removed; they are rebuilt from the arrays on load
+    skeleton = copy.deepcopy(estimator) if forest is not estimator else copy.copy(estimator)
+    skeleton_forest = find_forest(skeleton)
+    skeleton_forest.estimators_ = []
+    for tree in forest.estimators_:
+        tree_copy = copy.copy(tree)
+        del tree_copy.tree_
+        skeleton_forest.estimators_.append(tree_copy)
+    skeleton_bytes = np.frombuffer(pickle.dumps(skeleton, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+
+    flat_forest = FlatForest.from_forest(forest)
+    flat_forest.verify(forest)
+
+    arrays = {
+        'nodes': nodes,
+        'values': values,
+        'tree_offsets': tree_offsets,
+        'tree_max_depth': tree_max_depth,
+        'skeleton': skeleton_bytes,
+    }
+    arrays.update({f"flat_{name}": array for name, array in flat_forest.to_arrays().items()})
+
+    # Lay the arrays out back to back, each aligned for memory mapping
+    layout, payload, offset = {}, [], 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        padding = -offset % ALIGNMENT
+        payload.append(b'\0' * padding)
+        offset += padding
+        layout[name] = {
+            'offset': offset,
+            'dtype': np.lib.format.dtype_to_descr(array.dtype),
+            'shape': list(array.shape),
+        }
+        payload.append(array.tobytes())
+        offset += array.nbytes
+    payload = b''.join(payload)
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'sklearn_version': sklearn.__version__,
+        'estimator_type': type(estimator).__name__,
+        'n_estimators': len(forest.estimators_),
+        'n_nodes': int(tree_offsets[-1]),
+        'features': list(features),
+        'flat': {'max_depth': flat_forest.max_depth, 'n_features': flat_forest.n_features},
+        'metadata': metadata or {},
+        'checksum': hashlib.sha256(payload).hexdigest(),
+        'arrays': layout,
+    }
+    header_bytes = json.dumps(header, indent=1).encode('utf-8')
+    header_bytes += b' ' * (-(_PREAMBLE.size + len(header_bytes)) % ALIGNMENT)
+
+    # Write to a temporary file and rename, so watchers never see a half-written artifact
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return header
+
+
+# --- Load ---
+def read_header(path):
+    """Reads only the JSON header (cheap, used to detect a new model version)."""
+    with open(path, 'rb') as f:
+        magic, version, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"'{path}' is not a model artifact")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Artifact format {version} is newer than supported ({FORMAT_VERSION})")
+        header = json.loads(f.read(header_length))
+    header['_data_offset'] = _PREAMBLE.size + header_length
+    return header
+
+
+def load_arrays(path, header=None, mmap=True):
+    """Maps (or reads) the artifact arrays without touching the skeleton pickle."""
+    if header is None:
+        header = read_header(path)
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.lib.format.descr_to_dtype(spec['dtype'])
+        offset = header['_data_offset'] + spec['offset']
+        shape = tuple(spec['shape'])
+        if mmap and int(np.prod(shape)) > 0:
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+        else:
+            count = int(np.prod(shape))
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                arrays[name] = np.fromfile(f, dtype=dtype, count=count).reshape(shape)
+    return arrays
+
+
+def verify_checksum(path, header=None):
+    if header is None:
+        header = read_header(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        f.seek(header['_data_offset'])
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest() == header['checksum']
+
+
+def load_artifact(path, mmap=True, verify=False, build_trees=False):
+    """
+    Opens an artifact: maps its arrays and unpickles the estimator skeleton.
+    The sklearn trees are rebuilt on artifact.build_trees() (or here with build_trees=True).
+    """
+    header = read_header(path)
+    if verify and not verify_checksum(path, header):
+        raise ValueError(f"Checksum mismatch for '{path}', the artifact is corrupted")
+
+    arrays = load_arrays(path, header, mmap=mmap)
+    estimator = pickle.loads(arrays['skeleton'].tobytes())
+    artifact = ModelArtifact(path, header, arrays, estimator)
+    if build_trees:
+        artifact.build_trees()
+    return artifact
+
+
+def rebuild_trees(forest, arrays, header):
+    """Gives every tree of the skeleton forest its sklearn Tree back (sklearn copies the nodes)."""
+    from sklearn.tree._tree import Tree
+
+    offsets, max_depths = arrays['tree_offsets'], arrays['tree_max_depth']
+    n_classes = np.ones(forest.n_outputs_, dtype=np.intp)
+    for i, tree in enumerate(forest.estimators_):
+        start, end = int(offsets[i]), int(offsets[i + 1])
+        tree_ = Tree(forest.n_features_in_, n_classes, forest.n_outputs_)
+        try:
+            tree_.__setstate__({
+                'max_depth': int(max_depths[i]),
+                'node_count': end - start,
+                'nodes': arrays['nodes'][start:end],
+                'values': arrays['values'][start:end],
+            })
+        except ValueError as e:
+            raise ValueError(
+                f"Artifact was written with scikit-learn {header['sklearn_version']} and cannot be loaded "
+                f"by this version, export it again: {str(e)}"
+            )
+        tree.tree_ = tree_
+
+
+# --- Command line ---
+def main():
+    parser = argparse.ArgumentParser(description="Export or inspect a .prfa model artifact")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="Convert a pickled model to an artifact")
+    export_parser.add_argument('--model', default=os.path.join(SCRIPT_DIR, 'random_forest_model.sav'))
+    export_parser.add_argument('--features', default=os.path.join(SCRIPT_DIR, 'model_features.sav'))
+    export_parser.add_argument('--out', default=DEFAULT_ARTIFACT_PATH)
+    export_parser.add_argument('--training-rows', type=int, default=None)
+    export_parser.add_argument('--mae', type=float, default=None)
+
+    info_parser = subparsers.add_parser('info', help="Print an artifact's header")
+    info_parser.add_argument('path', nargs='?', default=DEFAULT_ARTIFACT_PATH)
+    info_parser.add_argument('--verify', action='store_true', help="Also verify the checksum")
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        with open(args.model, 'rb') as f:
+            model = pickle.load(f)
+        with open(args.features, 'rb') as f:
+            features = pickle.load(f)
+        metadata = {'source': os.path.basename(args.model), 'training_rows': args.training_rows, 'mae': args.mae}
+        header = export_artifact(model, features, args.out, metadata)
+        print(f"✅ Exported {header['n_estimators']} trees ({header['n_nodes']} nodes) to '{args.out}'")
+        print(f"Checksum: {header['checksum']}")
+    else:
+        header = read_header(args.path)
+        header.pop('_data_offset')
+        header['features'] = f"{len(header['features'])} features"
+        print(json.dumps(header, indent=2))
+        if args.verify:
+            print("Checksum OK" if verify_checksum(args.path) else "❌ Checksum mismatch")
+
+
+if __name__ == '__main__':
+    main()
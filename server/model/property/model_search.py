@@ -0,0 +1,160 @@
+"""
+Cross-validated hyperparameter search for the price forest, run on all cores.
+
+For each of the k folds the preprocessor (location encoder + imputer) is
+fitted once and both halves are transformed once; every candidate then
+trains a forest on those arrays. All (candidate, fold) fits run in parallel
+through joblib, each forest single-threaded so the pool is the only level of
+parallelism (joblib memory-maps the fold arrays instead of copying them to
+every worker).
+
+Accuracy alone does not pick a model for the API, so after the search every
+candidate is refitted once on the first fold, with the machine otherwise
+idle, to measure its pickled size and its prediction latency (single-row
+calls, like /prediction, and per row in a batch). Candidates that no other
+candidate beats on both MAE and single-row latency form the speed/accuracy
+frontier.
+
+Used by train_model.py --search; see DEFAULT_GRID for the searched values.
+"""
+import itertools
+import pickle
+import time
+import numpy as np
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import KFold
+
+DEFAULT_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [10, 20, None],
+    'min_samples_leaf': [1, 3, 5],
+    'max_features': [1.0, 0.5, 'sqrt'],
+}
+LATENCY_CALLS = 50
+LATENCY_BATCH = 1000
+
+
+def expand_grid(grid):
+    """{'a': [1, 2], 'b': [3]} -> [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]"""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def _as_matrix(X):
+    # Sparse outputs (the one-hot encoder) stay sparse
+    return X if sp.issparse(X) else np.asarray(X, dtype=np.float64)
+
+
+def prepare_folds(X, y, preprocessor, folds=5, random_state=42):
+    """Fits a copy of the preprocessor per fold; returns [(X_train, y_train, X_val, y_val)] as matrices."""
+    prepared = []
+    y = np.asarray(y, dtype=float)
+    for train_index, val_index in KFold(folds, shuffle=True, random_state=random_state).split(X):
+        fold_preprocessor = clone(preprocessor)
+        X_train = _as_matrix(fold_preprocessor.fit_transform(X.iloc[train_index]))
+        X_val = _as_matrix(fold_preprocessor.transform(X.iloc[val_index]))
+        prepared.append((X_train, y[train_index], X_val, y[val_index]))
+    return prepared
+
+
+def _fit_and_score(params, X_train, y_train, X_val, y_val, random_state):
+    started = time.perf_counter()
+    model = RandomForestRegressor(random_state=random_state, n_jobs=1, **params).fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+    predictions = model.predict(X_val)
+    return mean_absolute_error(y_val, predictions), r2_score(y_val, predictions), fit_seconds
+
+
+def measure_model(params, X_train, y_train, X_val, random_state=42):
+    """Pickled size and prediction latency of one candidate, fitted on one fold."""
+    model = RandomForestRegressor(random_state=random_state, n_jobs=-1, **params).fit(X_train, y_train)
+    # Serving predicts in the request thread, time it that way
+    model.set_params(n_jobs=1)
+    row = X_val[:1]
+    model.predict(row)
+    timings = []
+    for _ in range(LATENCY_CALLS):
+        started = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - started)
+    batch = X_val[np.arange(LATENCY_BATCH) % X_val.shape[0]]
+    started = time.perf_counter()
+    model.predict(batch)
+    batch_seconds = time.perf_counter() - started
+    return {
+        'size_bytes': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+        'nodes': int(sum(tree.tree_.node_count for tree in model.estimators_)),
+        'row_latency_ms': float(np.median(timings)) * 1000,
+        'batch_row_latency_us': batch_seconds / LATENCY_BATCH * 1e6,
+    }
+
+
+def frontier(results):
+    """Marks candidates not beaten on both MAE and single-row latency by another one."""
+    for result in results:
+        result['frontier'] = not any(
+            other['mae'] <= result['mae'] and other['row_latency_ms'] <= result['row_latency_ms']
+            and (other['mae'] < result['mae'] or other['row_latency_ms'] < result['row_latency_ms'])
+            for other in results
+        )
+    return results
+
+
+def search(X, y, preprocessor, grid=None, folds=5, n_jobs=-1, random_state=42, verbose=0):
+    """
+    Runs the search and returns one result dict per candidate, best MAE first:
+    params, mean/std MAE and R² over the folds, fit time, size, latency, frontier.
+    """
+    candidates = expand_grid(grid or DEFAULT_GRID)
+    prepared = prepare_folds(X, y, preprocessor, folds, random_state)
+    print(f"[SEARCH] {len(candidates)} candidates x {folds} folds = {len(candidates) * folds} fits "
+          f"(n_jobs={n_jobs})")
+
+    started = time.perf_counter()
+    scores = Parallel(n_jobs=n_jobs, verbose=verbose)(
+        delayed(_fit_and_score)(params, *fold, random_state) for params in candidates for fold in prepared
+    )
+    print(f"[SEARCH] Cross-validation finished in {time.perf_counter() - started:.1f}s")
+
+    results = []
+    X_train, y_train, X_val, _ = prepared[0]
+    for i, params in enumerate(candidates):
+        fold_scores = np.array(scores[i * folds:(i + 1) * folds])
+        result = {
+            'params': params,
+            'mae': float(fold_scores[:, 0].mean()),
+            'mae_std': float(fold_scores[:, 0].std()),
+            'r2': float(fold_scores[:, 1].mean()),
+            'fit_seconds': float(fold_scores[:, 2].mean()),
+        }
+        result.update(measure_model(params, X_train, y_train, X_val, random_state))
+        results.append(result)
+    return sorted(frontier(results), key=lambda result: result['mae'])
+
+
+def choose(results, tolerance=0.0):
+    """The fastest (single-row latency) candidate whose MAE is within `tolerance` (relative) of the best."""
+    best_mae = min(result['mae'] for result in results)
+    eligible = [result for result in results if result['mae'] <= best_mae * (1 + tolerance)]
+    return min(eligible, key=lambda result: (result['row_latency_ms'], result['mae']))
+
+
+def format_params(params):
+    return ' '.join(f"{name}={value}" for name, value in sorted(params.items()))
+
+
+def format_results(results, chosen=None):
+    lines = [f"{'':2}{'MAE (Rp)':>16} {'± std':>14} {'R²':>6} {'size MB':>8} {'row ms':>7} {'batch µs/row':>12}  params"]
+    for result in results:
+        mark = '>' if result is chosen else ('*' if result['frontier'] else ' ')
+        lines.append(
+            f"{mark:2}{result['mae']:>16,.0f} {result['mae_std']:>14,.0f} {result['r2']:>6.3f} "
+            f"{result['size_bytes'] / 1024 / 1024:>8.1f} {result['row_latency_ms']:>7.2f} "
+            f"{result['batch_row_latency_us']:>12.1f}  {format_params(result['params'])}"
+        )
+    lines.append("  * speed/accuracy frontier, > chosen")
+    return '\n'.join(lines)
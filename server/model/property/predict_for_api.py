@@ -1,7 +1,6 @@
 import sys, pickle, pandas as pd, shap, numpy as np, os, json, warnings
+from featurizer import LocationFeaturizer
 
-# Suppress warnings
-warnings.filterwarnings("ignore")
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3' 
 
 # --- NEW: Define absolute paths based on this script's location ---
@@ -21,48 +20,84 @@ def load_model_files(model_path, features_path):
         features = pickle.load(f)
     return model, features
 
-# --- Prediction Logic (No changes needed) ---
-def get_prediction_and_analysis(model, features, location, bedrooms, toilet, garage, LT, LB):
-    input_data_numeric = pd.DataFrame({'bedrooms': [bedrooms], 'toilet': [toilet], 'garage': [garage], 'LT': [LT], 'LB': [LB]})
-    target_location_col = f'loc_{location}'
-    all_location_cols = [col for col in features if col.startswith('loc_')]
-    location_df = pd.DataFrame({col: [1 if col == target_location_col else 0] for col in all_location_cols})
-    input_data = pd.concat([input_data_numeric, location_df], axis=1)
-    
-    for col in features:
-        if col not in input_data.columns:
-            input_data[col] = 0
-    input_data = input_data[features]
-    
-    predicted_price = model.predict(input_data)[0]
-    
-    explainer = shap.TreeExplainer(model)
-    shap_values = explainer.shap_values(input_data)
-    abs_contrib = np.abs(shap_values[0])
-    contribution_df = pd.DataFrame({'Feature': features, 'Contribution': abs_contrib})
-    loc_contrib = contribution_df[contribution_df['Feature'].str.startswith('loc_')]['Contribution'].sum()
-    main_contrib = contribution_df[~contribution_df['Feature'].str.startswith('loc_')].copy()
-    loc_df = pd.DataFrame({'Feature': ['Location'], 'Contribution': [loc_contrib]})
-    main_contrib = pd.concat([main_contrib, loc_df], ignore_index=True)
-    total_contribution = main_contrib['Contribution'].sum()
-    main_contrib['Percentage'] = (main_contrib['Contribution'] / total_contribution) * 100 if total_contribution > 0 else 0.0
-    main_contrib = main_contrib.sort_values(by='Percentage', ascending=False)
-    
-    feature_importance = main_contrib[['Feature', 'Percentage']].to_dict('records')
-    top_feature = main_contrib.iloc[0]['Feature'] if not main_contrib.empty else "N/A"
+# --- Explanation Logic ---
+# 'exact' runs TreeSHAP, 'fast' uses the approximate (Saabas) attributions, 'none' skips explanation
+EXPLAIN_MODES = ('none', 'fast', 'exact')
+
+def summarize_shap_values(features, shap_values, location_mask=None):
+    """Collapses per-feature SHAP values into per-row (top_feature, feature_importance) pairs,
+    folding every loc_ column into a single 'Location' entry."""
+    abs_contrib = np.abs(np.asarray(shap_values))
+    if location_mask is None:
+        location_mask = np.array([col.startswith('loc_') for col in features])
+    names = [col for col, is_loc in zip(features, location_mask) if not is_loc] + ['Location']
+    contrib = np.column_stack([abs_contrib[:, ~location_mask], abs_contrib[:, location_mask].sum(axis=1)])
+
+    totals = contrib.sum(axis=1, keepdims=True)
+    percentages = np.divide(contrib * 100, totals, out=np.zeros_like(contrib), where=totals > 0)
+    order = np.argsort(-percentages, axis=1, kind='stable')
+
+    summaries = []
+    for row_pct, row_order in zip(percentages, order):
+        feature_importance = [{"Feature": names[j], "Percentage": float(row_pct[j])} for j in row_order]
+        summaries.append((names[row_order[0]], feature_importance))
+    return summaries
 
+def explain_rows(model, features, input_data, explain='exact', explainer=None, location_mask=None):
+    """Returns one (top_feature, feature_importance) pair per input row."""
+    if explain not in EXPLAIN_MODES:
+        raise ValueError(f"explain must be one of: {', '.join(EXPLAIN_MODES)}")
+    if explain == 'none':
+        return [("N/A", [])] * input_data.shape[0]
+    if explainer is None:
+        explainer = shap.TreeExplainer(model)
+    shap_values = explainer.shap_values(input_data, approximate=(explain == 'fast'))
+    return summarize_shap_values(features, shap_values, location_mask)
+
+def format_result(predicted_price, top_feature, feature_importance):
     return {
-        "predicted_price_raw": predicted_price,
+        "predicted_price_raw": float(predicted_price),
         "predicted_price_formatted": f"Rp {predicted_price:,.0f}",
         "most_influential_feature": top_feature,
         "feature_importance": feature_importance
     }
 
+# --- Prediction Logic ---
+# Pass a prebuilt explainer/featurizer to reuse them across calls (e.g. from the API server)
+def get_prediction_and_analysis(model, features, location, bedrooms, toilet, garage, LT, LB, explainer=None, featurizer=None, explain='exact'):
+    if featurizer is None:
+        featurizer = LocationFeaturizer(features)
+    input_data = featurizer.transform_one(location, bedrooms, toilet, garage, LT, LB)
+    
+    predicted_price = model.predict(input_data)[0]
+    [(top_feature, feature_importance)] = explain_rows(model, features, input_data, explain, explainer, featurizer.location_mask)
+
+    return format_result(predicted_price, top_feature, feature_importance)
+
+# --- Batch Prediction Logic ---
+def get_batch_predictions_and_analysis(model, features, rows, explainer=None, featurizer=None, explain='exact'):
+    """Scores many inputs with a single model.predict and a single SHAP call."""
+    if not rows:
+        return []
+    if featurizer is None:
+        featurizer = LocationFeaturizer(features)
+    input_data = featurizer.transform(rows)
+
+    predicted_prices = model.predict(input_data)
+    explanations = explain_rows(model, features, input_data, explain, explainer, featurizer.location_mask)
+
+    return [format_result(price, top_feature, feature_importance)
+            for price, (top_feature, feature_importance) in zip(predicted_prices, explanations)]
+
 if __name__ == "__main__":
+    # Suppress warnings (stdout of the CLI must stay pure JSON); the server imports this module
+    # in-process and keeps its warnings
+    warnings.filterwarnings("ignore")
     try:
         # --- 1. Parse Arguments ---
-        if len(sys.argv) != 7:
-            raise ValueError("Incorrect number of arguments. Expected 6.")
+        # Optional 7th argument: explanation mode (none|fast|exact)
+        if len(sys.argv) not in (7, 8):
+            raise ValueError("Incorrect number of arguments. Expected 6 (plus optional explain mode).")
         
         location = sys.argv[1]
         bedrooms = int(sys.argv[2])
@@ -70,13 +105,14 @@ if __name__ == "__main__":
         garage = int(sys.argv[4])
         LT = float(sys.argv[5])
         LB = float(sys.argv[6])
+        explain = sys.argv[7] if len(sys.argv) == 8 else 'exact'
         
         # --- 2. Load Model ---
         # MODIFIED: Use the absolute paths defined at the top
         model, features = load_model_files(MODEL_PATH, FEATURES_PATH)
         
         # --- 3. Get Result ---
-        result = get_prediction_and_analysis(model, features, location, bedrooms, toilet, garage, LT, LB)
+        result = get_prediction_and_analysis(model, features, location, bedrooms, toilet, garage, LT, LB, explain=explain)
         
         # --- 4. Print FINAL JSON to stdout ---
         print(json.dumps(result))
@@ -1,9 +1,9 @@
 import sys
 import pickle
-import pandas as pd
 import shap
-import numpy as np
 import os # Added to check for file existence
+from featurizer import LocationFeaturizer
+from predict_for_api import summarize_shap_values
 
 # --- Helper Function to Load Files ---
 def load_model_files(model_path, features_path):
@@ -30,44 +30,20 @@ def load_model_files(model_path, features_path):
         sys.exit(1)
 
 # --- Main Prediction Function ---
-def predict_price(model, features, location, bedrooms, toilet, garage, LT, LB):
+def predict_price(model, features, location, bedrooms, toilet, garage, LT, LB, featurizer=None, explainer=None):
     """
     Prepares the input data, runs the prediction, and prints the analysis.
     """
     
     # === 1. Prepare Input Data ===
-    # This logic is identical to your Streamlit app
-    
-    # Create the base numeric feature DataFrame
-    input_data_numeric = pd.DataFrame({
-        'bedrooms': [bedrooms],
-        'toilet': [toilet],
-        'garage': [garage],
-        'LT': [LT],
-        'LB': [LB]
-    })
-    
-    # Create the one-hot encoded location DataFrame
-    target_location_col = f'loc_{location}'
-    all_location_cols = [col for col in features if col.startswith('loc_')]
+    if featurizer is None:
+        featurizer = LocationFeaturizer(features)
 
-    if target_location_col not in all_location_cols:
+    if not featurizer.has_location(location):
         print(f"\nWarning: Location '{location}' was not found in the model's training data.")
         print("Model will treat this as an unknown location (all location features set to 0).")
-        
-    location_df = pd.DataFrame({
-        col: [1 if col == target_location_col else 0] for col in all_location_cols
-    })
-
-    # Combine both dataframes
-    input_data = pd.concat([input_data_numeric, location_df], axis=1)
 
-    # Ensure all original features exist and are in the correct order
-    for col in features:
-        if col not in input_data.columns:
-            input_data[col] = 0
-    
-    input_data = input_data[features] # Final, model-ready DataFrame
+    input_data = featurizer.transform_one(location, bedrooms, toilet, garage, LT, LB) # Final, model-ready DataFrame
 
     # === 2. Run Prediction ===
     try:
@@ -79,40 +55,20 @@ def predict_price(model, features, location, bedrooms, toilet, garage, LT, LB):
         print("\n--- Feature Influence ---")
         
         # Note: You must have 'shap' installed: pip install shap
-        explainer = shap.TreeExplainer(model)
+        if explainer is None:
+            explainer = shap.TreeExplainer(model)
         shap_values = explainer.shap_values(input_data)
 
-        # Get absolute contribution per feature for this prediction
-        abs_contrib = np.abs(shap_values[0])
-        contribution_df = pd.DataFrame({
-            'Feature': features,
-            'Contribution': abs_contrib
-        })
-
-        # Combine all 'loc_' columns into a single 'Location' feature
-        loc_contrib = contribution_df[contribution_df['Feature'].str.startswith('loc_')]['Contribution'].sum()
-        main_contrib = contribution_df[~contribution_df['Feature'].str.startswith('loc_')].copy()
-        
-        # Use pd.concat to add the combined Location contribution
-        loc_df = pd.DataFrame({'Feature': ['Location'], 'Contribution': [loc_contrib]})
-        main_contrib = pd.concat([main_contrib, loc_df], ignore_index=True)
-
-        # Normalize to percentage
-        total_contribution = main_contrib['Contribution'].sum()
-        if total_contribution > 0:
-            main_contrib['Percentage'] = (main_contrib['Contribution'] / total_contribution) * 100
-        else:
-            main_contrib['Percentage'] = 0.0 # Avoid division by zero
-            
-        main_contrib = main_contrib.sort_values(by='Percentage', ascending=False)
+        # Combine all 'loc_' columns into a single 'Location' feature and normalize to percentage
+        [(top_feature, feature_importance)] = summarize_shap_values(features, shap_values, featurizer.location_mask)
 
         # Display as a text-based list
-        for _, row in main_contrib.iterrows():
-            if row['Percentage'] > 0:
-                print(f"- {row['Feature']}: {row['Percentage']:.1f}%")
+        for item in feature_importance:
+            if item['Percentage'] > 0:
+                print(f"- {item['Feature']}: {item['Percentage']:.1f}%")
 
-        top_feature = main_contrib.iloc[0]
-        print(f"\nMost influential factor: **{top_feature['Feature']}** ({top_feature['Percentage']:.1f}%)")
+        top_percentage = feature_importance[0]['Percentage']
+        print(f"\nMost influential factor: **{top_feature}** ({top_percentage:.1f}%)")
 
     except Exception as e:
         print(f"An error occurred during prediction or analysis: {str(e)}")
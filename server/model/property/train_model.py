@@ -9,8 +9,26 @@ from sklearn.metrics import mean_absolute_error
 from sklearn.base import BaseEstimator, TransformerMixin
 import numpy as np
 import joblib
+import pickle
+import argparse
+import json
 import sys
 import os
+from model_artifact import export_artifact
+from data_cleaning import clean_listings, format_report
+from featurizer import LocationFeaturizer, LOCATION_PREFIX
+
+# The listings schema (column types, "N/A" handling, region partitions) lives with the scraper
+SCRAPER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'scraper', 'rumah123')
+if SCRAPER_DIR not in sys.path:
+    sys.path.insert(0, SCRAPER_DIR)
+from listing_schema import read_listings
+
+TRAINING_COLUMNS = ['price', 'location', 'LT', 'LB', 'bedrooms', 'toilet', 'garage']
+NUMERIC_FEATURES = ['bedrooms', 'toilet', 'garage', 'LT', 'LB']
+# Forest settings used without --search
+DEFAULT_FOREST_PARAMS = {'n_estimators': 100, 'max_depth': 10, 'min_samples_split': 5}
+
 
 # --- Custom SafeLabelEncoder (Handles unseen labels and 2D input) ---
 class SafeLabelEncoder(BaseEstimator, TransformerMixin):
@@ -42,57 +60,95 @@ class SafeLabelEncoder(BaseEstimator, TransformerMixin):
 
         X_flat = x_series.astype(str)
 
-        # Apply transformation using map
-        transformed = X_flat.map(lambda item: self.encoder.transform([item])[0] if item in self.classes_ else self.unseen_value_)
+        # Look up every label in one pass: encoder.classes_ is sorted, so a label's
+        # position in it is exactly its LabelEncoder code. Unseen labels come back as -1.
+        codes = pd.Index(self.encoder.classes_).get_indexer(X_flat)
+        codes = np.where(codes >= 0, codes, self.unseen_value_).astype(np.int64)
 
-        # Convert Series to numpy array and reshape
-        output_array = transformed.to_numpy().reshape(-1, 1)
+        # Reshape to a column vector
+        output_array = codes.reshape(-1, 1)
         return output_array
 
+# --- One-hot location encoding (the random_forest_model.sav layout) as a sparse matrix ---
+class OneHotLocationEncoder(BaseEstimator, TransformerMixin):
+    """
+    Numeric columns plus one loc_ column per training location, returned as a
+    float32 CSR matrix by featurizer.LocationFeaturizer. A row stores 5-6
+    values instead of hundreds of mostly-zero columns.
+    """
+
+    def fit(self, X, y=None):
+        locations = sorted(X['location'].astype(str).unique())
+        self.features_ = NUMERIC_FEATURES + [LOCATION_PREFIX + location for location in locations]
+        self.featurizer_ = LocationFeaturizer(self.features_)
+        return self
+
+    def transform(self, X, y=None):
+        return self.featurizer_.transform_frame(X)
+
+
+def build_preprocessor():
+    return ColumnTransformer(
+        transformers=[
+            # Pass the single column name 'location'
+            ('loc_encoder', SafeLabelEncoder(), ['location']),
+            # Apply imputer only to numeric features
+            ('num_imputer', SimpleImputer(strategy='median'), NUMERIC_FEATURES)
+        ],
+        remainder='passthrough'
+    )
+
 # --- Main Training Logic ---
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("❌ Error: Please provide the input CSV filename as an argument.")
-        print("Usage: python train_model.py <your_data.csv>")
-        sys.exit(1)
-
-    csv_filename = sys.argv[1]
-    if not os.path.exists(csv_filename):
-        print(f"❌ Error: File '{csv_filename}' not found.")
+    # Use the importable class so the saved pipeline references train_model.SafeLabelEncoder
+    # (not __main__.SafeLabelEncoder) and can be loaded by the API server
+    from train_model import SafeLabelEncoder
+
+    parser = argparse.ArgumentParser(description="Train the property price pipeline")
+    parser.add_argument('data', help="Listings: a CSV file, a Parquet file or a Parquet dataset folder")
+    parser.add_argument('--regions', help="Comma separated regions to train on (default: all)")
+    parser.add_argument('--encoding', choices=['label', 'onehot'], default='label',
+                        help="Location encoding: 'label' trains the pipeline, 'onehot' a forest on one sparse "
+                             "loc_ column per location (served like random_forest_model.sav)")
+    parser.add_argument('--drop-outliers', action='store_true', help="Also drop price/LT/LB outliers")
+    parser.add_argument('--quality-report', help="Write the data-quality report to this JSON file")
+    parser.add_argument('--search', action='store_true',
+                        help="Pick the forest settings with a cross-validated search (see model_search.py)")
+    parser.add_argument('--folds', type=int, default=5, help="Cross-validation folds for --search")
+    parser.add_argument('--jobs', type=int, default=-1, help="Parallel fits for --search (-1: all cores)")
+    parser.add_argument('--grid', help="JSON file with the values to search, e.g. {\"max_depth\": [10, 20]}")
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help="Pick the fastest candidate within this relative MAE of the best (e.g. 0.02)")
+    parser.add_argument('--search-report', help="Write all search results to this JSON file")
+    args = parser.parse_args()
+
+    data_path = args.data
+    regions = [region.strip() for region in args.regions.split(',')] if args.regions else None
+    if not os.path.exists(data_path):
+        print(f"❌ Error: File '{data_path}' not found.")
         sys.exit(1)
 
     try:
-        df = pd.read_csv(csv_filename)
-        print(f"Loaded {len(df)} rows from '{csv_filename}'")
+        # Only the training columns; with regions a Parquet dataset skips the other regions' files
+        coerced = {}
+        df = read_listings(data_path, columns=TRAINING_COLUMNS, regions=regions, coerced=coerced)
+        print(f"Loaded {len(df)} rows from '{data_path}'" + (f" (regions: {', '.join(regions)})" if regions else ""))
     except Exception as e:
-        print(f"❌ Error loading data from '{csv_filename}': {e}")
+        print(f"❌ Error loading data from '{data_path}': {e}")
         sys.exit(1)
 
     print("Cleaning data...")
-    required_cols = ['price', 'location', 'LT', 'LB', 'bedrooms', 'toilet', 'garage']
+    required_cols = TRAINING_COLUMNS
     if not all(col in df.columns for col in required_cols):
-        print(f"❌ Error: Input CSV must contain the columns: {', '.join(required_cols)}")
+        print(f"❌ Error: Input data must contain the columns: {', '.join(required_cols)}")
         sys.exit(1)
 
-    # Convert location to string first before dropping NA based on it
-    df['location'] = df['location'].astype(str)
-    df.dropna(subset=required_cols, how='any', inplace=True)
-
-    numeric_cols = ['price', 'LT', 'LB', 'bedrooms', 'toilet', 'garage']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    df.dropna(subset=numeric_cols, how='any', inplace=True) # Drop again after coercion
-    df.replace([np.inf, -np.inf], np.nan, inplace=True)
-    df.dropna(subset=numeric_cols, how='any', inplace=True) # Drop again after inf replacement
-
-    # Final type casting
-    df['price'] = df['price'].astype(float)
-    int_cols = ['bedrooms', 'toilet', 'garage']
-    for col in int_cols:
-        df[col] = df[col].astype(int)
-    float_cols = ['LT', 'LB']
-    for col in float_cols:
-        df[col] = df[col].astype(float)
+    df, quality_report = clean_listings(df, drop_outliers=args.drop_outliers, coerced=coerced)
+    print(format_report(quality_report))
+    if args.quality_report:
+        with open(args.quality_report, 'w', encoding='utf-8') as f:
+            json.dump(quality_report, f, indent=2)
+        print(f"Data quality report saved to '{args.quality_report}'")
 
     print(f"Data cleaned. Remaining rows for training: {len(df)}")
     if len(df) < 10:
@@ -105,39 +161,87 @@ if __name__ == "__main__":
     y = df[target].copy() # y is already a pandas Series (1D)
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    make_preprocessor = OneHotLocationEncoder if args.encoding == 'onehot' else build_preprocessor
     print(f"Data split: {len(X_train)} training samples, {len(X_test)} testing samples.")
 
-    # Define numeric features for the imputer
-    numeric_features = ['bedrooms', 'toilet', 'garage', 'LT', 'LB']
-
-    preprocessor = ColumnTransformer(
-        transformers=[
-            # Pass the single column name 'location'
-            ('loc_encoder', SafeLabelEncoder(), ['location']),
-            # Apply imputer only to numeric features
-            ('num_imputer', SimpleImputer(strategy='median'), numeric_features)
-        ],
-        remainder='passthrough'
-    )
-
-    rf_model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1, max_depth=10, min_samples_split=5)
-
-    pipeline = Pipeline(steps=[('preprocessor', preprocessor),
-                               ('regressor', rf_model)])
+    forest_params = dict(DEFAULT_FOREST_PARAMS)
+    search_summary = None
+    if args.search:
+        import model_search
+        grid = None
+        if args.grid:
+            with open(args.grid, 'r', encoding='utf-8') as f:
+                grid = json.load(f)
+        # The test split stays out of the search
+        results = model_search.search(X_train, y_train, make_preprocessor(), grid=grid, folds=args.folds,
+                                      n_jobs=args.jobs)
+        chosen = model_search.choose(results, args.tolerance)
+        print(model_search.format_results(results, chosen))
+        forest_params = dict(chosen['params'])
+        search_summary = {'folds': args.folds, 'candidates': len(results), 'cv_mae': chosen['mae'],
+                          'row_latency_ms': chosen['row_latency_ms']}
+        print(f"Chosen: {model_search.format_params(forest_params)} (CV MAE Rp {chosen['mae']:,.0f}, "
+              f"{chosen['row_latency_ms']:.2f} ms per single-row prediction)")
+        if args.search_report:
+            with open(args.search_report, 'w', encoding='utf-8') as f:
+                json.dump({'chosen': chosen, 'results': results}, f, indent=2)
+            print(f"Search results saved to '{args.search_report}'")
+
+    preprocessor = make_preprocessor()
+    rf_model = RandomForestRegressor(random_state=42, n_jobs=-1, **forest_params)
 
     print("Training the Random Forest model...")
-    pipeline.fit(X_train, y_train) # Pass y_train as is (it's a Series)
+    if args.encoding == 'onehot':
+        # The forest is saved on its own with its feature list, like random_forest_model.sav
+        X_train_matrix = preprocessor.fit_transform(X_train)
+        rows, columns = X_train_matrix.shape
+        sparse_mb = sum(part.nbytes for part in (X_train_matrix.data, X_train_matrix.indices,
+                                                 X_train_matrix.indptr)) / 1024 / 1024
+        print(f"One-hot matrix: {columns} columns, {X_train_matrix.nnz} stored values "
+              f"({sparse_mb:.1f} MB, {rows * columns * 4 / 1024 / 1024:.1f} MB as a dense float32 array)")
+        rf_model.fit(X_train_matrix, y_train)
+        model, model_features = rf_model, preprocessor.features_
+        X_test_input = preprocessor.transform(X_test)
+    else:
+        model = Pipeline(steps=[('preprocessor', preprocessor),
+                                ('regressor', rf_model)])
+        model.fit(X_train, y_train) # Pass y_train as is (it's a Series)
+        model_features, X_test_input = features, X_test
     print("Training complete.")
 
     print("\nEvaluating model performance on the test set...")
+    mae = None
     try:
-        predictions = pipeline.predict(X_test)
+        predictions = model.predict(X_test_input)
         predictions = np.nan_to_num(predictions, nan=np.nanmedian(y_train), posinf=np.nanmax(y_train), neginf=np.nanmin(y_train))
         mae = mean_absolute_error(y_test, predictions)
         print(f"Mean Absolute Error on Test Set: Rp {mae:,.0f}")
     except Exception as e:
         print(f"An error occurred during evaluation: {e}")
 
-    pipeline_filename = 'property_price_pipeline.joblib'
-    joblib.dump(pipeline, pipeline_filename)
-    print(f"\n✅ Trained pipeline saved to '{pipeline_filename}'")
\ No newline at end of file
+    if args.encoding == 'onehot':
+        model_filename, features_filename = 'property_price_onehot.sav', 'property_price_onehot_features.sav'
+        with open(model_filename, 'wb') as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(features_filename, 'wb') as f:
+            pickle.dump(model_features, f)
+        print(f"\n✅ Trained forest saved to '{model_filename}' (features: '{features_filename}')")
+        artifact_filename = 'property_price_onehot.prfa'
+    else:
+        pipeline_filename = 'property_price_pipeline.joblib'
+        joblib.dump(model, pipeline_filename)
+        print(f"\n✅ Trained pipeline saved to '{pipeline_filename}'")
+        artifact_filename = 'property_price_pipeline.prfa'
+
+    # Also write a memory-mappable artifact that records how the model was trained
+    export_artifact(model, model_features, artifact_filename, metadata={
+        'source': os.path.basename(os.path.normpath(data_path)),
+        'regions': regions,
+        'encoding': args.encoding,
+        'training_rows': len(X_train),
+        'test_rows': len(X_test),
+        'mae': mae,
+        'forest_params': forest_params,
+        'search': search_summary,
+    })
+    print(f"✅ Model artifact saved to '{artifact_filename}'")
\ No newline at end of file
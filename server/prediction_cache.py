@@ -0,0 +1,178 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(location, bedrooms, toilet, garage, LT, LB, explain='exact'):
+    """
+    Normalizes a prediction input so equivalent requests share one entry.
+    The key doubles as the normalized input, predictions must be computed from it.
+    """
+    return (' '.join(str(location).split()), int(bedrooms), int(toilet), int(garage), float(LT), float(LB), explain)
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache for prediction results, with an optional TTL.
+
+    Entries belong to one model version (a hash of the model files); switching
+    the version drops everything. An optional shared backend (see
+    SQLiteCacheBackend) lets several worker processes reuse each other's entries.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=None, backend=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds or None
+        self.backend = backend
+        self.model_version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def set_model_version(self, model_version):
+        """Invalidates all local entries when the model changes."""
+        with self._lock:
+            if model_version != self.model_version:
+                self._entries.clear()
+                self.model_version = model_version
+        if self.backend is not None:
+            self.backend.prune(model_version)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl_seconds is None or now - stored_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+
+        if self.backend is not None:
+            value = self.backend.get(self.model_version, key, self.ttl_seconds)
+            if value is not None:
+                self._store(key, value, now)
+                with self._lock:
+                    self.shared_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        self._store(key, value, time.time())
+        if self.backend is not None:
+            self.backend.set(self.model_version, key, value)
+
+    def _store(self, key, value, stored_at):
+        with self._lock:
+            self._entries[key] = (value, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "model_version": self.model_version,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+                "shared_backend": self.backend.path if self.backend is not None else None
+            }
+
+
+class SQLiteCacheBackend:
+    """
+    Prediction cache stored in a local SQLite file, shared by all worker
+    processes on the same machine. Rows are keyed by model version, so
+    workers running different models never see each other's results.
+    """
+
+    def __init__(self, path, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                " model_version TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, stored_at REAL NOT NULL,"
+                " PRIMARY KEY (model_version, key))"
+            )
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads or forked processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, model_version, key, ttl_seconds=None):
+        try:
+            row = self._connect().execute(
+                "SELECT value, stored_at FROM predictions WHERE model_version = ? AND key = ?",
+                (model_version, json.dumps(key))
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[CACHE WARNING] Shared cache read failed: {str(e)}")
+            return None
+        if row is None or (ttl_seconds and time.time() - row[1] >= ttl_seconds):
+            return None
+        return json.loads(row[0])
+
+    def set(self, model_version, key, value):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO predictions (model_version, key, value, stored_at) VALUES (?, ?, ?, ?)",
+                    (model_version, json.dumps(key), json.dumps(value), time.time())
+                )
+            self._writes += 1
+            # Trim the oldest rows now and then instead of on every write
+            if self._writes % 1000 == 0:
+                self.prune(model_version)
+        except sqlite3.Error as e:
+            print(f"[CACHE WARNING] Shared cache write failed: {str(e)}")
+
+    def prune(self, model_version):
+        """Drops rows of other model versions and keeps at most max_entries rows."""
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM predictions WHERE model_version != ?", (model_version,))
+                conn.execute(
+                    "DELETE FROM predictions WHERE rowid IN ("
+                    " SELECT rowid FROM predictions ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        except sqlite3.Error as e:
+            print(f"[CACHE WARNING] Shared cache prune failed: {str(e)}")
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import sys
+import time
+
+# Get the directory where this script is located
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, 'model', 'property')
+
+# The model scripts live next to the model files, make them importable
+if MODEL_DIR not in sys.path:
+    sys.path.insert(0, MODEL_DIR)
+
+import predict_for_api
+import model_artifact
+from model_adapter import load_model_adapter, features_path_for
+from prediction_cache import make_cache_key
+from location_index import LocationIndex
+
+# --- Warm-up input (any valid request shape works, location is filled at load time) ---
+WARMUP_INPUT = {'bedrooms': 3, 'toilet': 2, 'garage': 1, 'LT': 100.0, 'LB': 120.0}
+
+
+def compute_model_version(*paths):
+    """Short content hash of the model files, used to tell model versions apart."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+class PredictionService:
+    """
+    Keeps the model, its feature list and a SHAP explainer in memory so that
+    predictions run in-process instead of in a fresh interpreter.
+
+    `model_path` may point to the one-hot random_forest_model.sav (with
+    `features_path`, by default the <model>_features.sav next to it or
+    model_features.sav), a .prfa artifact (see model_artifact.py) or the
+    property_price_pipeline.joblib written by train_model.py; the matching
+    adapter from model_adapter.py is picked automatically.
+
+    `engine` is 'sklearn' or 'flat' (model/property/forest_engine.py). If the
+    flat forest cannot be built or does not match sklearn, sklearn is used.
+    """
+
+    def __init__(self, model_path=predict_for_api.MODEL_PATH, features_path=None, cache=None, engine='sklearn'):
+        self.model_path = model_path
+        self.features_path = features_path or features_path_for(model_path)
+        self.cache = cache
+        self.engine = engine
+        self.adapter = None
+        self.artifact = None
+        self.location_index = None
+        self.model_version = None
+        self.load_seconds = None
+
+    @property
+    def is_loaded(self):
+        return self.adapter is not None
+
+    @property
+    def model_kind(self):
+        return self.adapter.kind if self.adapter is not None else None
+
+    @property
+    def model_engine(self):
+        return self.adapter.engine if self.adapter is not None else None
+
+    def load(self, warm_up=False):
+        """
+        Loads the model files. The new model only replaces the served one after it loaded (and,
+        with warm_up=True, made a prediction, which also builds the SHAP explainer) without errors.
+        """
+        start = time.perf_counter()
+        adapter, artifact = load_model_adapter(self.model_path, self.features_path)
+        model_version = artifact.version if artifact is not None else self._current_model_version()
+        try:
+            adapter.use_engine(self.engine)
+        except Exception as e:
+            print(f"[SERVICE WARNING] {self.engine} engine unavailable, using sklearn: {str(e)}")
+        location_index = LocationIndex(adapter.locations)
+        load_seconds = time.perf_counter() - start
+        print(f"[SERVICE] {adapter.kind} model {model_version} loaded in {load_seconds:.2f}s "
+              f"({len(adapter.features)} features, {adapter.engine} engine)")
+        if warm_up:
+            self._warm_up(adapter)
+
+        # Swap everything at once, requests see either the old or the new model
+        self.adapter, self.artifact, self.model_version = adapter, artifact, model_version
+        self.location_index, self.load_seconds = location_index, load_seconds
+        if self.cache is not None:
+            self.cache.set_model_version(model_version)
+        return self
+
+    def _uses_features_file(self):
+        return not self.model_path.endswith(('.prfa', '.joblib'))
+
+    def model_files_changed(self):
+        """True when the model files on disk no longer match the loaded model version."""
+        try:
+            return self._current_model_version() != self.model_version
+        except (OSError, ValueError):
+            # Files are being replaced right now, check again later
+            return False
+
+    def _current_model_version(self):
+        if self.model_path.endswith('.prfa'):
+            # The artifact header carries its own checksum, no need to hash the file
+            return model_artifact.read_header(self.model_path)['checksum'][:16]
+        if self._uses_features_file() and os.path.exists(self.features_path):
+            return compute_model_version(self.model_path, self.features_path)
+        return compute_model_version(self.model_path)
+
+    def reload_if_changed(self):
+        """Reloads the model when a new artifact was dropped in. Keeps the old model if loading fails."""
+        if not self.model_files_changed():
+            return False
+        try:
+            self.load(warm_up=True)
+            return True
+        except Exception as e:
+            print(f"[SERVICE ERROR] Reload failed, keeping model {self.model_version}: {str(e)}")
+            return False
+
+    def warm_up(self):
+        """Runs one throw-away prediction so the first real request is not slow."""
+        if not self.is_loaded:
+            raise RuntimeError("Prediction service is not loaded")
+        self._warm_up(self.adapter)
+
+    def _warm_up(self, adapter):
+        locations = adapter.locations
+        location = locations[0] if locations else ''
+
+        start = time.perf_counter()
+        key = make_cache_key(location, explain='exact', **WARMUP_INPUT)
+        adapter.predict_one(*key[:-1], explain=key[-1])
+        print(f"[SERVICE] Warm-up prediction took {time.perf_counter() - start:.3f}s")
+
+    def predict(self, location, bedrooms, toilet, garage, LT, LB, explain='exact', use_cache=True, timer=None):
+        if not self.is_loaded:
+            raise RuntimeError("Prediction service is not loaded")
+
+        # Predict from the normalized input so the cached result matches its key
+        key = make_cache_key(location, bedrooms, toilet, garage, LT, LB, explain)
+        location, bedrooms, toilet, garage, LT, LB, explain = key
+
+        cache = self.cache if use_cache else None
+        if cache is not None:
+            if timer is not None:
+                with timer.span('cache'):
+                    cached = cache.get(key)
+            else:
+                cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        result = self.adapter.predict_one(location, bedrooms, toilet, garage, LT, LB, explain=explain, timer=timer)
+        if cache is not None:
+            cache.set(key, result)
+        return result
+
+    def predict_batch(self, rows, explain='exact', timer=None):
+        """Scores a list of validated input dicts in one pass."""
+        if not self.is_loaded:
+            raise RuntimeError("Prediction service is not loaded")
+        return self.adapter.predict_rows(rows, explain=explain, timer=timer)
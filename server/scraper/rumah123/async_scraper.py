@@ -0,0 +1,592 @@
+"""
+Asynchronous rumah123 scraper: one Chromium, many pages scraped concurrently.
+
+Instead of one Docker container (and one browser) per page, a single browser
+is launched and --concurrency workers, each with its own page, take
+(region, page) tasks from a bounded queue. Failed tasks are retried
+with exponential backoff and a progress line is printed while it runs.
+
+Runs on the host, or in one rumah123-scraper container:
+
+    python async_scraper.py --region depok --pages 1-50 --concurrency 4
+    docker run --rm -v "$PWD/output:/app/output" --entrypoint python rumah123-scraper \\
+        async_scraper.py --region depok --pages 1-50
+
+Each page is written to output/<region>/properties_page_N.parquet (typed, see
+listing_schema.py; --page-format csv for CSV). To crawl several
+regions with page discovery and rate limiting, use crawl.py.
+
+Page loads are kept light: images, media, fonts and analytics/ad domains are
+blocked (see rumah123scraper.blocking_config), navigation waits for the first
+listing card instead of network idle, and all pages share one persistent
+browser profile. Bytes received and time to first card are printed per page.
+
+Progress is recorded in output/crawl_state.sqlite3 (see crawl_state.py):
+--resume fetches only missing/failed pages, pages fetched within
+--fresh-hours are skipped, and --incremental stops each region at the first
+page of already-seen listings, so a daily refresh only fetches new inventory.
+"""
+import argparse
+import asyncio
+import collections
+import datetime
+import os
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+from playwright.async_api import async_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+
+from rumah123scraper import (listing_from_card, attribute_key, LISTING_SELECTOR, CARD_SELECTORS, CARD_TEXT_FIELDS,
+                             CARD_FALLBACK_FIELDS, LISTING_TIMEOUT_MS, EXTRACT_LISTINGS_JS, SCROLL_UNTIL_STABLE_JS, SCROLL_OPTIONS,
+                             PageLoadStats, blocking_config, should_block)
+from crawl_config import load_config
+from listing_schema import parquet_available, save_listings
+from crawl_state import CrawlState
+
+REGIONS = {name: region['url'] for name, region in load_config()['regions'].items()}
+EXTRACTION_MODES = ('js', 'locators')
+PAGE_FORMATS = ('parquet', 'csv')
+# Browser profile shared by all pages and kept between runs (cookies, HTTP cache)
+DEFAULT_PROFILE_DIR = os.environ.get('SCRAPER_PROFILE_DIR', 'browser_profile')
+
+ScrapeTask = collections.namedtuple('ScrapeTask', ['region', 'base_url', 'page_number'])
+
+
+# --- Extraction ---
+async def extract_listings(page, extraction='js'):
+    """
+    All listings on the loaded page. 'js' reads every card in one evaluate call
+    (see rumah123scraper.EXTRACT_LISTINGS_JS) and falls back to the locators if it fails.
+    """
+    if extraction == 'js':
+        try:
+            cards = await page.evaluate(EXTRACT_LISTINGS_JS, LISTING_SELECTOR)
+            return [listing_from_card(card) for card in cards]
+        except PlaywrightError as e:
+            print(f"  - Bulk extraction failed ({str(e).splitlines()[0]}), using selectors.")
+    return await extract_listings_with_locators(page)
+
+
+async def extract_listings_with_locators(page):
+    """Reads the listing cards field by field (rumah123scraper.CARD_SELECTORS, one round-trip per field)."""
+    async def text_of(locator):
+        return (await locator.inner_text()).strip() if await locator.count() else None
+
+    async def attribute_of(locator, name):
+        return await locator.get_attribute(name) if await locator.count() else None
+
+    listings = page.locator(LISTING_SELECTOR)
+    scraped_data = []
+
+    for i in range(await listings.count()):
+        listing = listings.nth(i)
+        card = {field: await text_of(listing.locator(CARD_SELECTORS[field]).first) for field in CARD_TEXT_FIELDS}
+
+        attribute_list = listing.locator(CARD_SELECTORS['attribute_list']).first
+        if await attribute_list.count():
+            card['attributes'] = {}
+            items = attribute_list.locator(CARD_SELECTORS['attribute_item'])
+            for j in range(await items.count()):
+                item = items.nth(j)
+                key = attribute_key(await attribute_of(item.locator(CARD_SELECTORS['attribute_icon']).first, 'xlink:href'))
+                if key:
+                    card['attributes'][key] = await text_of(item.locator(CARD_SELECTORS['attribute_value']).first)
+        else:
+            card['attributes'] = None
+            for field in CARD_FALLBACK_FIELDS:
+                card[field] = await text_of(listing.locator(CARD_SELECTORS[field]).first)
+
+        card['href'] = await attribute_of(listing.locator(CARD_SELECTORS['link']).first, 'href')
+        card['image'] = await attribute_of(listing.locator(CARD_SELECTORS['image']).first, 'src')
+        scraped_data.append(listing_from_card(card))
+
+    return scraped_data
+
+
+class TrackedPage:
+    """A browser page that aborts unneeded requests and accounts bytes/time per load."""
+
+    def __init__(self, page, blocked_types, blocked_domains):
+        self.page = page
+        self.blocked_types = blocked_types
+        self.blocked_domains = blocked_domains
+        self.stats = PageLoadStats()
+        self._pending = set()
+
+    @classmethod
+    async def open(cls, context, blocked_types, blocked_domains):
+        tracked = cls(await context.new_page(), blocked_types, blocked_domains)
+        if blocked_types or blocked_domains:
+            await tracked.page.route("**/*", tracked._route)
+        tracked.page.on("requestfinished", tracked._finished)
+        return tracked
+
+    async def _route(self, route):
+        request = route.request
+        if should_block(request.resource_type, request.url, self.blocked_types, self.blocked_domains):
+            self.stats.blocked += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def _finished(self, request):
+        future = asyncio.ensure_future(self._record(request, self.stats))
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+
+    async def _record(self, request, stats):
+        try:
+            stats.add_request(await request.sizes())
+        except PlaywrightError:
+            pass
+
+    def start_load(self):
+        self.stats = PageLoadStats()
+
+    async def finish_load(self):
+        """Waits for the pending size lookups and returns this load's stats."""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+        return self.stats
+
+    async def close(self):
+        await self.page.close()
+
+
+async def scrape_page(tracked, base_url, page_number, extraction='js'):
+    """Loads one result page in an existing browser page and returns (listings, load stats)."""
+    page = tracked.page
+    url = f"{base_url.rstrip('/')}/?page={page_number}"
+    tracked.start_load()
+    # Wait for the listing cards instead of network idle (ads and trackers never go idle)
+    await page.goto(url, wait_until="domcontentloaded", timeout=90000)
+    try:
+        await page.wait_for_selector(LISTING_SELECTOR, timeout=LISTING_TIMEOUT_MS)
+    except PlaywrightTimeoutError:
+        pass  # no cards on this page, extraction returns []
+    tracked.stats.mark_ready()
+    # Scroll until lazy-loaded cards stop appearing instead of sleeping a fixed 5s
+    await page.evaluate(SCROLL_UNTIL_STABLE_JS, SCROLL_OPTIONS)
+    listings = await extract_listings(page, extraction)
+    return listings, await tracked.finish_load()
+
+
+PAGINATION_LAST_PAGE_SELECTOR = "ul.ui-molecule-paginate li:nth-last-child(2) a"
+
+
+async def find_max_page(tracked, base_url):
+    """
+    Reads the last page number from the pagination control of page 1. Page 1 with listings
+    but no pagination is a single page of results (1); None when page 1 shows neither.
+    """
+    page = tracked.page
+    url = f"{base_url.rstrip('/')}/?page=1"
+    await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+    try:
+        await page.wait_for_selector(PAGINATION_LAST_PAGE_SELECTOR, timeout=15000)
+    except PlaywrightTimeoutError:
+        return 1 if await page.locator(LISTING_SELECTOR).count() else None
+    text = (await page.locator(PAGINATION_LAST_PAGE_SELECTOR).first.inner_text()).strip()
+    return int(text) if text.isdigit() else None
+
+
+# --- Progress ---
+class RegionStats:
+    def __init__(self):
+        self.done = 0
+        self.failed = 0
+        self.retries = 0
+        self.skipped = 0
+        self.listings = 0
+        self.bytes = 0
+        self.load_seconds = 0.0
+        self.first_started = None
+        self.last_finished = None
+
+    def as_dict(self):
+        finished = self.done + self.failed
+        active = (self.last_finished - self.first_started) if self.first_started and self.last_finished else 0.0
+        return {
+            'succeeded': self.done,
+            'failed': self.failed,
+            'retries': self.retries,
+            'skipped': self.skipped,
+            'listings': self.listings,
+            'bytes': self.bytes,
+            'error_rate': self.failed / finished if finished else 0.0,
+            'pages_per_minute': finished / active * 60 if active > 0 else None,
+            'average_load_seconds': self.load_seconds / self.done if self.done else None,
+        }
+
+
+class ScrapeProgress:
+    """Counters shared by all workers (overall and per region), printed every few seconds."""
+
+    def __init__(self, total):
+        self.total = total
+        self.regions = collections.defaultdict(RegionStats)
+        self.started = time.monotonic()
+
+    def _sum(self, field):
+        return sum(getattr(region, field) for region in self.regions.values())
+
+    done = property(lambda self: self._sum('done'))
+    failed = property(lambda self: self._sum('failed'))
+    retries = property(lambda self: self._sum('retries'))
+    skipped = property(lambda self: self._sum('skipped'))
+    listings = property(lambda self: self._sum('listings'))
+    bytes = property(lambda self: self._sum('bytes'))
+    load_seconds = property(lambda self: self._sum('load_seconds'))
+
+    def start_task(self, task):
+        region = self.regions[task.region]
+        if region.first_started is None:
+            region.first_started = time.monotonic()
+
+    def add_page(self, task, listings, stats):
+        region = self.regions[task.region]
+        region.done += 1
+        region.listings += len(listings)
+        region.bytes += stats.bytes
+        region.load_seconds += stats.ready_seconds or 0.0
+        region.last_finished = time.monotonic()
+
+    def add_failure(self, task):
+        region = self.regions[task.region]
+        region.failed += 1
+        region.last_finished = time.monotonic()
+
+    def add_retry(self, task):
+        self.regions[task.region].retries += 1
+
+    def add_skip(self, task):
+        self.regions[task.region].skipped += 1
+
+    def report(self):
+        done, failed, skipped = self.done, self.failed, self.skipped
+        finished = done + failed + skipped
+        elapsed = time.monotonic() - self.started
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - finished) / rate if rate > 0 else float('inf')
+        eta_text = f"{eta:.0f}s" if eta != float('inf') else "?"
+        average_load = self.load_seconds / done if done else 0.0
+        return (f"{finished}/{self.total} pages ({failed} failed, {skipped} skipped, {self.retries} retries), "
+                f"{self.listings} listings, {rate:.2f} pages/s, {self.bytes / 1024 / 1024:.1f} MB, "
+                f"avg load {average_load:.1f}s, ETA {eta_text}")
+
+    def summary(self):
+        done = self.done
+        return {
+            'pages': self.total,
+            'succeeded': done,
+            'failed': self.failed,
+            'retries': self.retries,
+            'skipped': self.skipped,
+            'listings': self.listings,
+            'bytes': self.bytes,
+            'average_load_seconds': self.load_seconds / done if done else None,
+            'seconds': time.monotonic() - self.started,
+            'regions': {name: region.as_dict() for name, region in sorted(self.regions.items())},
+        }
+
+
+async def report_progress(progress, interval):
+    while True:
+        await asyncio.sleep(interval)
+        print(f"[PROGRESS] {progress.report()}")
+
+
+# --- Rate limiting ---
+class DomainRateLimiter:
+    """
+    Spaces out page navigations per host: at most `rates[host]` per second
+    (rates['default'] for other hosts, 0 or missing means unlimited).
+    """
+
+    def __init__(self, rates=None):
+        self.rates = dict(rates or {})
+        self._next_slot = {}
+
+    def interval(self, host):
+        rate = self.rates.get(host, self.rates.get('default', 0))
+        return 1.0 / rate if rate else 0.0
+
+    async def wait(self, url):
+        host = (urlsplit(url).hostname or '').lower()
+        interval = self.interval(host)
+        if not interval:
+            return
+        # Reserve the next free slot first, then sleep until it comes (no await in between)
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+# --- Workers ---
+def output_path(output_root, task, page_format='parquet'):
+    output_dir = os.path.join(output_root, task.region)
+    os.makedirs(output_dir, exist_ok=True)
+    return os.path.join(output_dir, f"properties_page_{task.page_number}.{page_format}")
+
+
+class ScrapeRunner:
+    """
+    Shared state of one run: the browser context, options and progress counters.
+    With a CrawlState every attempt and result is recorded, and when stop_seen_ratio
+    is set a region stops at the first page whose listings were (mostly) seen in
+    earlier runs, or that has no listings at all.
+    """
+
+    def __init__(self, context, progress, output_root='output', retries=3, backoff=2.0, extraction='js',
+                 state=None, stop_seen_ratio=None, rate_limiter=None, page_format='parquet'):
+        self.context = context
+        self.page_format = page_format
+        self.rate_limiter = rate_limiter
+        self.progress = progress
+        self.output_root = output_root
+        self.retries = retries
+        self.backoff = backoff
+        self.extraction = extraction
+        self.state = state
+        self.stop_seen_ratio = stop_seen_ratio
+        self.stopped_at = {}
+        self.blocked_types, self.blocked_domains = blocking_config()
+
+    def is_stopped(self, task):
+        return task.page_number > self.stopped_at.get(task.region, float('inf'))
+
+    def stop_region(self, task, reason):
+        if task.page_number < self.stopped_at.get(task.region, float('inf')):
+            self.stopped_at[task.region] = task.page_number
+            print(f"  - {task.region}: stopping after page {task.page_number} ({reason})")
+
+    def handle_result(self, task, listings, stats, seen_before=None):
+        changed = self.state.record_success(task, listings) if self.state is not None else True
+        page_path = output_path(self.output_root, task, self.page_format)
+        if listings and (changed or not os.path.exists(page_path)):
+            save_listings(listings, page_path, scraped_at=datetime.datetime.now())
+            print(f"  - {task.region} page {task.page_number}: {len(listings)} listings, {stats.describe()}")
+        elif listings:
+            print(f"  - {task.region} page {task.page_number}: unchanged since the last fetch, {stats.describe()}")
+        else:
+            print(f"  - No listings found on {task.region} page {task.page_number}.")
+        self.progress.add_page(task, listings, stats)
+
+        if self.stop_seen_ratio is not None:
+            if not listings:
+                self.stop_region(task, "no listings")
+            elif seen_before is not None and seen_before >= self.stop_seen_ratio:
+                self.stop_region(task, f"{seen_before:.0%} of its listings were already seen")
+
+    async def new_page(self):
+        return await TrackedPage.open(self.context, self.blocked_types, self.blocked_domains)
+
+    async def run_task(self, tracked, task):
+        """Scrapes one task with retries; returns the (possibly replaced) page."""
+        for attempt in range(self.retries + 1):
+            if self.is_stopped(task):
+                self.progress.add_skip(task)
+                return tracked
+            if self.state is not None:
+                self.state.record_attempt(task)
+            self.progress.start_task(task)
+            try:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.wait(task.base_url)
+                listings, stats = await scrape_page(tracked, task.base_url, task.page_number, self.extraction)
+                # Measured before the listings are recorded as seen
+                seen_before = self.state.seen_ratio(listings) if self.state is not None else None
+                self.handle_result(task, listings, stats, seen_before)
+                return tracked
+            except Exception as e:
+                # Any failure counts against this task only, a dead worker would stall the queue
+                error = (str(e).splitlines() or [type(e).__name__])[0]
+                if attempt == self.retries:
+                    self.progress.add_failure(task)
+                    if self.state is not None:
+                        self.state.record_failure(task, error)
+                    print(f"❌ {task.region} page {task.page_number} failed after {attempt + 1} attempts: {error}")
+                    try:
+                        screenshot = os.path.join(self.output_root, task.region,
+                                                  f"scraper_debug_page_{task.page_number}.png")
+                        await tracked.page.screenshot(path=screenshot)
+                    except PlaywrightError:
+                        pass
+                    return tracked
+
+                # Exponential backoff with jitter, on a fresh page in case this one is stuck
+                delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                self.progress.add_retry(task)
+                print(f"  - Retrying {task.region} page {task.page_number} in {delay:.1f}s ({error})")
+                await tracked.close()
+                tracked = await self.new_page()
+                await asyncio.sleep(delay)
+
+    async def worker(self, queue):
+        tracked = await self.new_page()
+        try:
+            while True:
+                task = await queue.get()
+                try:
+                    if task is None:
+                        return
+                    tracked = await self.run_task(tracked, task)
+                finally:
+                    queue.task_done()
+        finally:
+            await tracked.close()
+
+
+async def open_context(p, headless=True, profile_dir=DEFAULT_PROFILE_DIR):
+    """
+    Returns (browser, context). With a profile_dir the context is persistent (browser is
+    None): cookies and cached scripts/styles stay warm between pages and runs.
+    """
+    if profile_dir:
+        return None, await p.chromium.launch_persistent_context(profile_dir, headless=headless)
+    browser = await p.chromium.launch(headless=headless)
+    return browser, await browser.new_context()
+
+
+async def run_tasks(tasks, concurrency=4, retries=3, backoff=2.0, output_root='output', headless=True,
+                    progress_interval=5.0, extraction='js', profile_dir=DEFAULT_PROFILE_DIR,
+                    state=None, fresh_seconds=0, resume=False, stop_seen_ratio=None,
+                    rate_limiter=None, context=None, page_format='parquet'):
+    """
+    Scrapes all tasks with one browser and `concurrency` pages; returns the summary counters.
+    All pages share one browser context (see open_context), or the given `context`.
+    With a CrawlState `state`, tasks already done (resume) or fetched within
+    `fresh_seconds` are skipped; see ScrapeRunner for `stop_seen_ratio`.
+    `rate_limiter` (a DomainRateLimiter) spaces out page navigations per host.
+    Pages are saved as typed Parquet (see listing_schema.py) or CSV, per `page_format`.
+    """
+    tasks = list(tasks)
+    planned = collections.Counter(task.region for task in tasks)
+    skipped = 0
+    if state is not None:
+        tasks, skipped = state.plan(tasks, fresh_seconds=fresh_seconds, resume=resume)
+        if skipped:
+            reason = "already succeeded" if resume else "fetched recently"
+            print(f"Skipping {skipped} pages {reason}, {len(tasks)} left to fetch.")
+    skipped_by_region = dict(planned - collections.Counter(task.region for task in tasks))
+    progress = ScrapeProgress(len(tasks))
+    if not tasks:
+        summary = progress.summary()
+        summary['skipped_before_start'] = skipped
+        summary['skipped_before_start_by_region'] = skipped_by_region
+        return summary
+    # Bounded so the producer never runs far ahead of the workers
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def run(context):
+        runner = ScrapeRunner(context, progress, output_root, retries, backoff, extraction, state,
+                              stop_seen_ratio, rate_limiter, page_format)
+        reporter = asyncio.create_task(report_progress(progress, progress_interval))
+        workers = [asyncio.create_task(runner.worker(queue)) for _ in range(concurrency)]
+        try:
+            for task in tasks:
+                if runner.is_stopped(task):
+                    progress.add_skip(task)
+                    continue
+                await queue.put(task)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            reporter.cancel()
+
+    if context is not None:
+        await run(context)
+    else:
+        async with async_playwright() as p:
+            browser, context = await open_context(p, headless, profile_dir)
+            try:
+                await run(context)
+            finally:
+                await context.close()
+                if browser is not None:
+                    await browser.close()
+
+    print(f"[PROGRESS] {progress.report()}")
+    summary = progress.summary()
+    summary['skipped_before_start'] = skipped
+    summary['skipped_before_start_by_region'] = skipped_by_region
+    return summary
+
+
+def parse_page_range(text):
+    """'1-10' -> range(1, 11), '7' -> range(7, 8)"""
+    start, _, end = text.partition('-')
+    start, end = int(start), int(end or start)
+    if start < 1 or end < start:
+        raise ValueError(f"Invalid page range: '{text}'")
+    return range(start, end + 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape rumah123 result pages with one browser and N concurrent pages")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--region', choices=sorted(REGIONS), help="Region to scrape")
+    target.add_argument('--url', help="Any rumah123 search URL (pages are appended as ?page=N)")
+    parser.add_argument('--name', help="Output folder name when using --url")
+    parser.add_argument('--pages', required=True, help="Page range, e.g. 1-50")
+    parser.add_argument('--concurrency', type=int, default=4, help="Pages scraped at the same time")
+    parser.add_argument('--retries', type=int, default=3, help="Retries per page after the first attempt")
+    parser.add_argument('--backoff', type=float, default=2.0, help="Base retry delay in seconds (doubles per retry)")
+    parser.add_argument('--output', default='output', help="Root output folder")
+    parser.add_argument('--page-format', choices=PAGE_FORMATS, default='parquet',
+                        help="Page file format (parquet needs pyarrow)")
+    parser.add_argument('--headful', action='store_true', help="Show the browser window")
+    parser.add_argument('--extraction', choices=EXTRACTION_MODES, default='js',
+                        help="js: one evaluate call per page (default), locators: one call per field")
+    parser.add_argument('--profile', default=DEFAULT_PROFILE_DIR,
+                        help="Persistent browser profile folder (cookies and cache kept between runs)")
+    parser.add_argument('--no-profile', action='store_true', help="Use a throwaway browser context")
+    parser.add_argument('--state', default=os.path.join('output', 'crawl_state.sqlite3'),
+                        help="Crawl state database (see crawl_state.py)")
+    parser.add_argument('--no-state', action='store_true', help="Do not read or record crawl state")
+    parser.add_argument('--resume', action='store_true', help="Only fetch pages that are missing or failed")
+    parser.add_argument('--fresh-hours', type=float, default=12.0,
+                        help="Skip pages fetched successfully within this many hours (0 fetches everything)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Stop a region at the first page of already-seen listings (daily refreshes)")
+    parser.add_argument('--seen-ratio', type=float, default=0.9,
+                        help="Share of already-seen listings that ends an --incremental region")
+    args = parser.parse_args()
+
+    try:
+        pages = parse_page_range(args.pages)
+    except ValueError as e:
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+    if args.page_format == 'parquet' and not parquet_available():
+        print("❌ Error: Parquet page files need pyarrow (pip install pyarrow), or use --page-format csv.")
+        sys.exit(1)
+
+    region = args.region or args.name or 'custom'
+    base_url = REGIONS[args.region] if args.region else args.url
+    print(f"🚀 Scraping {len(pages)} pages of '{region}' with {args.concurrency} concurrent pages...")
+
+    state = None if args.no_state else CrawlState(args.state)
+    summary = asyncio.run(run_tasks(
+        [ScrapeTask(region, base_url, page_number) for page_number in pages],
+        concurrency=args.concurrency,
+        retries=args.retries,
+        backoff=args.backoff,
+        output_root=args.output,
+        headless=not args.headful,
+        extraction=args.extraction,
+        page_format=args.page_format,
+        profile_dir=None if args.no_profile else args.profile,
+        state=state,
+        fresh_seconds=args.fresh_hours * 3600,
+        resume=args.resume,
+        stop_seen_ratio=args.seen_ratio if args.incremental else None
+    ))
+    print(f"✅ Done: {summary['succeeded']} pages, {summary['listings']} listings in {summary['seconds']:.0f}s "
+          f"({summary['failed']} failed). Page files are in '{os.path.join(args.output, region)}'.")
+    sys.exit(1 if summary['failed'] else 0)
@@ -0,0 +1,365 @@
+"""
+Builds the deduplicated listings dataset from the scraper's per-page CSV files.
+
+Replaces merge_csv.py, which loaded every CSV under output/ into memory and
+concatenated them (duplicates included) on each run. Here:
+
+- only per-page files that are new or changed since the last run are read,
+  in chunks, so memory stays bounded however large output/ grows;
+- every listing has one key: its listing_url, or a hash of its content when
+  the URL is "N/A"; only the most recent observation of a key is kept (by
+  the scraped_at column, or the page file's modification time for pages
+  written before it existed);
+- the result is a dataset partitioned by region and scrape date,
+
+      dataset/region=<region>/date=<YYYY-MM-DD>/part-<run>-<n>.parquet
+
+  typed as described in listing_schema.py; new rows go into new part files, and the few older part files that held a
+  now superseded observation are rewritten without it.
+
+An index (dataset/_index.sqlite3) records the processed files and where the
+current observation of every key lives. Page files may be CSV or Parquet.
+
+Usage:
+    python build_dataset.py                          # output/ -> dataset/ (Parquet, needs pyarrow)
+    python build_dataset.py --format csv             # CSV part files instead
+    python build_dataset.py --export-csv properties_combined.csv   # also write one CSV
+    python build_dataset.py --rebuild                # start over from all per-page files
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import time
+import pandas as pd
+
+import listing_schema
+from listing_schema import DATASET_COLUMNS, PAGE_COLUMNS
+
+CONTENT_COLUMNS = ['price', 'location', 'bedrooms', 'toilet', 'garage', 'LT', 'LB']
+FORMATS = ('parquet', 'csv')
+INDEX_NAME = '_index.sqlite3'
+# SQLite allows at most 999 host parameters per statement in older builds
+LOOKUP_BATCH = 500
+
+
+def listing_keys(df):
+    """listing_url where there is one, otherwise a hash of the listing's content (image_url left out)."""
+    # str() per value: missing values become 'nan'/'<NA>' on every pandas version
+    content = df[CONTENT_COLUMNS].astype(object).apply(lambda col: col.map(str)).agg('|'.join, axis=1)
+    hashed = 'sha1:' + content.map(lambda text: hashlib.sha1(text.encode('utf-8')).hexdigest())
+    has_url = df['listing_url'].notna() & ~df['listing_url'].isin(['', 'N/A'])
+    return df['listing_url'].where(has_url, hashed)
+
+
+def find_page_files(root_folder):
+    """All per-page CSV/Parquet files under root_folder as (path, region), oldest first."""
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root_folder):
+        for name in filenames:
+            if name.endswith(('.csv', '.parquet')) and not name.startswith('.'):
+                files.append((os.path.abspath(os.path.join(dirpath, name)), os.path.basename(dirpath)))
+    return sorted(files, key=lambda item: os.path.getmtime(item[0]))
+
+
+# --- Part files ---
+def part_extension(fmt):
+    return '.parquet' if fmt == 'parquet' else '.csv'
+
+
+def write_part(df, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if path.endswith('.parquet'):
+        listing_schema.write_parquet(df, path)
+    else:
+        tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+        listing_schema.write_csv(df, tmp_path)
+        os.replace(tmp_path, path)
+
+
+def read_part(path):
+    """One part file as typed rows, with the region taken from its region= folder."""
+    if path.endswith('.parquet'):
+        df = listing_schema.read_parquet(path)
+    else:
+        df = listing_schema.read_csv(path)
+    for folder in os.path.normpath(path).split(os.sep):
+        if folder.startswith('region='):
+            df['region'] = pd.Categorical([folder[len('region='):]] * len(df))
+    return df
+
+
+def iter_parts(dataset_dir):
+    for dirpath, dirnames, filenames in os.walk(dataset_dir):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.startswith('part-') and name.endswith(('.parquet', '.csv')):
+                yield os.path.join(dirpath, name)
+
+
+# --- Index ---
+class DatasetIndex:
+    """Processed page files, the part file holding each key's newest row, and parts to compact."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime REAL NOT NULL, rows INTEGER NOT NULL,"
+                " processed_at REAL NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS listings ("
+                " listing_key TEXT PRIMARY KEY, scraped_at INTEGER NOT NULL, part TEXT NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS listings_part ON listings (part)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS stale_parts (part TEXT PRIMARY KEY)")
+
+    def close(self):
+        self.conn.close()
+
+    def is_processed(self, path, size, mtime):
+        row = self.conn.execute("SELECT size, mtime FROM files WHERE path = ?", (path,)).fetchone()
+        return row is not None and row[0] == size and row[1] == mtime
+
+    def lookup(self, keys):
+        """{key: (scraped_at, part)} for the keys already in the dataset."""
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[start:start + LOOKUP_BATCH]
+            placeholders = ', '.join('?' for _ in batch)
+            for key, scraped_at, part in self.conn.execute(
+                    f"SELECT listing_key, scraped_at, part FROM listings WHERE listing_key IN ({placeholders})", batch):
+                found[key] = (scraped_at, part)
+        return found
+
+    def commit(self, listings, files, stale_parts):
+        """Records one flush: the keys' new locations, the files read and the parts that lost rows."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO listings (listing_key, scraped_at, part) VALUES (?, ?, ?)"
+                " ON CONFLICT (listing_key) DO UPDATE SET scraped_at = excluded.scraped_at, part = excluded.part",
+                [(key, scraped_at, part) for key, (scraped_at, part) in listings.items()]
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime, rows, processed_at) VALUES (?, ?, ?, ?, ?)",
+                [(path, size, mtime, rows, now) for path, size, mtime, rows in files]
+            )
+            self.conn.executemany("INSERT OR IGNORE INTO stale_parts (part) VALUES (?)", [(p,) for p in stale_parts])
+
+    def current_keys(self, part):
+        """Keys whose newest row is in that part file."""
+        return {row[0] for row in self.conn.execute("SELECT listing_key FROM listings WHERE part = ?", (part,))}
+
+    def stale_parts(self):
+        return [row[0] for row in self.conn.execute("SELECT part FROM stale_parts")]
+
+    def mark_compacted(self, part):
+        with self.conn:
+            self.conn.execute("DELETE FROM stale_parts WHERE part = ?", (part,))
+
+    def referenced_parts(self):
+        return {row[0] for row in self.conn.execute("SELECT DISTINCT part FROM listings")}
+
+
+# --- Builder ---
+class DatasetBuilder:
+    def __init__(self, dataset_dir='dataset', fmt='parquet', chunk_size=10000, flush_rows=50000):
+        self.dataset_dir = dataset_dir
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.flush_rows = flush_rows
+        os.makedirs(dataset_dir, exist_ok=True)
+        self.index = DatasetIndex(os.path.join(dataset_dir, INDEX_NAME))
+        self.run_id = time.strftime('%Y%m%dT%H%M%S')
+        self.part_sequence = 0
+        self.stats = {'files': 0, 'files_skipped': 0, 'rows': 0, 'new': 0, 'updated': 0, 'duplicates': 0,
+                      'parts_written': 0, 'parts_compacted': 0, 'coerced': {}}
+        self._reset_buffer()
+
+    def _reset_buffer(self):
+        self.buffers = {}           # partition dir -> [DataFrame]
+        self.pending_listings = {}  # key -> (scraped_at, part) not yet committed
+        self.pending_files = []
+        self.pending_stale = set()
+        self.buffered_rows = 0
+
+    def _part_path(self, region, date):
+        # Relative to the dataset folder, so the dataset can be moved
+        partition = os.path.join(f"region={region}", f"date={date}")
+        return os.path.join(partition, f"part-{self.run_id}-{self.part_sequence:05d}{part_extension(self.fmt)}")
+
+    def _known(self, keys):
+        known = self.index.lookup(key for key in keys if key not in self.pending_listings)
+        known.update({key: self.pending_listings[key] for key in keys if key in self.pending_listings})
+        return known
+
+    def add_chunk(self, df, region, file_time):
+        """Buffers the rows of one typed chunk that are newer than what the dataset already holds."""
+        df = df.reindex(columns=PAGE_COLUMNS)
+        df['scraped_at'] = pd.to_datetime(df['scraped_at']).fillna(file_time)
+        df['region'] = region
+        df['listing_key'] = listing_keys(df)
+        # Newest last, so keep='last' keeps the most recent observation
+        df = df.sort_values('scraped_at', kind='stable')
+        before = len(df)
+        df = df.drop_duplicates('listing_key', keep='last')
+        self.stats['rows'] += before
+        self.stats['duplicates'] += before - len(df)
+
+        # Index times are epoch milliseconds of the (naive, local) scrape time
+        times = (df['scraped_at'].astype('datetime64[ms]').astype('int64')).tolist()
+        known = self._known(df['listing_key'])
+        newer = [key not in known or time_ms > known[key][0] for key, time_ms in zip(df['listing_key'], times)]
+        self.stats['duplicates'] += len(df) - sum(newer)
+        df = df[newer]
+        times = [time_ms for time_ms, keep in zip(times, newer) if keep]
+        if df.empty:
+            return
+
+        dates = df['scraped_at'].dt.strftime('%Y-%m-%d')
+        for date in dates.unique():
+            rows = df[dates == date]
+            part = self._part_path(region, date)
+            self.buffers.setdefault(part, []).append(rows)
+            self.buffered_rows += len(rows)
+        for key, time_ms, date in zip(df['listing_key'], times, dates):
+            if key in known:
+                self.stats['updated'] += 1
+                self.pending_stale.add(known[key][1])
+            else:
+                self.stats['new'] += 1
+            self.pending_listings[key] = (time_ms, self._part_path(region, date))
+
+    def read_page_file(self, path):
+        """Typed chunks of one page file."""
+        if path.endswith('.parquet'):
+            yield listing_schema.read_parquet(path)
+        else:
+            yield from listing_schema.read_csv(path, coerced=self.stats['coerced'], chunksize=self.chunk_size)
+
+    def add_file(self, path, region):
+        size, mtime = os.path.getsize(path), os.path.getmtime(path)
+        if self.index.is_processed(path, size, mtime):
+            self.stats['files_skipped'] += 1
+            return
+        rows = 0
+        file_time = pd.Timestamp.fromtimestamp(mtime).floor('s')
+        try:
+            for chunk in self.read_page_file(path):
+                rows += len(chunk)
+                self.add_chunk(chunk, region, file_time)
+        except pd.errors.EmptyDataError:
+            print(f"Warning: '{path}' is empty and will be skipped.")
+        self.pending_files.append((path, size, mtime, rows))
+        self.stats['files'] += 1
+        if self.buffered_rows >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered rows as new part files, then records them in the index."""
+        for part, frames in self.buffers.items():
+            df = pd.concat(frames, ignore_index=True)
+            # A key seen again later in this run now lives in a newer part
+            df = df[[self.pending_listings[key][1] == part for key in df['listing_key']]]
+            df = df.drop_duplicates('listing_key', keep='last')
+            if not df.empty:
+                write_part(df[DATASET_COLUMNS], os.path.join(self.dataset_dir, part))
+                self.stats['parts_written'] += 1
+        self.index.commit(self.pending_listings, self.pending_files, self.pending_stale - set(self.buffers))
+        self.part_sequence += 1
+        self._reset_buffer()
+        self.compact()
+
+    def compact(self):
+        """Rewrites part files that hold superseded observations, keeping only current rows."""
+        for part in self.index.stale_parts():
+            path = os.path.join(self.dataset_dir, part)
+            if os.path.exists(path):
+                df = read_part(path)
+                keep = df['listing_key'].isin(self.index.current_keys(part))
+                if not keep.all():
+                    if keep.any():
+                        write_part(df[keep], path)
+                    else:
+                        self.remove_part(path)
+                    self.stats['parts_compacted'] += 1
+            self.index.mark_compacted(part)
+
+    def remove_part(self, path):
+        """Deletes a part file and the partition folders it leaves empty."""
+        os.remove(path)
+        directory = os.path.dirname(path)
+        while os.path.abspath(directory) != os.path.abspath(self.dataset_dir) and not os.listdir(directory):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
+
+    def remove_orphans(self):
+        """Deletes part files an interrupted run wrote but never recorded."""
+        referenced = self.index.referenced_parts()
+        for path in list(iter_parts(self.dataset_dir)):
+            if os.path.relpath(path, self.dataset_dir) not in referenced:
+                self.remove_part(path)
+
+    def build(self, root_folder):
+        self.remove_orphans()
+        self.compact()
+        for path, region in find_page_files(root_folder):
+            self.add_file(path, region)
+        self.flush()
+        return self.stats
+
+
+def export_csv(dataset_dir, output_file):
+    """Streams the dataset, one part file at a time, into a single CSV; returns the row count."""
+    rows, header = 0, True
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        for part in iter_parts(dataset_dir):
+            df = read_part(part)
+            listing_schema.write_csv(df.reindex(columns=DATASET_COLUMNS), f, header=header)
+            rows += len(df)
+            header = False
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge the per-page CSV files into a deduplicated, partitioned dataset")
+    parser.add_argument('--input', default='output', help="Folder with the scraper's per-page CSV files")
+    parser.add_argument('--dataset', default='dataset', help="Dataset folder")
+    parser.add_argument('--format', choices=FORMATS, default='parquet', help="Part file format")
+    parser.add_argument('--chunk-size', type=int, default=10000, help="Rows read from a CSV at a time")
+    parser.add_argument('--flush-rows', type=int, default=50000, help="Buffered rows before part files are written")
+    parser.add_argument('--rebuild', action='store_true', help="Delete the dataset and process every file again")
+    parser.add_argument('--export-csv', help="Also write the whole dataset to this CSV file")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input):
+        print(f"❌ Error: Input folder '{args.input}' not found.")
+        sys.exit(1)
+    if args.format == 'parquet':
+        if not listing_schema.parquet_available():
+            print("❌ Error: Parquet output needs pyarrow (pip install pyarrow), or use --format csv.")
+            sys.exit(1)
+    if args.rebuild and os.path.isdir(args.dataset):
+        shutil.rmtree(args.dataset)
+
+    started = time.monotonic()
+    builder = DatasetBuilder(args.dataset, args.format, args.chunk_size, args.flush_rows)
+    stats = builder.build(args.input)
+    builder.index.close()
+    print(f"✅ Processed {stats['files']} new or changed files ({stats['files_skipped']} unchanged skipped), "
+          f"{stats['rows']} rows: {stats['new']} new listings, {stats['updated']} updated, "
+          f"{stats['duplicates']} duplicates dropped, {stats['parts_written']} part files written, "
+          f"{stats['parts_compacted']} compacted in {time.monotonic() - started:.1f}s.")
+    if stats['coerced']:
+        print(f"Warning: malformed values read as null: {listing_schema.format_coerced(stats['coerced'])}")
+
+    if args.export_csv:
+        rows = export_csv(args.dataset, args.export_csv)
+        print(f"✅ Exported {rows} listings to '{args.export_csv}'")
@@ -0,0 +1,209 @@
+"""
+Scheduled multi-region crawl of rumah123, with no prompts (cron or a container).
+
+Reads the regions and settings from crawl_config.json (see crawl_config.py),
+finds the number of result pages of every selected region at the same time,
+then spreads all (region, page) tasks over one fixed pool of --workers pages
+in one browser. Tasks are interleaved across regions so every region makes
+progress, and page navigations are rate limited per host ("rate_limits").
+At the end a per-region table shows pages, listings, throughput and error
+rate; --report also writes it as JSON for monitoring.
+
+    python crawl.py                                  # every region in the config
+    python crawl.py --regions depok,bogor --max-pages 50
+    python crawl.py --regions depok --pages 1-20     # fixed range, no page discovery
+    python crawl.py --incremental --report output/crawl_report.json   # e.g. from cron
+    docker run --rm -v "$PWD/output:/app/output" rumah123-scraper --regions depok
+
+Crawl state (resume, freshness, --incremental) works as in async_scraper.py.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from playwright.async_api import async_playwright, Error as PlaywrightError
+
+from async_scraper import (PAGE_FORMATS, DomainRateLimiter, ScrapeTask, TrackedPage, find_max_page, open_context,
+                           parse_page_range, run_tasks)
+from crawl_config import DEFAULT_CONFIG_PATH, load_config
+from crawl_state import CrawlState
+from listing_schema import parquet_available
+from rumah123scraper import blocking_config
+
+DISCOVERY_RETRIES = 2
+
+
+# --- Page discovery ---
+async def discover_max_pages(context, regions, concurrency, rate_limiter):
+    """Returns {region: max page or None}, looking up all regions concurrently."""
+    semaphore = asyncio.Semaphore(concurrency)
+    blocked_types, blocked_domains = blocking_config()
+
+    async def discover(name, url):
+        async with semaphore:
+            tracked = await TrackedPage.open(context, blocked_types, blocked_domains)
+            try:
+                for attempt in range(DISCOVERY_RETRIES + 1):
+                    await rate_limiter.wait(url)
+                    try:
+                        max_page = await find_max_page(tracked, url)
+                    except PlaywrightError as e:
+                        print(f"❌ {name}: could not load page 1 ({str(e).splitlines()[0]})")
+                        continue
+                    if max_page is None:
+                        print(f"❌ {name}: page 1 shows neither listings nor pagination.")
+                    else:
+                        print(f"✅ {name}: {max_page} pages")
+                    return name, max_page
+                return name, None
+            finally:
+                await tracked.close()
+
+    results = await asyncio.gather(*(discover(name, region['url']) for name, region in regions.items()))
+    return dict(results)
+
+
+def cap_pages(pages, cap):
+    """Drops the pages after `cap` (None = no cap) from a page range."""
+    return range(pages.start, min(pages.stop, cap + 1)) if cap else pages
+
+
+def build_tasks(regions, page_ranges):
+    """Interleaves the regions' pages (a1, b1, c1, a2, b2, ...) so no region waits for another."""
+    per_region = [
+        [ScrapeTask(name, regions[name]['url'], page_number) for page_number in pages]
+        for name, pages in page_ranges.items()
+    ]
+    return [task for group in itertools.zip_longest(*per_region) for task in group if task is not None]
+
+
+# --- Report ---
+def print_report(summary, page_ranges):
+    print(f"\n{'region':<20} {'pages':>6} {'ok':>6} {'failed':>6} {'skipped':>7} {'listings':>8} "
+          f"{'pages/min':>9} {'errors':>7}")
+    skipped_before = summary.get('skipped_before_start_by_region', {})
+    for name, pages in page_ranges.items():
+        region = summary['regions'].get(name, {})
+        rate = region.get('pages_per_minute')
+        skipped = region.get('skipped', 0) + skipped_before.get(name, 0)
+        print(f"{name:<20} {len(pages):>6} {region.get('succeeded', 0):>6} {region.get('failed', 0):>6} "
+              f"{skipped:>7} {region.get('listings', 0):>8} {(f'{rate:.1f}' if rate else '-'):>9} "
+              f"{region.get('error_rate', 0.0):>7.1%}")
+
+
+async def crawl(config, regions, page_ranges, args):
+    rate_limiter = DomainRateLimiter(config['rate_limits'])
+    state = None if args.no_state else CrawlState(config['state'])
+    async with async_playwright() as p:
+        browser, context = await open_context(p, not args.headful, None if args.no_profile else config['profile'])
+        try:
+            if page_ranges is None:
+                print(f"🔎 Finding the number of pages for {len(regions)} region(s)...")
+                max_pages = await discover_max_pages(context, regions, config['workers'], rate_limiter)
+                page_ranges = {}
+                for name, max_page in max_pages.items():
+                    if max_page is not None:
+                        page_ranges[name] = range(1, max_page + 1)
+                failed_regions = sorted(set(regions) - set(page_ranges))
+            else:
+                failed_regions = []
+            # --max-pages / the region's max_pages also limit an explicit --pages range
+            page_ranges = {name: cap_pages(pages, regions[name]['max_pages'] or config['max_pages'])
+                           for name, pages in page_ranges.items()}
+
+            tasks = build_tasks(regions, page_ranges)
+            print(f"🚀 Crawling {len(tasks)} pages in {len(page_ranges)} region(s) with "
+                  f"{config['workers']} workers...")
+            summary = await run_tasks(
+                tasks,
+                concurrency=config['workers'],
+                retries=config['retries'],
+                backoff=config['backoff'],
+                output_root=config['output'],
+                state=state,
+                fresh_seconds=config['fresh_hours'] * 3600,
+                resume=args.resume,
+                stop_seen_ratio=config['seen_ratio'] if config['incremental'] else None,
+                rate_limiter=rate_limiter,
+                context=context,
+                page_format=config['page_format']
+            )
+        finally:
+            await context.close()
+            if browser is not None:
+                await browser.close()
+    summary['discovery_failed'] = failed_regions
+    return summary, page_ranges
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl several rumah123 regions with one browser and a shared worker pool")
+    parser.add_argument('--config', default=DEFAULT_CONFIG_PATH, help="Crawl config (JSON)")
+    parser.add_argument('--regions', default='all', help="Comma separated region names from the config, or 'all'")
+    parser.add_argument('--pages', help="Fixed page range for every region, e.g. 1-20 (skips page discovery)")
+    parser.add_argument('--max-pages', type=int, help="At most this many pages per region (also caps --pages)")
+    parser.add_argument('--workers', type=int, help="Pages scraped at the same time, over all regions")
+    parser.add_argument('--rate', type=float, help="Page loads per second per host (overrides the config)")
+    parser.add_argument('--resume', action='store_true', help="Only fetch pages that are missing or failed")
+    parser.add_argument('--fresh-hours', type=float, help="Skip pages fetched successfully within this many hours")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Stop a region at the first page of already-seen listings")
+    parser.add_argument('--no-state', action='store_true', help="Do not read or record crawl state")
+    parser.add_argument('--no-profile', action='store_true', help="Use a throwaway browser context")
+    parser.add_argument('--headful', action='store_true', help="Show the browser window")
+    parser.add_argument('--page-format', choices=PAGE_FORMATS, help="Page file format (parquet needs pyarrow)")
+    parser.add_argument('--report', help="Write the per-region summary to this JSON file")
+    args = parser.parse_args()
+
+    try:
+        config = load_config(args.config)
+        page_range = parse_page_range(args.pages) if args.pages else None
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+
+    for key, value in (('max_pages', args.max_pages), ('workers', args.workers), ('fresh_hours', args.fresh_hours)):
+        if value is not None:
+            config[key] = value
+    if args.rate is not None:
+        config['rate_limits'] = {'default': args.rate}
+    config['incremental'] = config['incremental'] or args.incremental
+    if args.page_format is not None:
+        config['page_format'] = args.page_format
+    if config['page_format'] == 'parquet' and not parquet_available():
+        print("❌ Error: Parquet page files need pyarrow (pip install pyarrow), or use --page-format csv.")
+        sys.exit(1)
+
+    if args.regions == 'all':
+        regions = config['regions']
+    else:
+        names = [name.strip() for name in args.regions.split(',') if name.strip()]
+        unknown = [name for name in names if name not in config['regions']]
+        if unknown:
+            print(f"❌ Error: Unknown region(s): {', '.join(unknown)}. "
+                  f"Known: {', '.join(sorted(config['regions']))}")
+            sys.exit(1)
+        regions = {name: config['regions'][name] for name in names}
+    if not regions:
+        print("❌ Error: No regions to crawl.")
+        sys.exit(1)
+
+    started = time.time()
+    page_ranges = {name: page_range for name in regions} if page_range is not None else None
+    summary, page_ranges = asyncio.run(crawl(config, regions, page_ranges, args))
+    print_report(summary, page_ranges)
+    print(f"\n✅ Done: {summary['succeeded']} pages, {summary['listings']} listings in {summary['seconds']:.0f}s "
+          f"({summary['failed']} failed). Page files are in '{config['output']}'.")
+    if summary['discovery_failed']:
+        print(f"❌ No page count for: {', '.join(summary['discovery_failed'])}")
+
+    if args.report:
+        os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+        summary['started_at'] = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started))
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Report written to '{args.report}'")
+    sys.exit(1 if summary['failed'] or summary['discovery_failed'] else 0)
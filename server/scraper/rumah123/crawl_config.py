@@ -0,0 +1,55 @@
+"""
+Crawl settings and the list of regions, read from crawl_config.json.
+
+A region is either a search URL or an object with a "url" and an optional
+"max_pages" cap:
+
+    "regions": {
+        "depok": "https://www.rumah123.com/jual/depok/rumah/",
+        "bogor": {"url": "https://www.rumah123.com/jual/bogor/rumah/", "max_pages": 100}
+    }
+
+"rate_limits" are page navigations per second per host ("default" for any
+host not listed).
+"""
+import json
+import os
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONFIG_PATH = os.path.join(SCRIPT_DIR, 'crawl_config.json')
+
+DEFAULTS = {
+    'output': 'output',
+    'state': os.path.join('output', 'crawl_state.sqlite3'),
+    'profile': 'browser_profile',
+    'page_format': 'parquet',
+    'workers': 4,
+    'retries': 3,
+    'backoff': 2.0,
+    'fresh_hours': 12,
+    'incremental': False,
+    'seen_ratio': 0.9,
+    'max_pages': None,
+    'rate_limits': {'default': 1.0},
+    'regions': {},
+}
+
+
+def load_config(path=DEFAULT_CONFIG_PATH):
+    """Returns the settings with defaults filled in and every region as {'url', 'max_pages'}."""
+    config = dict(DEFAULTS)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            config.update(json.load(f))
+    elif path != DEFAULT_CONFIG_PATH:
+        raise FileNotFoundError(f"Config file not found: '{path}'")
+
+    regions = {}
+    for name, region in config['regions'].items():
+        if isinstance(region, str):
+            region = {'url': region}
+        if 'url' not in region:
+            raise ValueError(f"Region '{name}' has no url")
+        regions[name] = {'url': region['url'], 'max_pages': region.get('max_pages')}
+    config['regions'] = regions
+    return config
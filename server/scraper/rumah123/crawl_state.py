@@ -0,0 +1,164 @@
+"""
+Crawl state for incremental, resumable scraping.
+
+A small SQLite database records, for every (region, page) task, its status,
+number of attempts, last fetch time, listing count and a hash of the
+extracted content, plus every listing URL seen so far. async_scraper.py uses
+it to:
+
+- resume a run: only tasks that are missing or not yet succeeded are fetched;
+- skip pages fetched successfully within a freshness window;
+- stop paginating a region once a page consists of listings already seen in
+  earlier runs (results are newest first, so the rest is old inventory);
+- leave a page's CSV untouched when its content hash did not change.
+
+Usage:
+    python crawl_state.py [output/crawl_state.sqlite3]     # per-region summary
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+DEFAULT_STATE_PATH = os.path.join('output', 'crawl_state.sqlite3')
+
+
+def content_hash(listings):
+    """Stable hash of a page's listings (image URLs carry CDN tokens and are left out)."""
+    rows = sorted(
+        json.dumps({key: value for key, value in listing.items() if key != 'image_url'}, sort_keys=True, default=str)
+        for listing in listings
+    )
+    return hashlib.sha256('\n'.join(rows).encode('utf-8')).hexdigest()
+
+
+class CrawlState:
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                " region TEXT NOT NULL, page_number INTEGER NOT NULL, url TEXT NOT NULL,"
+                " status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, last_fetch_at REAL,"
+                " content_hash TEXT, listings INTEGER, error TEXT, updated_at REAL NOT NULL,"
+                " PRIMARY KEY (region, page_number))"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS listings_seen ("
+                " listing_url TEXT PRIMARY KEY, region TEXT NOT NULL, first_seen_at REAL NOT NULL,"
+                " last_seen_at REAL NOT NULL)"
+            )
+        # Listings first seen during this run do not count as "already seen"
+        self.run_started = time.time()
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, region, page_number):
+        row = self.conn.execute(
+            "SELECT * FROM tasks WHERE region = ? AND page_number = ?", (region, page_number)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    # --- Planning ---
+    def plan(self, tasks, fresh_seconds=0, resume=False):
+        """
+        Returns the tasks that still need fetching and how many were skipped:
+        with resume=True every succeeded task is skipped, otherwise only those
+        fetched within the last fresh_seconds.
+        """
+        now, selected, skipped = time.time(), [], 0
+        for task in tasks:
+            row = self.get(task.region, task.page_number)
+            if row is not None and row['status'] == 'succeeded':
+                if resume or (fresh_seconds > 0 and now - (row['last_fetch_at'] or 0) < fresh_seconds):
+                    skipped += 1
+                    continue
+            selected.append(task)
+        return selected, skipped
+
+    # --- Recording ---
+    def _upsert(self, task, **fields):
+        fields['updated_at'] = time.time()
+        columns = ', '.join(fields)
+        placeholders = ', '.join('?' for _ in fields)
+        updates = ', '.join(f"{column} = excluded.{column}" for column in fields)
+        with self.conn:
+            self.conn.execute(
+                f"INSERT INTO tasks (region, page_number, url, {columns}) VALUES (?, ?, ?, {placeholders})"
+                f" ON CONFLICT (region, page_number) DO UPDATE SET url = excluded.url, {updates}",
+                (task.region, task.page_number, task.base_url, *fields.values())
+            )
+
+    def record_attempt(self, task):
+        row = self.get(task.region, task.page_number)
+        attempts = (row['attempts'] if row else 0) + 1
+        status = row['status'] if row and row['status'] == 'succeeded' else 'running'
+        self._upsert(task, status=status, attempts=attempts)
+
+    def record_success(self, task, listings):
+        """Stores the page result; returns True when its content changed since the last fetch."""
+        digest = content_hash(listings)
+        row = self.get(task.region, task.page_number)
+        changed = row is None or row['content_hash'] != digest
+        now = time.time()
+        self._upsert(task, status='succeeded', last_fetch_at=now, content_hash=digest,
+                     listings=len(listings), error=None)
+        urls = [listing['listing_url'] for listing in listings if listing.get('listing_url') not in (None, 'N/A')]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO listings_seen (listing_url, region, first_seen_at, last_seen_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (listing_url) DO UPDATE SET last_seen_at = excluded.last_seen_at",
+                [(url, task.region, now, now) for url in urls]
+            )
+        return changed
+
+    def record_failure(self, task, error):
+        self._upsert(task, status='failed', error=error)
+
+    def seen_ratio(self, listings):
+        """Share of the listings that were already seen before this run (0.0 for an empty page)."""
+        urls = [listing['listing_url'] for listing in listings if listing.get('listing_url') not in (None, 'N/A')]
+        if not urls:
+            return 0.0
+        placeholders = ', '.join('?' for _ in urls)
+        seen = self.conn.execute(
+            f"SELECT COUNT(*) FROM listings_seen WHERE listing_url IN ({placeholders}) AND first_seen_at < ?",
+            (*urls, self.run_started)
+        ).fetchone()[0]
+        return seen / len(urls)
+
+    def summary(self):
+        """Task counts per region and status."""
+        rows = self.conn.execute(
+            "SELECT region, status, COUNT(*), SUM(listings), MAX(last_fetch_at) FROM tasks GROUP BY region, status"
+        ).fetchall()
+        regions = {}
+        for region, status, count, listings, last_fetch in rows:
+            entry = regions.setdefault(region, {'listings': 0, 'last_fetch_at': None})
+            entry[status] = count
+            entry['listings'] += listings or 0
+            if last_fetch and (entry['last_fetch_at'] is None or last_fetch > entry['last_fetch_at']):
+                entry['last_fetch_at'] = last_fetch
+        return regions
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_STATE_PATH
+    if not os.path.exists(path):
+        print(f"❌ Error: No crawl state at '{path}'.")
+        sys.exit(1)
+    state = CrawlState(path)
+    seen = state.conn.execute("SELECT COUNT(*) FROM listings_seen").fetchone()[0]
+    print(f"Crawl state '{path}': {seen} listings seen")
+    for region, entry in sorted(state.summary().items()):
+        last = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['last_fetch_at'])) if entry['last_fetch_at'] else '-'
+        print(f"  {region:<20} succeeded {entry.get('succeeded', 0):>5}  failed {entry.get('failed', 0):>4}  "
+              f"running {entry.get('running', 0):>4}  listings {entry['listings']:>7}  last fetch {last}")
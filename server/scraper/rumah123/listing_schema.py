@@ -0,0 +1,172 @@
+"""
+The typed schema of scraped listings, shared by the scraper's page files,
+build_dataset.py and the training data:
+
+    price        int64        location    dictionary-encoded string (category)
+    bedrooms     int16        toilet      int16          garage    int16
+    LT, LB       float32      source      dictionary-encoded string
+    listing_url, image_url, listing_key   string
+    scraped_at   timestamp (whole seconds)
+
+"N/A" and empty cells become nulls. Values that do not parse (text in a
+number column) become nulls too; to_typed() and the CSV readers count them
+per column in an optional `coerced` dict, so the loss can be reported. In a Parquet dataset the region (and
+scrape date) are hive partition folders (region=<name>/date=<day>), not
+columns in the files, so readers can skip whole regions. CSV keeps every
+column, including region, for import and export.
+
+Parquet needs pyarrow; it is imported only when a Parquet file is read or written.
+"""
+import importlib.util
+import os
+import pandas as pd
+
+PAGE_COLUMNS = ['price', 'location', 'bedrooms', 'toilet', 'garage', 'LT', 'LB', 'listing_url', 'image_url',
+                'source', 'scraped_at']
+DATASET_COLUMNS = PAGE_COLUMNS + ['listing_key', 'region']
+PARTITION_COLUMNS = ['region', 'date']
+NA_VALUES = ['N/A', '']
+
+PANDAS_DTYPES = {
+    'price': 'Int64',
+    'location': 'category',
+    'bedrooms': 'Int16',
+    'toilet': 'Int16',
+    'garage': 'Int16',
+    'LT': 'float32',
+    'LB': 'float32',
+    'listing_url': 'string',
+    'image_url': 'string',
+    'source': 'category',
+    'listing_key': 'string',
+    'region': 'category',
+}
+INTEGER_COLUMNS = ['price', 'bedrooms', 'toilet', 'garage']
+FLOAT_COLUMNS = ['LT', 'LB']
+
+
+def parquet_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def arrow_schema(columns):
+    """pyarrow schema for the given columns (partition columns are not stored in Parquet files)."""
+    import pyarrow as pa
+    types = {
+        'price': pa.int64(),
+        'location': pa.dictionary(pa.int32(), pa.string()),
+        'bedrooms': pa.int16(),
+        'toilet': pa.int16(),
+        'garage': pa.int16(),
+        'LT': pa.float32(),
+        'LB': pa.float32(),
+        'listing_url': pa.string(),
+        'image_url': pa.string(),
+        'source': pa.dictionary(pa.int32(), pa.string()),
+        'scraped_at': pa.timestamp('ms'),
+        'listing_key': pa.string(),
+    }
+    return pa.schema([(column, types[column]) for column in columns])
+
+
+def _blank_to_na(values):
+    return values.mask(values.isin(NA_VALUES))
+
+
+def to_typed(df, coerced=None):
+    """
+    Casts raw (string) listing columns to the schema types; values that do not parse become null.
+    With a `coerced` dict, adds the number of those values per column to it.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if column in INTEGER_COLUMNS or column in FLOAT_COLUMNS or column == 'scraped_at':
+            raw = _blank_to_na(df[column])
+            if column == 'scraped_at':
+                values = pd.to_datetime(raw, errors='coerce').dt.floor('s')
+            else:
+                values = pd.to_numeric(raw, errors='coerce')
+            if column in INTEGER_COLUMNS:
+                # Fractional values ("2.5" bathrooms) are not valid counts or prices
+                values = values.where(values.isna() | (values == values.round()))
+                values = values.astype('Float64').astype(PANDAS_DTYPES[column])
+            elif column in FLOAT_COLUMNS:
+                values = values.astype('float32')
+            if coerced is not None:
+                count = int((raw.notna() & values.isna()).sum())
+                if count:
+                    coerced[column] = coerced.get(column, 0) + count
+            df[column] = values
+        elif column in PANDAS_DTYPES:
+            df[column] = _blank_to_na(df[column]).astype(PANDAS_DTYPES[column])
+    return df
+
+
+def format_coerced(coerced):
+    """{'LT': 2, 'price': 1} -> 'LT=2, price=1'"""
+    return ', '.join(f"{column}={count}" for column, count in sorted(coerced.items()))
+
+
+# --- CSV (import/export) ---
+def read_csv(path, columns=None, coerced=None, **kwargs):
+    """Reads a listings CSV (raw page file or export) into the typed schema (see to_typed for `coerced`)."""
+    df = pd.read_csv(path, dtype=str, keep_default_na=False, usecols=columns, **kwargs)
+    if 'chunksize' in kwargs:
+        return (to_typed(chunk, coerced) for chunk in df)
+    return to_typed(df, coerced)
+
+
+def write_csv(df, path_or_file, header=True):
+    df.to_csv(path_or_file, index=False, header=header, na_rep='N/A', date_format='%Y-%m-%dT%H:%M:%S')
+
+
+# --- Parquet ---
+def write_parquet(df, path):
+    """Writes the schema columns present in df (minus partition columns) as one Parquet file, atomically."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    columns = [column for column in DATASET_COLUMNS if column in df.columns and column not in PARTITION_COLUMNS]
+    table = pa.Table.from_pandas(df[columns], schema=arrow_schema(columns), preserve_index=False)
+    # A leading dot keeps unfinished files out of dataset reads
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def read_parquet(path, columns=None, regions=None):
+    """
+    Reads a Parquet file or a region=/date= partitioned dataset folder. Only
+    `columns` are read, and with `regions` only those region folders are opened.
+    """
+    filters = [('region', 'in', list(regions))] if regions else None
+    return pd.read_parquet(path, engine='pyarrow', columns=columns, filters=filters)
+
+
+# --- Any listings file ---
+def read_listings(path, columns=None, regions=None, coerced=None):
+    """
+    Typed listings from a CSV file, a Parquet file or a partitioned Parquet dataset folder.
+    `coerced` counts the CSV values that did not parse (Parquet files are typed when written).
+    """
+    if path.endswith('.csv'):
+        if not regions:
+            return read_csv(path, columns=columns, coerced=coerced)
+        df = read_csv(path, columns=columns + ['region'] if columns else None, coerced=coerced)
+        if 'region' not in df.columns:
+            raise ValueError(f"'{path}' has no region column to filter on")
+        df = df[df['region'].isin(regions)]
+        return df[columns] if columns else df
+    return read_parquet(path, columns=columns, regions=regions)
+
+
+def save_listings(listings, path, scraped_at):
+    """Writes one scraped page (a list of listing dicts) as CSV or Parquet, by file extension."""
+    df = pd.DataFrame(listings).reindex(columns=PAGE_COLUMNS)
+    df['scraped_at'] = pd.Timestamp(scraped_at).floor('s')
+    if path.endswith('.parquet'):
+        coerced = {}
+        write_parquet(to_typed(df, coerced), path)
+        if coerced:
+            print(f"  - Warning: malformed values stored as null in '{path}': {format_coerced(coerced)}")
+    else:
+        write_csv(df, path)
@@ -1,7 +1,9 @@
 import csv
+import os
 import re
 import sys
 import time
+from urllib.parse import urlsplit
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 
 # --- Parsing functions (no changes) ---
@@ -23,6 +25,267 @@ def parse_area(area_str):
         except (ValueError, TypeError): return "N/A"
     return "N/A"
 
+# --- Lightweight page loads ---
+LISTING_SELECTOR = 'div.featured-card-component, div[data-test-id="card-regular"]'
+# How long to wait for the first listing card after the HTML has loaded
+LISTING_TIMEOUT_MS = int(os.environ.get('SCRAPER_LISTING_TIMEOUT_MS', '30000'))
+
+# Requests aborted before download. SCRAPER_BLOCK_RESOURCES overrides the resource
+# types (comma-separated, "none" blocks nothing), SCRAPER_BLOCK_DOMAINS adds hosts.
+# The listing data is in the HTML/JS, image URLs are read from the src attributes.
+DEFAULT_BLOCKED_RESOURCE_TYPES = ('image', 'media', 'font')
+DEFAULT_BLOCKED_DOMAINS = (
+    'google-analytics.com', 'googletagmanager.com', 'googleadservices.com', 'googlesyndication.com',
+    'doubleclick.net', 'adservice.google.com', 'facebook.net', 'facebook.com', 'connect.facebook.net',
+    'analytics.tiktok.com', 'hotjar.com', 'clarity.ms', 'criteo.com', 'criteo.net', 'scorecardresearch.com',
+    'newrelic.com', 'nr-data.net', 'mixpanel.com', 'segment.io', 'amplitude.com', 'moengage.com',
+)
+
+
+def blocking_config():
+    """Returns (blocked resource types, blocked domains) from the defaults and environment."""
+    types = os.environ.get('SCRAPER_BLOCK_RESOURCES')
+    if types is None:
+        blocked_types = set(DEFAULT_BLOCKED_RESOURCE_TYPES)
+    elif types.strip().lower() == 'none':
+        blocked_types = set()
+    else:
+        blocked_types = {t.strip().lower() for t in types.split(',') if t.strip()}
+    extra_domains = [d.strip().lower() for d in os.environ.get('SCRAPER_BLOCK_DOMAINS', '').split(',') if d.strip()]
+    return blocked_types, tuple(DEFAULT_BLOCKED_DOMAINS) + tuple(extra_domains)
+
+
+def should_block(resource_type, url, blocked_types, blocked_domains):
+    if resource_type in blocked_types:
+        return True
+    host = (urlsplit(url).hostname or '').lower()
+    return any(host == domain or host.endswith('.' + domain) for domain in blocked_domains)
+
+
+class PageLoadStats:
+    """Bytes received and time to the first listing card for one page load."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ready_seconds = None
+        self.requests = 0
+        self.blocked = 0
+        self.bytes = 0
+
+    def mark_ready(self):
+        self.ready_seconds = time.perf_counter() - self.started
+
+    def add_request(self, sizes):
+        self.requests += 1
+        self.bytes += sizes.get('responseBodySize', 0) + sizes.get('responseHeadersSize', 0)
+
+    def describe(self):
+        ready = f"{self.ready_seconds:.1f}s" if self.ready_seconds is not None else "?"
+        return f"ready in {ready}, {self.bytes / 1024:.0f} KB in {self.requests} requests ({self.blocked} blocked)"
+
+
+def setup_page(page, stats, blocked_types, blocked_domains):
+    """Aborts unneeded requests on `page` and counts the bytes of the others into `stats`."""
+    def handle_route(route):
+        if should_block(route.request.resource_type, route.request.url, blocked_types, blocked_domains):
+            stats.blocked += 1
+            route.abort()
+        else:
+            route.continue_()
+
+    def handle_finished(request):
+        try:
+            stats.add_request(request.sizes())
+        except Exception:
+            pass
+
+    if blocked_types or blocked_domains:
+        page.route("**/*", handle_route)
+    page.on("requestfinished", handle_finished)
+
+
+# --- Card extraction ---
+
+# Selectors of the fields of one listing card. The locator extraction here and in
+# async_scraper.py reads them into a raw card (the shape EXTRACT_LISTINGS_JS returns),
+# and listing_from_card turns any raw card into a CSV row.
+CARD_SELECTORS = {
+    'price': 'div.card-featured__middle-section__price strong, div[data-test-id="card-price"]',
+    'location': 'a[title] + span, p[data-test-id="card-location"]',
+    'LT': "div.attribute-info:has-text('LT') span, p:has-text('LT')",
+    'LB': "div.attribute-info:has-text('LB') span, p:has-text('LB')",
+    # Newer cards: icon + value list; older cards: "3 KT" style paragraphs
+    'attribute_list': 'div.ui-molecules-list__divider-none--horizontal',
+    'attribute_item': 'div.relative.ui-molecules-list__item',
+    'attribute_icon': 'svg use',
+    'attribute_value': 'span.attribute-text',
+    'KT': 'p:has-text("KT")',
+    'KM': 'p:has-text("KM")',
+    'GRS': 'p:has-text("GRS")',
+    'link': 'a[href^="/properti/"]',
+    'image': 'img',
+}
+CARD_TEXT_FIELDS = ('price', 'location', 'LT', 'LB')
+# Read only when the card has no attribute list
+CARD_FALLBACK_FIELDS = ('KT', 'KM', 'GRS')
+# Attribute icon name -> raw card key
+ATTRIBUTE_ICONS = ('bed', 'bath', 'car')
+
+
+def attribute_key(icon_href):
+    """'#icon-bed' -> 'bed' (None for icons that are not bed/bath/car)."""
+    return next((name for name in ATTRIBUTE_ICONS if name in (icon_href or "")), None)
+
+
+# --- Bulk extraction (one page.evaluate per page) ---
+
+# Reads every card with the selectors of CARD_SELECTORS (written out for the browser) and
+# returns the raw texts as one JSON array, instead of one browser round-trip per field.
+# Matches Playwright's :has-text() semantics (case-insensitive substring).
+EXTRACT_LISTINGS_JS = """
+(selector) => Array.from(document.querySelectorAll(selector)).map((card) => {
+    const textOf = (el) => (el ? el.innerText.trim() : null);
+    const hasText = (el, label) => el.innerText.toLowerCase().includes(label.toLowerCase());
+    const first = (sel) => card.querySelector(sel);
+    const firstWithText = (sel, label) => Array.from(card.querySelectorAll(sel)).find((el) => hasText(el, label)) || null;
+    const areaText = (label) => {
+        for (const el of card.querySelectorAll('div.attribute-info span, p')) {
+            const owner = el.matches('p') ? el : el.closest('div.attribute-info');
+            if (owner && hasText(owner, label)) return textOf(el);
+        }
+        return null;
+    };
+
+    let attributes = null;
+    const attributeList = first('div.ui-molecules-list__divider-none--horizontal');
+    if (attributeList) {
+        attributes = {};
+        for (const item of attributeList.querySelectorAll('div.relative.ui-molecules-list__item')) {
+            const icon = item.querySelector('svg use');
+            if (!icon) continue;
+            const href = icon.getAttribute('xlink:href') || '';
+            const value = textOf(item.querySelector('span.attribute-text'));
+            if (href.includes('bed')) attributes.bed = value;
+            else if (href.includes('bath')) attributes.bath = value;
+            else if (href.includes('car')) attributes.car = value;
+        }
+    }
+    const link = first('a[href^="/properti/"]');
+    const image = first('img');
+    return {
+        price: textOf(first('div.card-featured__middle-section__price strong, div[data-test-id="card-price"]')),
+        location: textOf(first('a[title] + span, p[data-test-id="card-location"]')),
+        attributes: attributes,
+        KT: textOf(firstWithText('p', 'KT')),
+        KM: textOf(firstWithText('p', 'KM')),
+        GRS: textOf(firstWithText('p', 'GRS')),
+        LT: areaText('LT'),
+        LB: areaText('LB'),
+        href: link ? link.getAttribute('href') : null,
+        image: image ? image.getAttribute('src') : null,
+    };
+})
+"""
+
+# Scrolls in steps until the bottom is reached and neither the page height nor the
+# number of cards has changed for settleMs (lazy-loaded cards), or maxMs passes.
+SCROLL_UNTIL_STABLE_JS = """
+async ({selector, step, settleMs, maxMs}) => {
+    const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+    const started = performance.now();
+    let lastHeight = -1, lastCount = -1, stableSince = started;
+    while (performance.now() - started < maxMs) {
+        window.scrollBy(0, step);
+        await sleep(50);
+        const height = document.body.scrollHeight;
+        const count = document.querySelectorAll(selector).length;
+        const atBottom = window.scrollY + window.innerHeight >= height - 2;
+        if (height !== lastHeight || count !== lastCount) {
+            lastHeight = height;
+            lastCount = count;
+            stableSince = performance.now();
+        } else if (atBottom && performance.now() - stableSince >= settleMs) {
+            break;
+        }
+    }
+    return document.querySelectorAll(selector).length;
+}
+"""
+SCROLL_OPTIONS = {'selector': LISTING_SELECTOR, 'step': 1500, 'settleMs': 300, 'maxMs': 5000}
+
+
+def listing_from_card(card):
+    """Turns one raw card (from EXTRACT_LISTINGS_JS or the locators) into a CSV row."""
+    bedrooms, bathrooms, garage = ("N/A",) * 3
+    attributes = card.get('attributes')
+    if attributes is not None:
+        bedrooms = attributes.get('bed') or "N/A"
+        bathrooms = attributes.get('bath') or "N/A"
+        garage = attributes.get('car') or "N/A"
+    else:
+        if card.get('KT'): bedrooms = re.sub(r'\s*KT.*', '', card['KT']).strip()
+        if card.get('KM'): bathrooms = re.sub(r'\s*KM.*', '', card['KM']).strip()
+        if card.get('GRS'): garage = re.sub(r'\s*GRS.*', '', card['GRS']).strip()
+
+    return {
+        "price": parse_price(card.get('price') or "N/A"),
+        "location": card.get('location') or "N/A",
+        "bedrooms": bedrooms,
+        "toilet": bathrooms,
+        "garage": garage,
+        "LT": parse_area(card.get('LT') or "N/A"),
+        "LB": parse_area(card.get('LB') or "N/A"),
+        "listing_url": "https://www.rumah123.com" + card['href'] if card.get('href') else "N/A",
+        "image_url": card.get('image') or "N/A",
+        "source": "rumah123"
+    }
+
+
+def extract_listings(page):
+    """All listings on the loaded page with one evaluate call; falls back to the per-field locators."""
+    try:
+        cards = page.evaluate(EXTRACT_LISTINGS_JS, LISTING_SELECTOR)
+        return [listing_from_card(card) for card in cards]
+    except Exception as e:
+        print(f"  - Bulk extraction failed ({str(e).splitlines()[0] if str(e) else type(e).__name__}), using selectors.")
+        return extract_listings_with_locators(page)
+
+
+def extract_listings_with_locators(page):
+    """Reads the listing cards field by field (one browser round-trip per field)."""
+    def text_of(locator):
+        return locator.inner_text().strip() if locator.count() else None
+
+    def attribute_of(locator, name):
+        return locator.get_attribute(name) if locator.count() else None
+
+    listings = page.locator(LISTING_SELECTOR)
+    scraped_data = []
+
+    for i in range(listings.count()):
+        listing = listings.nth(i)
+        card = {field: text_of(listing.locator(CARD_SELECTORS[field]).first) for field in CARD_TEXT_FIELDS}
+
+        attribute_list = listing.locator(CARD_SELECTORS['attribute_list']).first
+        if attribute_list.count():
+            card['attributes'] = {}
+            items = attribute_list.locator(CARD_SELECTORS['attribute_item'])
+            for j in range(items.count()):
+                item = items.nth(j)
+                key = attribute_key(attribute_of(item.locator(CARD_SELECTORS['attribute_icon']).first, 'xlink:href'))
+                if key:
+                    card['attributes'][key] = text_of(item.locator(CARD_SELECTORS['attribute_value']).first)
+        else:
+            card['attributes'] = None
+            for field in CARD_FALLBACK_FIELDS:
+                card[field] = text_of(listing.locator(CARD_SELECTORS[field]).first)
+
+        card['href'] = attribute_of(listing.locator(CARD_SELECTORS['link']).first, 'href')
+        card['image'] = attribute_of(listing.locator(CARD_SELECTORS['image']).first, 'src')
+        scraped_data.append(listing_from_card(card))
+    
+    return scraped_data
+
 # --- Main scraping function (updated) ---
 def scrape_page(base_url, page_number):
     """
@@ -31,93 +294,31 @@ def scrape_page(base_url, page_number):
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
         page = browser.new_page()
+        stats = PageLoadStats()
+        setup_page(page, stats, *blocking_config())
         
         # Construct the URL from the base URL and page number
         url = f"{base_url.rstrip('/')}/?page={page_number}"
         print(f"  - Navigating to: {url}...")
 
         try:
-            page.goto(url, wait_until="networkidle", timeout=90000)
-            for i in range(5):
-                page.mouse.wheel(0, 1500)
-                time.sleep(1)
-
-            listings = page.locator('div.featured-card-component, div[data-test-id="card-regular"]')
-            listing_count = listings.count()
+            # Wait for the listing cards instead of network idle (ads and trackers never go idle)
+            page.goto(url, wait_until="domcontentloaded", timeout=90000)
+            try:
+                page.wait_for_selector(LISTING_SELECTOR, timeout=LISTING_TIMEOUT_MS)
+            except PlaywrightTimeoutError:
+                pass  # no cards: reported below
+            stats.mark_ready()
+            # Scroll until lazy-loaded cards stop appearing instead of sleeping a fixed 5s
+            listing_count = page.evaluate(SCROLL_UNTIL_STABLE_JS, SCROLL_OPTIONS)
             
             if listing_count == 0:
                 print(f"  - No listings found on page {page_number}.")
                 page.screenshot(path=f"scraper_debug_page_{page_number}.png")
                 return []
             
-            print(f"  - Found {listing_count} listings. Scraping data...")
-            scraped_data = []
-
-            for i in range(listing_count):
-                listing = listings.nth(i)
-                price_raw, location_raw, lt_raw, lb_raw = ("N/A",) * 4
-                bedrooms, bathrooms, garage = ("N/A",) * 3
-                listing_url, image_url = "N/A", "N/A"
-
-                price_el = listing.locator('div.card-featured__middle-section__price strong, div[data-test-id="card-price"]').first
-                if price_el.count(): price_raw = price_el.inner_text().strip()
-
-                location_el = listing.locator('a[title] + span, p[data-test-id="card-location"]').first
-                if location_el.count(): location_raw = location_el.inner_text().strip()
-
-                attribute_list_container = listing.locator('div.ui-molecules-list__divider-none--horizontal').first
-                if attribute_list_container.count():
-                    attribute_items = attribute_list_container.locator('div.relative.ui-molecules-list__item')
-                    for j in range(attribute_items.count()):
-                        item = attribute_items.nth(j)
-                        icon_href_el = item.locator('svg use').first
-                        if icon_href_el.count():
-                            icon_href = icon_href_el.get_attribute('xlink:href') or ""
-                            value_el = item.locator('span.attribute-text').first
-                            value = value_el.inner_text().strip() if value_el.count() else "N/A"
-                            if 'bed' in icon_href: bedrooms = value
-                            elif 'bath' in icon_href: bathrooms = value
-                            elif 'car' in icon_href: garage = value
-                else:
-                    bed_el = listing.locator('p:has-text("KT")').first
-                    if bed_el.count(): bedrooms = re.sub(r'\s*KT.*', '', bed_el.inner_text()).strip()
-                    bath_el = listing.locator('p:has-text("KM")').first
-                    if bath_el.count(): bathrooms = re.sub(r'\s*KM.*', '', bath_el.inner_text()).strip()
-                    garage_el = listing.locator('p:has-text("GRS")').first
-                    if garage_el.count(): garage = re.sub(r'\s*GRS.*', '', garage_el.inner_text()).strip()
-
-                land_area_el = listing.locator("div.attribute-info:has-text('LT') span, p:has-text('LT')").first
-                if land_area_el.count(): lt_raw = land_area_el.inner_text().strip()
-
-                building_area_el = listing.locator("div.attribute-info:has-text('LB') span, p:has-text('LB')").first
-                if building_area_el.count(): lb_raw = building_area_el.inner_text().strip()
-                
-                link_el = listing.locator('a[href^="/properti/"]').first
-                if link_el.count():
-                    href = link_el.get_attribute('href')
-                    if href:
-                        listing_url = "https://www.rumah123.com" + href
-                
-                img_el = listing.locator('img').first
-                if img_el.count():
-                    src = img_el.get_attribute('src')
-                    if src:
-                        image_url = src
-
-                scraped_data.append({
-                    "price": parse_price(price_raw), 
-                    "location": location_raw, 
-                    "bedrooms": bedrooms,
-                    "toilet": bathrooms, 
-                    "garage": garage, 
-                    "LT": parse_area(lt_raw), 
-                    "LB": parse_area(lb_raw),
-                    "listing_url": listing_url, 
-                    "image_url": image_url,
-                    "source": "rumah123" # --- NEW COLUMN ADDED ---
-                })
-            
-            return scraped_data
+            print(f"  - Found {listing_count} listings ({stats.describe()}). Scraping data...")
+            return extract_listings(page)
 
         except PlaywrightTimeoutError:
             print(f"❌ Timeout Error on page {page_number}. Saving a screenshot.")
@@ -126,7 +327,7 @@ def scrape_page(base_url, page_number):
         finally:
             browser.close()
 
-def save_to_csv(data, filename):
+def save_to_csv(data, filename, quiet=False):
     if not data:
         print("No data to save.")
         return
@@ -137,7 +338,8 @@ def save_to_csv(data, filename):
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(data)
-    print(f"\n✅ Success! Data has been saved to '{filename}'")
+    if not quiet:
+        print(f"\n✅ Success! Data has been saved to '{filename}'")
 
 if __name__ == "__main__":
     # --- MODIFIED: Accept 2 arguments ---
@@ -0,0 +1,134 @@
+"""
+Production entry point for the property prediction API.
+
+    python serve.py                       # gunicorn on Linux/macOS, waitress on Windows
+    python serve.py --workers 4 --threads 2 --port 8000
+    python serve.py --server waitress --threads 8
+
+With gunicorn the model is loaded once in the master process before the
+workers are forked, so every worker shares the same model pages
+(copy-on-write). When --watch-model is set the master polls the model
+files; after a new artifact is dropped in it reloads the model and
+gracefully replaces the workers (SIGHUP), so no request is dropped.
+"""
+import argparse
+import gc
+import os
+import signal
+import sys
+import threading
+import time
+
+DEFAULT_WORKERS = int(os.environ.get('SERVE_WORKERS', max(2, (os.cpu_count() or 1))))
+DEFAULT_THREADS = int(os.environ.get('SERVE_THREADS', '2'))
+DEFAULT_HOST = os.environ.get('SERVE_HOST', '0.0.0.0')
+DEFAULT_PORT = int(os.environ.get('SERVE_PORT', '8000'))
+DEFAULT_WATCH_INTERVAL = float(os.environ.get('SERVE_WATCH_INTERVAL', '10'))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the property prediction API with a production server")
+    parser.add_argument('--server', choices=['auto', 'gunicorn', 'waitress'], default='auto',
+                        help="WSGI server (auto: gunicorn unless running on Windows)")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Worker processes (gunicorn only)")
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help="Threads per worker")
+    parser.add_argument('--timeout', type=int, default=60, help="Worker timeout in seconds (gunicorn only)")
+    parser.add_argument('--watch-model', type=float, nargs='?', const=DEFAULT_WATCH_INTERVAL, default=None,
+                        metavar='SECONDS', help="Reload the model when its files change (poll interval)")
+    return parser.parse_args()
+
+
+def load_app():
+    """Imports the Flask app, which loads and warms up the model."""
+    os.environ.setdefault('PREDICTION_MODE', 'inprocess')
+    import api_server
+    # Move everything loaded so far out of the GC's reach, so collections in
+    # the workers do not touch (and un-share) the preloaded model pages
+    gc.collect()
+    gc.freeze()
+    return api_server
+
+
+def start_model_watcher(api_server, interval, on_reload):
+    """Polls the model files in a background thread and calls on_reload after a successful reload."""
+    service = api_server.prediction_service
+    if service is None:
+        print("[SERVE WARNING] Model is not loaded in-process, --watch-model has no effect")
+        return
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            if service.reload_if_changed():
+                print(f"[SERVE] Loaded new model {service.model_version}")
+                on_reload()
+
+    threading.Thread(target=watch, name='model-watcher', daemon=True).start()
+    print(f"[SERVE] Watching model files every {interval:.0f}s")
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    # Job worker threads are started per worker process after the fork (post_fork)
+    os.environ['JOB_QUEUE_AUTOSTART'] = '0'
+    api_server = load_app()
+
+    class PredictionApplication(BaseApplication):
+        def load_config(self):
+            settings = {
+                'bind': f"{args.host}:{args.port}",
+                'workers': args.workers,
+                'threads': args.threads,
+                'worker_class': 'gthread' if args.threads > 1 else 'sync',
+                'timeout': args.timeout,
+                'graceful_timeout': args.timeout,
+                'preload_app': True,
+                'accesslog': '-',
+                'post_fork': lambda server, worker: api_server.job_queue and api_server.job_queue.start(),
+            }
+            if args.watch_model:
+                # Reload the model in the master, then SIGHUP ourselves so gunicorn
+                # forks fresh workers from it and retires the old ones gracefully
+                settings['when_ready'] = lambda server: start_model_watcher(
+                    api_server, args.watch_model, lambda: os.kill(os.getpid(), signal.SIGHUP)
+                )
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return api_server.app
+
+    print(f"[SERVE] gunicorn on {args.host}:{args.port} with {args.workers} workers x {args.threads} threads")
+    PredictionApplication().run()
+
+
+def run_waitress(args):
+    from waitress import serve
+
+    api_server = load_app()
+    if args.watch_model:
+        # Single process: the service swaps the model in place
+        start_model_watcher(api_server, args.watch_model, lambda: None)
+
+    print(f"[SERVE] waitress on {args.host}:{args.port} with {args.threads} threads")
+    serve(api_server.app, host=args.host, port=args.port, threads=args.threads)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    server = args.server
+    if server == 'auto':
+        server = 'waitress' if sys.platform.startswith('win') else 'gunicorn'
+
+    try:
+        if server == 'gunicorn':
+            run_gunicorn(args)
+        else:
+            run_waitress(args)
+    except ImportError as e:
+        print(f"❌ Error: {server} is not installed ({str(e)}). Install it with: pip install {server}")
+        sys.exit(1)